@@ -2,19 +2,25 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+from urllib.parse import parse_qs
 from uuid import uuid4
 from pathlib import Path
 from typing import Literal
 
 import duckdb
-from fastapi import FastAPI, File, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 
 from engine import DuckDBEngine
+from import_jobs import IMPORT_WAIT_SECONDS, ImportJobManager
+from page_prefetch import PREFETCH_MAX_DEPTH, PagePrefetcher
 
 app = FastAPI(title="Zen Data Explorer")
 
@@ -23,14 +29,23 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Response-Bytes", "X-Prefetch"],
 )
 
-engine = DuckDBEngine()
-
 # ── Data directory for uploaded files ──
 DATA_DIR = Path(__file__).parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
+# File-backed database so imported datasets survive backend restarts.
+DATABASE_PATH = os.environ.get("ZEN_DATABASE_PATH", str(DATA_DIR / "zen.duckdb"))
+
+# Server-side directories and globs may only be registered from under here.
+SOURCE_ROOT = Path(os.environ.get("ZEN_SOURCE_ROOT", str(DATA_DIR))).resolve()
+
+engine = DuckDBEngine(database=DATABASE_PATH)
+import_jobs = ImportJobManager(engine, is_busy=lambda: ACTIVE_DATASET_REQUESTS > 0)
+prefetcher = PagePrefetcher(engine)
+
 SUPPORTED_UPLOAD_SUFFIX: dict[str, str] = {
     ".csv": "csv",
     ".parquet": "parquet",
@@ -41,6 +56,14 @@ SUPPORTED_UPLOAD_SUFFIX: dict[str, str] = {
 
 IMPORT_SESSIONS: dict[str, dict] = {}
 
+# ── Upload streaming limits ──
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = 20 * 1024**3
+UPLOAD_PROGRESS_LIMIT = 100
+
+UPLOAD_PROGRESS: dict[str, dict] = {}
+UPLOAD_PATHS = {"/api/datasets/upload", "/api/datasets/discover"}
+
 
 def _parse_filters(filters: str | None) -> list[dict]:
     if not filters:
@@ -59,7 +82,158 @@ def _parse_filters(filters: str | None) -> list[dict]:
     return parsed
 
 
-async def _store_upload_file(file: UploadFile) -> tuple[str, str, str, Path]:
+def _parse_sort(sort: str | None) -> list[dict] | None:
+    if not sort:
+        return None
+
+    try:
+        parsed = json.loads(sort)
+    except json.JSONDecodeError:
+        raise HTTPException(400, "Invalid sort JSON")
+
+    if not isinstance(parsed, list):
+        raise HTTPException(400, "Sort must be a JSON array")
+    if not all(isinstance(item, dict) for item in parsed):
+        raise HTTPException(400, "Each sort key must be an object")
+
+    return parsed
+
+
+def _parse_columns(columns: str | None) -> list[str] | None:
+    if not columns:
+        return None
+
+    try:
+        parsed = json.loads(columns)
+    except json.JSONDecodeError:
+        raise HTTPException(400, "Invalid columns JSON")
+
+    if not isinstance(parsed, list) or not all(isinstance(c, str) for c in parsed):
+        raise HTTPException(400, "Columns must be a JSON array of names")
+
+    return parsed
+
+
+def _write_upload_chunk(out, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _track_upload(upload_id: str, name: str | None, total_bytes: int | None) -> dict:
+    while len(UPLOAD_PROGRESS) >= UPLOAD_PROGRESS_LIMIT:
+        UPLOAD_PROGRESS.pop(next(iter(UPLOAD_PROGRESS)))
+
+    progress = {
+        "uploadId": upload_id,
+        "name": name,
+        "status": "receiving",
+        "bytesReceived": 0,
+        "totalBytes": total_bytes,
+    }
+    UPLOAD_PROGRESS[upload_id] = progress
+    return progress
+
+
+class UploadProgressMiddleware:
+    """Counts request body bytes as they arrive for uploads sent with an
+    ``upload_id``. Form parsing spools the whole file before the route runs,
+    so only the raw body shows how much has crossed the network. Bodies over
+    MAX_UPLOAD_BYTES, declared or received, are answered with 413 before
+    they are spooled in full."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in UPLOAD_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        upload_id = (query.get("upload_id") or [None])[0]
+        length = dict(scope["headers"]).get(b"content-length")
+        total_bytes = int(length) if length and length.isdigit() else None
+        progress = _track_upload(upload_id, None, total_bytes) if upload_id else None
+        state = {"received": 0, "too_large": False}
+
+        async def reject() -> None:
+            if progress is not None:
+                progress["status"] = "failed"
+            response = JSONResponse(
+                {"detail": f"File exceeds upload limit of {MAX_UPLOAD_BYTES} bytes"},
+                status_code=413,
+            )
+            await response(scope, receive, send)
+
+        if total_bytes is not None and total_bytes > MAX_UPLOAD_BYTES:
+            await reject()
+            return
+
+        async def counting_receive():
+            if state["too_large"]:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if progress is not None:
+                    progress["bytesReceived"] = state["received"]
+                if state["received"] > MAX_UPLOAD_BYTES:
+                    # Stop reading; the route's response is replaced below.
+                    state["too_large"] = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def marking_send(message) -> None:
+            if state["too_large"]:
+                return
+            if message["type"] == "http.response.start" and message["status"] >= 400:
+                if progress is not None and progress["status"] == "receiving":
+                    progress["status"] = "failed"
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, marking_send)
+        except Exception:
+            if not state["too_large"]:
+                raise
+        if state["too_large"]:
+            await reject()
+
+
+app.add_middleware(UploadProgressMiddleware)
+
+# Dataset sub-resource requests (page, count, profile, query, ...) in flight;
+# background profiling pauses between columns while any are running.
+ACTIVE_DATASET_REQUESTS = 0
+
+
+class ActiveRequestMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        global ACTIVE_DATASET_REQUESTS
+        parts = scope["path"].strip("/").split("/") if scope["type"] == "http" else []
+        if parts[:2] != ["api", "datasets"] or len(parts) < 4:
+            await self.app(scope, receive, send)
+            return
+        ACTIVE_DATASET_REQUESTS += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ACTIVE_DATASET_REQUESTS -= 1
+
+
+app.add_middleware(ActiveRequestMiddleware)
+
+
+async def _store_upload_file(
+    file: UploadFile, upload_id: str | None = None
+) -> tuple[str, str, Path, dict]:
     if not file.filename:
         raise HTTPException(400, "No file provided")
 
@@ -73,18 +247,87 @@ async def _store_upload_file(file: UploadFile) -> tuple[str, str, str, Path]:
     if not file_format:
         raise HTTPException(400, f"Unsupported file format: {suffix}")
 
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(413, f"File exceeds upload limit of {MAX_UPLOAD_BYTES} bytes")
+
+    # With an upload_id the middleware has been counting the request body;
+    # otherwise progress is tracked from here, once the body is spooled.
+    progress = UPLOAD_PROGRESS.get(upload_id) if upload_id else None
+    count_copy = progress is None
+    if count_copy:
+        progress = _track_upload(upload_id or uuid4().hex, safe_name, file.size)
+    progress["name"] = safe_name
     save_path = DATA_DIR / f"{uuid4().hex}_{safe_name}"
-    content = await file.read()
-    save_path.write_bytes(content)
-    return safe_name, suffix, file_format, save_path
+    digest = hashlib.sha256()
+    stored = 0
+
+    # Copy in fixed-size chunks so memory stays bounded regardless of file size;
+    # hashing and disk writes run off the event loop.
+    try:
+        with save_path.open("wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                stored += len(chunk)
+                if count_copy:
+                    progress["bytesReceived"] = stored
+                if stored > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        413, f"File exceeds upload limit of {MAX_UPLOAD_BYTES} bytes"
+                    )
+                await run_in_threadpool(_write_upload_chunk, out, digest, chunk)
+    except BaseException:
+        progress["status"] = "failed"
+        save_path.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+
+    # Store uploads content-addressed so re-uploading the same extract reuses
+    # the file already on disk.
+    content_hash = digest.hexdigest()
+    content_path = DATA_DIR / f"{content_hash}{suffix}"
+    if content_path.exists():
+        save_path.unlink(missing_ok=True)
+    else:
+        save_path.replace(content_path)
+
+    progress["status"] = "complete"
+    progress["fileBytes"] = stored
+    progress["sha256"] = content_hash
+    return safe_name, file_format, content_path, progress
+
+
+# ── Datasets ──
+
+
+@app.get("/api/datasets")
+async def list_datasets():
+    return {"datasets": engine.list_datasets()}
+
+
+@app.delete("/api/datasets/{dataset_id}")
+async def delete_dataset(dataset_id: str):
+    try:
+        table_dropped = engine.drop_dataset(dataset_id)
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+    except duckdb.Error as e:
+        raise HTTPException(400, f"Delete failed: {e}")
+    return {"id": dataset_id, "tableDropped": table_dropped}
 
 
 # ── Upload ──
 
 
 @app.post("/api/datasets/upload")
-async def upload_dataset(file: UploadFile = File(...)):
-    safe_name, _, file_format, save_path = await _store_upload_file(file)
+async def upload_dataset(
+    file: UploadFile = File(...),
+    upload_id: str | None = Query(None),
+    mode: Literal["copy", "attach"] = Query("copy"),
+    precompute_profiles: bool = Query(False),
+):
+    safe_name, file_format, save_path, upload = await _store_upload_file(
+        file, upload_id
+    )
 
     if file_format not in {"csv", "parquet"}:
         raise HTTPException(
@@ -94,33 +337,67 @@ async def upload_dataset(file: UploadFile = File(...)):
 
     try:
         dataset_id = engine.load_file(
-            str(save_path), safe_name, file_format=file_format
+            str(save_path),
+            safe_name,
+            file_format=file_format,
+            mode=mode,
+            content_hash=upload["sha256"],
         )
         schema = engine.get_schema(dataset_id)
     except (ValueError, duckdb.Error) as e:
         raise HTTPException(400, f"Failed to load file: {e}")
+    upload["datasetId"] = dataset_id
+    if precompute_profiles:
+        import_jobs.schedule_profiles(dataset_id)
 
     return {
         "id": dataset_id,
         "name": safe_name,
+        "uploadId": upload["uploadId"],
         "rowCount": schema["rowCount"],
         "columns": schema["columns"],
     }
 
 
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_progress(upload_id: str):
+    progress = UPLOAD_PROGRESS.get(upload_id)
+    if not progress:
+        raise HTTPException(404, "Upload not found")
+    if "datasetId" in progress:
+        status = import_jobs.profile_status(progress["datasetId"])
+        if status is not None:
+            return {**progress, "profileStatus": status}
+    return progress
+
+
 class ImportRequest(BaseModel):
     importId: str
     selectedEntities: list[str] = Field(default_factory=list)
     importMode: Literal["selected", "all"] = "selected"
     datasetNameMode: Literal["filename_entity", "entity_only"] = "filename_entity"
+    loadMode: Literal["copy", "attach"] = "copy"
+    precomputeProfiles: bool = False
+    profileColumns: list[str] | None = None
 
 
 @app.post("/api/datasets/discover")
-async def discover_dataset(file: UploadFile = File(...)):
-    safe_name, _, file_format, save_path = await _store_upload_file(file)
+async def discover_dataset(
+    file: UploadFile = File(...),
+    upload_id: str | None = Query(None),
+    exact_counts: bool = Query(False),
+):
+    safe_name, file_format, save_path, upload = await _store_upload_file(
+        file, upload_id
+    )
 
     try:
-        entities = engine.discover_file_entities(str(save_path), file_format)
+        entities = engine.discover_file_entities(
+            str(save_path),
+            file_format,
+            exact_counts=exact_counts,
+            content_hash=upload["sha256"],
+        )
     except (ValueError, duckdb.Error) as e:
         raise HTTPException(400, f"Failed to discover file entities: {e}")
 
@@ -129,11 +406,13 @@ async def discover_dataset(file: UploadFile = File(...)):
         "path": str(save_path),
         "name": safe_name,
         "format": file_format,
+        "sha256": upload["sha256"],
         "entities": [str(e["name"]) for e in entities],
     }
 
     return {
         "importId": import_id,
+        "uploadId": upload["uploadId"],
         "name": safe_name,
         "format": file_format,
         "entities": entities,
@@ -141,80 +420,162 @@ async def discover_dataset(file: UploadFile = File(...)):
     }
 
 
-@app.post("/api/datasets/import")
-async def import_dataset(body: ImportRequest):
-    session = IMPORT_SESSIONS.get(body.importId)
-    if not session:
-        raise HTTPException(404, "Import session not found")
-
-    file_path = str(session["path"])
+def _resolve_import_entities(body: ImportRequest, session: dict) -> list[dict]:
     original_name = str(session["name"])
     file_format = str(session["format"])
     available_entities = [str(v) for v in session.get("entities", [])]
 
+    if body.loadMode == "attach" and file_format != "parquet":
+        raise HTTPException(400, "Attach mode is only supported for Parquet files")
     if file_format in {"csv", "parquet"}:
-        selected_entities = ["data"]
+        return [{"name": "data", "datasetName": original_name, "entity": None}]
+
+    if body.importMode == "all":
+        selected_entities = available_entities
     else:
-        if body.importMode == "all":
-            selected_entities = available_entities
-        else:
-            selected_entities = body.selectedEntities
+        selected_entities = body.selectedEntities
 
-        if not selected_entities:
-            raise HTTPException(400, "No entities selected for import")
-        unknown = [e for e in selected_entities if e not in available_entities]
-        if unknown:
-            raise HTTPException(400, f"Unknown entities selected: {', '.join(unknown)}")
+    if not selected_entities:
+        raise HTTPException(400, "No entities selected for import")
+    unknown = [e for e in selected_entities if e not in available_entities]
+    if unknown:
+        raise HTTPException(400, f"Unknown entities selected: {', '.join(unknown)}")
 
     base_name = Path(original_name).stem
-    imported: list[dict] = []
+    resolved: list[dict] = []
+    for entity in selected_entities:
+        if body.datasetNameMode == "entity_only":
+            dataset_name = entity
+        else:
+            dataset_name = f"{base_name}_{entity}"
+        resolved.append({"name": entity, "datasetName": dataset_name, "entity": entity})
+    return resolved
 
-    try:
-        for entity in selected_entities:
-            if file_format in {"csv", "parquet"}:
-                dataset_name = original_name
-                dataset_id = engine.load_file(
-                    file_path,
-                    dataset_name,
-                    file_format=file_format,
-                )
-            else:
-                if body.datasetNameMode == "entity_only":
-                    dataset_name = entity
-                else:
-                    dataset_name = f"{base_name}_{entity}"
-                dataset_id = engine.load_file(
-                    file_path,
-                    dataset_name,
-                    file_format=file_format,
-                    entity=entity,
-                )
-
-            schema = engine.get_schema(dataset_id)
-            imported.append(
-                {
-                    "id": dataset_id,
-                    "name": dataset_name,
-                    "rowCount": schema["rowCount"],
-                    "columns": schema["columns"],
-                    "sourceType": "file",
-                }
-            )
-    except (ValueError, duckdb.Error) as e:
-        raise HTTPException(400, f"Failed to import dataset entities: {e}")
 
+def _submit_import_job(body: ImportRequest) -> dict:
+    session = IMPORT_SESSIONS.get(body.importId)
+    if not session:
+        raise HTTPException(404, "Import session not found")
+
+    entities = _resolve_import_entities(body, session)
+    job = import_jobs.submit(
+        str(session["path"]),
+        str(session["format"]),
+        entities,
+        load_mode=body.loadMode,
+        content_hash=session.get("sha256"),
+        precompute_profiles=body.precomputeProfiles,
+        profile_columns=body.profileColumns,
+    )
     IMPORT_SESSIONS.pop(body.importId, None)
+    return job
+
+
+@app.post("/api/datasets/import")
+async def import_dataset(body: ImportRequest):
+    job = _submit_import_job(body)
+    job = await run_in_threadpool(import_jobs.wait, job["jobId"], IMPORT_WAIT_SECONDS)
+    if job["status"] in {"queued", "running"}:
+        raise HTTPException(
+            504, f"Import is still running; poll /api/datasets/import-jobs/{job['jobId']}"
+        )
+
+    failed = [e for e in job["entities"] if e["status"] == "failed"]
+    if failed:
+        raise HTTPException(400, f"Failed to import dataset entities: {failed[0]['error']}")
+
     return {
         "importId": body.importId,
-        "datasets": imported,
+        "datasets": [e["dataset"] for e in job["entities"]],
+    }
+
+
+class SourceRequest(BaseModel):
+    path: str
+    name: str | None = None
+    format: Literal["csv", "parquet"] | None = None
+    # Defaults to attach for Parquet and copy for CSV.
+    loadMode: Literal["copy", "attach"] | None = None
+
+
+@app.post("/api/datasets/sources")
+async def register_source(body: SourceRequest):
+    """Register a server-side file, directory, or glob (e.g. a hive
+    partitioned Parquet tree) as one dataset without uploading it."""
+    source = Path(body.path)
+    if not source.is_absolute():
+        source = SOURCE_ROOT / source
+    # Only the parts before the first wildcard can be resolved; DuckDB
+    # expands the rest, and "**" cannot climb out of the prefix.
+    parts = list(source.parts)
+    for idx, part in enumerate(parts):
+        if set(part) & set("*?["):
+            if ".." in parts[idx:]:
+                raise HTTPException(400, "Glob patterns may not contain '..'")
+            parts = parts[:idx]
+            break
+    if not Path(*parts).resolve().is_relative_to(SOURCE_ROOT):
+        raise HTTPException(400, f"Source path must be under {SOURCE_ROOT}")
+
+    try:
+        path, file_format = engine.resolve_source(str(source), body.format)
+        name = body.name or source.name
+        mode = body.loadMode or ("attach" if file_format == "parquet" else "copy")
+        dataset_id = engine.load_file(path, name, file_format=file_format, mode=mode)
+        schema = engine.get_schema(dataset_id)
+    except ValueError as e:
+        raise HTTPException(404 if "not found" in str(e).lower() else 400, str(e))
+    except duckdb.Error as e:
+        raise HTTPException(400, f"Failed to load source: {e}")
+
+    return {
+        "id": dataset_id,
+        "name": name,
+        "format": file_format,
+        "source": path,
+        "rowCount": schema["rowCount"],
+        "columns": schema["columns"],
     }
 
 
+@app.post("/api/datasets/import-jobs")
+async def submit_import_job(body: ImportRequest):
+    job = _submit_import_job(body)
+    return {"importId": body.importId, **job}
+
+
+@app.get("/api/datasets/import-jobs/{job_id}")
+async def get_import_job(job_id: str):
+    try:
+        return import_jobs.get(job_id)
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+
+
 # ── Schema ──
 
 
+def _not_modified(dataset_id: str, request: Request, response: Response) -> Response | None:
+    """Tag the response with the dataset version. Returns a 304 response when
+    the client's cached copy (If-None-Match) is still current."""
+    try:
+        etag = f'W/"{engine.dataset_version(dataset_id)}"'
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    client_tags = {t.strip() for t in request.headers.get("if-none-match", "").split(",")}
+    if etag in client_tags or "*" in client_tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @app.get("/api/datasets/{dataset_id}/schema")
-async def get_schema(dataset_id: str):
+async def get_schema(dataset_id: str, request: Request, response: Response):
+    not_modified = _not_modified(dataset_id, request, response)
+    if not_modified:
+        return not_modified
     try:
         return engine.get_schema(dataset_id)
     except ValueError as e:
@@ -235,19 +596,43 @@ async def get_page(
     sort_direction: str | None = Query(None),
     filters: str | None = Query(None),
     cursor: str | None = Query(None),
+    sort: str | None = Query(None),
+    columns: str | None = Query(None),
+    column_offset: int = Query(0, ge=0),
+    column_limit: int | None = Query(None, ge=1),
+    encoding: Literal["rows", "columnar"] = Query("rows"),
+    count_mode: Literal["exact", "estimate"] = Query("exact"),
+    prefetch: int = Query(0, ge=0, le=PREFETCH_MAX_DEPTH),
+    session: str | None = Query(None, max_length=128),
 ):
     parsed_filters = _parse_filters(filters)
+    parsed_sort = _parse_sort(sort)
+    parsed_columns = _parse_columns(columns)
+    page_args = dict(
+        page=page,
+        page_size=page_size,
+        sort_column=sort_column,
+        sort_direction=sort_direction,
+        filters=parsed_filters,
+        cursor=cursor,
+        sort=parsed_sort,
+        columns=parsed_columns,
+        column_offset=column_offset,
+        column_limit=column_limit,
+        encoding=encoding,
+        count_mode=count_mode,
+    )
 
+    prefetch_status = None
     try:
-        return engine.get_page(
-            dataset_id=dataset_id,
-            page=page,
-            page_size=page_size,
-            sort_column=sort_column,
-            sort_direction=sort_direction,
-            filters=parsed_filters,
-            cursor=cursor,
-        )
+        if prefetch or session is not None:
+            # A hit may wait on an in-flight prefetch; keep the event loop free.
+            result, hit = await run_in_threadpool(
+                prefetcher.get_page, session or "", prefetch, dataset_id, **page_args
+            )
+            prefetch_status = "hit" if hit else "miss"
+        else:
+            result = engine.get_page(dataset_id=dataset_id, **page_args)
     except ValueError as e:
         if str(e).startswith("Dataset not found"):
             raise HTTPException(404, str(e))
@@ -255,6 +640,35 @@ async def get_page(
     except duckdb.Error as e:
         raise HTTPException(400, f"Invalid query input: {e}")
 
+    response = JSONResponse(result)
+    response.headers["X-Response-Bytes"] = str(len(response.body))
+    if prefetch_status is not None:
+        response.headers["X-Prefetch"] = prefetch_status
+    return response
+
+
+@app.get("/api/datasets/{dataset_id}/count")
+async def filtered_count(
+    dataset_id: str,
+    filters: str | None = Query(None),
+    wait: float = Query(0.0, ge=0.0, le=30.0),
+):
+    parsed_filters = _parse_filters(filters)
+
+    try:
+        return await run_in_threadpool(engine.filtered_count, dataset_id, parsed_filters, wait)
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(404, str(e))
+        raise HTTPException(400, str(e))
+    except duckdb.Error as e:
+        raise HTTPException(400, f"Invalid query input: {e}")
+
+
+@app.get("/api/page-prefetch/stats")
+async def page_prefetch_stats():
+    return prefetcher.stats()
+
 
 # ── Profile ──
 
@@ -263,7 +677,12 @@ async def get_page(
 async def profile_column(
     dataset_id: str,
     column: str,
+    request: Request,
+    response: Response,
 ):
+    not_modified = _not_modified(dataset_id, request, response)
+    if not_modified:
+        return not_modified
     try:
         return engine.profile_column(dataset_id, column)
     except ValueError as e:
@@ -274,13 +693,30 @@ async def profile_column(
         raise HTTPException(400, f"Profile query failed: {e}")
 
 
+@app.get("/api/datasets/{dataset_id}/columns/{column:path}/unique-count")
+async def column_unique_count(dataset_id: str, column: str):
+    try:
+        return engine.count_distinct(dataset_id, column)
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(404, str(e))
+        raise HTTPException(400, str(e))
+    except duckdb.Error as e:
+        raise HTTPException(400, f"Unique count query failed: {e}")
+
+
 @app.get("/api/datasets/{dataset_id}/columns/{column:path}/values")
 async def column_value_suggestions(
     dataset_id: str,
     column: str,
+    request: Request,
+    response: Response,
     q: str | None = Query(None),
     limit: int = Query(10, ge=1, le=100),
 ):
+    not_modified = _not_modified(dataset_id, request, response)
+    if not_modified:
+        return not_modified
     try:
         values = engine.get_column_value_suggestions(dataset_id, column, q, limit)
         return {"values": values}
@@ -297,6 +733,7 @@ async def column_value_suggestions(
 
 class QueryRequest(BaseModel):
     sql: str
+    encoding: Literal["rows", "columnar"] = "rows"
 
 
 class CodeRequest(BaseModel):
@@ -311,6 +748,7 @@ class TableQueryRequest(BaseModel):
     having: list[dict] = Field(default_factory=list)
     sort: list[dict] = Field(default_factory=list)
     limit: int = 200
+    encoding: Literal["rows", "columnar"] = "rows"
 
 
 @app.post("/api/datasets/{dataset_id}/query")
@@ -318,7 +756,7 @@ async def run_query(dataset_id: str, body: QueryRequest):
     if not body.sql.strip():
         raise HTTPException(400, "SQL query is empty")
     try:
-        return engine.run_query(dataset_id, body.sql)
+        return engine.run_query(dataset_id, body.sql, encoding=body.encoding)
     except ValueError as e:
         if "not found" in str(e).lower():
             raise HTTPException(404, str(e))
@@ -365,8 +803,10 @@ async def export_dataset(
     sort_column: str | None = Query(None),
     sort_direction: str | None = Query(None),
     filters: str | None = Query(None),
+    sort: str | None = Query(None),
 ):
     parsed_filters = _parse_filters(filters)
+    parsed_sort = _parse_sort(sort)
 
     try:
         csv_bytes = engine.export_csv(
@@ -374,6 +814,7 @@ async def export_dataset(
             sort_column=sort_column,
             sort_direction=sort_direction,
             filters=parsed_filters,
+            sort=parsed_sort,
         )
     except ValueError as e:
         if "not found" in str(e).lower():
@@ -4,24 +4,41 @@ from __future__ import annotations
 
 import base64
 import csv
+import glob
 import io
 import json
 import math
+import os
+import re
 import sqlite3
 import threading
 import time
 import uuid
 import zipfile
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Callable
 import xml.etree.ElementTree as ET
 
 import duckdb
 from code_runner import execute_python_code
+from columnar import (
+    COLUMNAR_ENCODING,
+    RESULT_ENCODINGS,
+    encode_columns,
+    fetch_columns,
+    scalar,
+)
+from result_cache import RESULT_CACHE_BYTES, ResultCache
 
 
 class Engine(ABC):
+    @abstractmethod
+    def list_datasets(self) -> list[dict]:
+        """List registered datasets from the catalog."""
+
     @abstractmethod
     def load_file(
         self,
@@ -29,13 +46,27 @@ class Engine(ABC):
         name: str,
         file_format: str = "csv",
         entity: str | None = None,
+        mode: str = "copy",
+        content_hash: str | None = None,
     ) -> str:
         """Load a file into the engine. Returns dataset_id."""
 
+    @abstractmethod
+    def drop_dataset(self, dataset_id: str) -> bool:
+        """Remove a dataset. Returns True when its backing table was dropped."""
+
+    @abstractmethod
+    def dataset_version(self, dataset_id: str) -> str:
+        """Opaque token that changes whenever the dataset's data changes."""
+
     @abstractmethod
     def get_schema(self, dataset_id: str) -> dict:
         """Get column names, types, null counts, row count."""
 
+    @abstractmethod
+    def count_distinct(self, dataset_id: str, column: str) -> dict:
+        """Exact distinct count for one column."""
+
     @abstractmethod
     def get_page(
         self,
@@ -46,8 +77,29 @@ class Engine(ABC):
         sort_direction: str | None,
         filters: list[dict],
         cursor: str | None = None,
+        sort: list[dict] | None = None,
+        columns: list[str] | None = None,
+        column_offset: int = 0,
+        column_limit: int | None = None,
+        encoding: str = "rows",
+        count_mode: str = "exact",
     ) -> dict:
-        """Fetch a page of rows with keyset pagination, sort, and filters."""
+        """Fetch a page of rows with keyset pagination, sort, and filters.
+
+        ``sort`` is an ordered list of {column, direction} keys and takes
+        precedence over sort_column/sort_direction. ``columns`` projects the
+        page onto those columns; column_offset/column_limit then select a
+        window of them (or of all columns) for horizontally scrolled grids;
+        totalColumns counts the projection the window was cut from.
+        ``encoding="columnar"`` returns column arrays instead of row objects.
+        ``count_mode="estimate"`` may return a sampled filteredRows while the
+        exact count runs in the background (see filtered_count)."""
+
+    @abstractmethod
+    def filtered_count(
+        self, dataset_id: str, filters: list[dict], wait: float = 0.0
+    ) -> dict:
+        """Exact filtered row count, waiting up to ``wait`` seconds for it."""
 
     @abstractmethod
     def profile_column(
@@ -58,8 +110,9 @@ class Engine(ABC):
         """Profile a single column (stats, histogram, top values)."""
 
     @abstractmethod
-    def run_query(self, dataset_id: str, sql: str) -> dict:
-        """Execute arbitrary SQL against a dataset. Returns columns + rows."""
+    def run_query(self, dataset_id: str, sql: str, encoding: str = "rows") -> dict:
+        """Execute arbitrary SQL against a dataset. Returns columns + rows, or
+        column arrays with null bitmaps when encoding is "columnar"."""
 
     @abstractmethod
     def run_code(self, dataset_id: str, language: str, code: str) -> dict:
@@ -67,7 +120,9 @@ class Engine(ABC):
 
     @abstractmethod
     def run_table_query(self, dataset_id: str, spec: dict[str, Any]) -> dict:
-        """Execute structured table query spec and return rows + generated code."""
+        """Execute structured table query spec and return rows + generated code.
+
+        ``spec["encoding"]`` selects the "rows" or "columnar" result layout."""
 
     @abstractmethod
     def get_column_value_suggestions(
@@ -86,6 +141,7 @@ class Engine(ABC):
         sort_column: str | None,
         sort_direction: str | None,
         filters: list[dict],
+        sort: list[dict] | None = None,
     ) -> bytes:
         """Export filtered/sorted data as CSV bytes."""
 
@@ -170,6 +226,64 @@ FILTER_OPERATORS_BY_TYPE: dict[str, set[str]] = {
 
 HAVING_OPERATORS = {"=", "!=", ">", "<", ">=", "<="}
 PROFILE_FULL_ROW_LIMIT = 1_000_000
+# Larger tables are profiled on one shared sample per data version: the rows
+# with the smallest seeded hash of their row id, so any prefix of it is the
+# same smaller sample.
+PROFILE_SAMPLE_BYTES = 512 * 1024 * 1024
+SAMPLE_SEED = 42
+SAMPLE_KEY_COLUMN = "__zen_sample_key__"
+
+# Attached datasets are views over the source file; they expose a stable row
+# id through this hidden column because views have no native rowid.
+ROWID_COLUMN = "__zen_rowid__"
+ATTACH_MODES = {"copy", "attach"}
+ATTACH_MATERIALIZE_AFTER_SCANS = 25
+PAGE_ANCHOR_INTERVAL = 1000
+PAGE_ANCHOR_INDEX_LIMIT = 16
+# Anchors found per keyset chunk while the index is built.
+PAGE_ANCHOR_CHUNK = 256
+# In-memory database for derived tables (sorted snapshots) that must be
+# visible to every cursor but never persisted with the catalog.
+SCRATCH_SCHEMA = "zen_scratch"
+SORT_SNAPSHOT_AFTER_REQUESTS = 3
+SORT_SNAPSHOT_BYTES = 256 * 1024 * 1024
+SORT_SNAPSHOT_TRACKED_VIEWS = 64
+# Snapshots are built one at a time; further views queue behind the build.
+SORT_SNAPSHOT_WORKERS = 1
+# Leading rows read to estimate the average string length of a table.
+ROW_BYTES_SAMPLE_ROWS = 10_000
+# Row ids matching a filter list are kept per data version; 8 bytes per row.
+# A set is built once its filter list is requested again, or right away when
+# it extends a cached list.
+FILTER_SET_BYTES = 64 * 1024 * 1024
+FILTER_SET_AFTER_REQUESTS = 2
+FILTER_SET_TRACKED_LISTS = 64
+# count_mode="estimate" samples tables at least this large instead of counting.
+COUNT_ESTIMATE_MIN_ROWS = 1_000_000
+COUNT_ESTIMATE_SAMPLE_ROWS = 100_000
+COUNT_ESTIMATE_SEED = 42
+COUNT_JOB_LIMIT = 64
+COUNT_MODES = {"exact", "estimate"}
+
+SOURCE_GLOB_CHARS = set("*?[")
+SOURCE_EXTENSIONS = {"parquet": (".parquet",), "csv": (".csv", ".tsv", ".txt")}
+CSV_ESTIMATE_SAMPLE_BYTES = 1024 * 1024
+CSV_SNIFF_CACHE_SIZE = 256
+EXCEL_DIMENSION_SCAN_BYTES = 64 * 1024
+EXCEL_DIMENSION_RE = re.compile(r'<(?:\w+:)?dimension\s+ref="([^"]+)"')
+
+CATALOG_SCHEMA = "zen_meta"
+CATALOG_TABLE = f"{CATALOG_SCHEMA}.datasets"
+STATS_TABLE = f"{CATALOG_SCHEMA}.table_stats"
+PROFILES_TABLE = f"{CATALOG_SCHEMA}.column_profiles"
+STATS_BATCH_COLUMNS = 32
+SPARKLINE_BINS = 8
+SPARKLINE_SAMPLE_ROWS = 2000
+APPROX_DISTINCT_ROW_THRESHOLD = 1_000_000
+READ_ONLY_STATEMENT_TYPES = {
+    duckdb.StatementType.SELECT,
+    duckdb.StatementType.EXPLAIN,
+}
 
 
 def map_duckdb_type(duckdb_type: str) -> str:
@@ -180,10 +294,252 @@ def map_duckdb_type(duckdb_type: str) -> str:
 
 
 class DuckDBEngine(Engine):
-    def __init__(self) -> None:
-        self.conn = duckdb.connect()
+    def __init__(
+        self,
+        database: str = ":memory:",
+        attach_materialize_after: int | None = ATTACH_MATERIALIZE_AFTER_SCANS,
+        approx_distinct_after: int | None = APPROX_DISTINCT_ROW_THRESHOLD,
+        result_cache_bytes: int = RESULT_CACHE_BYTES,
+        page_anchor_interval: int = PAGE_ANCHOR_INTERVAL,
+        sort_snapshot_after: int | None = SORT_SNAPSHOT_AFTER_REQUESTS,
+        sort_snapshot_bytes: int = SORT_SNAPSHOT_BYTES,
+        filter_set_bytes: int = FILTER_SET_BYTES,
+        count_estimate_after: int = COUNT_ESTIMATE_MIN_ROWS,
+        profile_sample_rows: int = PROFILE_FULL_ROW_LIMIT,
+        profile_sample_bytes: int = PROFILE_SAMPLE_BYTES,
+    ) -> None:
+        self._db = duckdb.connect(database)
+        self._local = threading.local()
+        self._cursor_lock = threading.Lock()
+        self._catalog_lock = threading.Lock()
         self.datasets: dict[str, str] = {}  # id -> table_name
+        self._attached: dict[str, dict[str, Any]] = {}  # id -> attach state
+        self._attach_materialize_after = attach_materialize_after
+        self._approx_distinct_after = approx_distinct_after
+        # table -> data version; results are cached per (table, version).
+        # The instance id keeps versions from an earlier process distinct.
+        self._instance_id = uuid.uuid4().hex[:8]
+        self._versions: dict[str, int] = {}
+        self._results = ResultCache(result_cache_bytes)
+        # (table, version, sort, direction, filter signature) -> anchor index
+        self._page_anchor_interval = page_anchor_interval
+        self._anchor_indexes: OrderedDict[tuple[Any, ...], dict[str, Any]] = OrderedDict()
+        self._anchor_lock = threading.Lock()
+        # (table, version, sort keys, filter signature) -> request count and,
+        # once built, the snapshot table; LRU within a byte budget.
+        self._sort_snapshot_after = sort_snapshot_after
+        self._sort_snapshot_bytes = sort_snapshot_bytes
+        self._snapshots: OrderedDict[tuple[Any, ...], dict[str, Any]] = OrderedDict()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_builds = ThreadPoolExecutor(
+            max_workers=SORT_SNAPSHOT_WORKERS, thread_name_prefix="sort-snapshot"
+        )
+        # (table, version) -> estimated bytes per row
+        self._row_widths: dict[tuple[str, int], int] = {}
+        self._row_width_lock = threading.Lock()
+        # (table, version, filter parts) -> scratch table of matching row ids
+        self._filter_set_bytes = filter_set_bytes
+        self._filter_sets: OrderedDict[tuple[Any, ...], dict[str, Any]] = OrderedDict()
+        # Same keys -> request count, or None once the set is known not to fit.
+        self._filter_set_requests: OrderedDict[tuple[Any, ...], int | None] = OrderedDict()
+        self._filter_set_lock = threading.Lock()
+        # (table, version, filter signature) -> exact count running in the background
+        self._count_estimate_after = count_estimate_after
+        self._count_jobs: OrderedDict[tuple[Any, ...], Future] = OrderedDict()
+        self._count_lock = threading.Lock()
+        # (table, version) -> scratch table holding the shared profile sample
+        self._profile_sample_rows = profile_sample_rows
+        self._profile_sample_bytes = profile_sample_bytes
+        self._samples: OrderedDict[tuple[Any, ...], dict[str, Any]] = OrderedDict()
+        self._sample_lock = threading.Lock()
+        self._attach_lock = threading.Lock()
         self._query_lock = threading.Lock()
+        # (path, content hash) -> sniffed CSV dialect and column types
+        self._csv_sniffs: dict[tuple[str, str], dict[str, Any]] = {}
+        self.conn.execute(f"ATTACH ':memory:' AS {SCRATCH_SCHEMA}")
+        self._init_catalog()
+
+    @property
+    def conn(self) -> duckdb.DuckDBPyConnection:
+        # DuckDB connections are not thread-safe; every thread (request loop,
+        # import workers, background jobs) gets its own cursor on the shared
+        # database.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._cursor_lock:
+                conn = self._db.cursor()
+            self._local.conn = conn
+        return conn
+
+    def _init_catalog(self) -> None:
+        self.conn.execute(f"CREATE SCHEMA IF NOT EXISTS {CATALOG_SCHEMA}")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} ("
+            f"id VARCHAR PRIMARY KEY, "
+            f"name VARCHAR NOT NULL, "
+            f"table_name VARCHAR NOT NULL, "
+            f"source_path VARCHAR, "
+            f"format VARCHAR, "
+            f"entity VARCHAR, "
+            f"mode VARCHAR NOT NULL, "
+            f"created_at TIMESTAMP NOT NULL, "
+            f"row_count BIGINT"
+            f")"
+        )
+        self.conn.execute(
+            f"ALTER TABLE {CATALOG_TABLE} ADD COLUMN IF NOT EXISTS content_hash VARCHAR"
+        )
+        # One record per physical table; content-deduplicated aliases share it.
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {STATS_TABLE} ("
+            f"table_name VARCHAR PRIMARY KEY, "
+            f"row_count BIGINT NOT NULL, "
+            f"columns VARCHAR NOT NULL, "
+            f"computed_at TIMESTAMP NOT NULL"
+            f")"
+        )
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {PROFILES_TABLE} ("
+            f"table_name VARCHAR NOT NULL, "
+            f"column_name VARCHAR NOT NULL, "
+            f"profile VARCHAR NOT NULL, "
+            f"computed_at TIMESTAMP NOT NULL, "
+            f"PRIMARY KEY (table_name, column_name)"
+            f")"
+        )
+
+        # Restore lazily: only the id -> table mapping is loaded. Tables and
+        # views already live in the database file, so nothing is re-imported.
+        rows = self.conn.execute(
+            f"SELECT id, table_name, mode FROM {CATALOG_TABLE}"
+        ).fetchall()
+        native_tables = {
+            str(r[0])
+            for r in self.conn.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE schema_name = 'main'"
+            ).fetchall()
+        }
+        attach_states: dict[str, dict[str, Any]] = {}
+        for dataset_id, table_name, mode in rows:
+            self.datasets[dataset_id] = table_name
+            if mode == "attach":
+                # Aliases of one view share its scan counter.
+                self._attached[dataset_id] = attach_states.setdefault(
+                    table_name,
+                    {
+                        "scans": 0,
+                        "materialized": f"{table_name}__native" in native_tables,
+                    },
+                )
+
+    def _register_dataset(
+        self,
+        dataset_id: str,
+        table_name: str,
+        name: str,
+        path: str,
+        file_format: str,
+        entity: str | None,
+        mode: str,
+        content_hash: str | None = None,
+        row_count: int | None = None,
+    ) -> None:
+        if row_count is None:
+            table_sql = self._quote_ident(table_name)
+            row_count = self.conn.execute(
+                f"SELECT COUNT(*) FROM {table_sql}"
+            ).fetchone()[0]
+        with self._catalog_lock:
+            self.conn.execute(
+                f"INSERT INTO {CATALOG_TABLE} "
+                f"(id, name, table_name, source_path, format, entity, mode, "
+                f"created_at, row_count, content_hash) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    dataset_id,
+                    name,
+                    table_name,
+                    path,
+                    file_format,
+                    entity,
+                    mode,
+                    datetime.now(),
+                    row_count,
+                    content_hash,
+                ],
+            )
+            self.datasets[dataset_id] = table_name
+
+    def _find_loaded_content(
+        self, content_hash: str, file_format: str, entity: str | None, mode: str
+    ) -> tuple[str, int] | None:
+        row = self.conn.execute(
+            f"SELECT table_name, row_count FROM {CATALOG_TABLE} "
+            f"WHERE content_hash = ? AND format = ? "
+            f"AND entity IS NOT DISTINCT FROM ? AND mode = ? "
+            f"ORDER BY created_at LIMIT 1",
+            [content_hash, file_format, entity, mode],
+        ).fetchone()
+        if not row:
+            return None
+        return str(row[0]), int(row[1])
+
+    def drop_dataset(self, dataset_id: str) -> bool:
+        table = self.datasets.get(dataset_id)
+        if not table:
+            raise ValueError(f"Dataset not found: {dataset_id}")
+
+        with self._catalog_lock:
+            is_view = dataset_id in self._attached
+            self.conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE id = ?", [dataset_id])
+            self.datasets.pop(dataset_id, None)
+            self._attached.pop(dataset_id, None)
+
+            # Content-deduplicated imports share one table; it is dropped
+            # only when the last alias referencing it is gone.
+            remaining = self.conn.execute(
+                f"SELECT COUNT(*) FROM {CATALOG_TABLE} WHERE table_name = ?", [table]
+            ).fetchone()[0]
+            if remaining:
+                return False
+
+            self.conn.execute(f"DELETE FROM {STATS_TABLE} WHERE table_name = ?", [table])
+            self.conn.execute(f"DELETE FROM {PROFILES_TABLE} WHERE table_name = ?", [table])
+            table_sql = self._quote_ident(table)
+            if is_view:
+                self.conn.execute(f"DROP VIEW IF EXISTS {table_sql}")
+                native_sql = self._quote_ident(f"{table}__native")
+                self.conn.execute(f"DROP TABLE IF EXISTS {native_sql}")
+            else:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table_sql}")
+            self._versions.pop(table, None)
+        self._results.discard(table)
+        self._discard_snapshots(table)
+        self._discard_filter_sets(table)
+        self._discard_samples(table)
+        return True
+
+    def list_datasets(self) -> list[dict]:
+        rows = self.conn.execute(
+            f"SELECT id, name, format, entity, mode, created_at, row_count, table_name "
+            f"FROM {CATALOG_TABLE} ORDER BY created_at"
+        ).fetchall()
+        table_refs: dict[str, int] = {}
+        for r in rows:
+            table_refs[r[7]] = table_refs.get(r[7], 0) + 1
+        return [
+            {
+                "id": r[0],
+                "name": r[1],
+                "format": r[2],
+                "entity": r[3],
+                "mode": r[4],
+                "createdAt": r[5].isoformat(),
+                "rowCount": r[6],
+                "sharedTableRefs": table_refs[r[7]],
+            }
+            for r in rows
+        ]
 
     def load_file(
         self,
@@ -191,20 +547,74 @@ class DuckDBEngine(Engine):
         name: str,
         file_format: str = "csv",
         entity: str | None = None,
+        mode: str = "copy",
+        content_hash: str | None = None,
     ) -> str:
+        if mode not in ATTACH_MODES:
+            raise ValueError(f"Unsupported load mode: {mode}")
+        if mode == "attach" and file_format != "parquet":
+            # CSV scans expose no positional column, so a view would need a
+            # row-number window over the whole file on every page, count and
+            # filter, and numbering it once would be a copy.
+            raise ValueError(
+                "Attach mode is only supported for Parquet files; load CSV in copy mode"
+            )
+
         dataset_id = uuid.uuid4().hex[:12]
+        if content_hash:
+            existing = self._find_loaded_content(content_hash, file_format, entity, mode)
+            if existing and existing[0] in self.datasets.values():
+                # Identical content is already loaded: register a cheap alias.
+                table_name, row_count = existing
+                if mode == "attach":
+                    self._attached[dataset_id] = next(
+                        self._attached[other]
+                        for other, other_table in list(self.datasets.items())
+                        if other_table == table_name
+                    )
+                self._register_dataset(
+                    dataset_id,
+                    table_name,
+                    name,
+                    path,
+                    file_format,
+                    entity,
+                    mode,
+                    content_hash=content_hash,
+                    row_count=row_count,
+                )
+                return dataset_id
+
         table_name = f"ds_{dataset_id}"
         table_sql = self._quote_ident(table_name)
 
-        if file_format == "csv":
-            self.conn.execute(
-                f"CREATE TABLE {table_sql} AS SELECT * FROM read_csv_auto(?, header=true, all_varchar=false)",
-                [path],
+        if self._is_multi_file(path) and file_format not in SOURCE_EXTENSIONS:
+            raise ValueError("Multi-file datasets are only supported for CSV and Parquet")
+
+        if mode == "attach":
+            row_count = self._attach_file(table_name, path)
+            self._attached[dataset_id] = {"scans": 0, "materialized": False}
+            self._register_dataset(
+                dataset_id,
+                table_name,
+                name,
+                path,
+                file_format,
+                entity,
+                mode,
+                content_hash=content_hash,
+                row_count=row_count,
             )
+            return dataset_id
+
+        if file_format == "csv":
+            reader_sql = self._csv_reader_sql(path, content_hash)
+            self.conn.execute(f"CREATE TABLE {table_sql} AS SELECT * FROM {reader_sql}")
         elif file_format == "parquet":
+            # Files are read in order, so each partition lands in contiguous
+            # row groups and zone maps skip the others on filtered scans.
             self.conn.execute(
-                f"CREATE TABLE {table_sql} AS SELECT * FROM read_parquet(?)",
-                [path],
+                f"CREATE TABLE {table_sql} AS SELECT * FROM {self._parquet_reader_sql(path)}"
             )
         elif file_format == "excel":
             if not entity:
@@ -224,88 +634,379 @@ class DuckDBEngine(Engine):
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
 
-        self.datasets[dataset_id] = table_name
+        self._register_dataset(
+            dataset_id,
+            table_name,
+            name,
+            path,
+            file_format,
+            entity,
+            mode,
+            content_hash=content_hash,
+        )
         return dataset_id
 
+    def _attach_file(self, table_name: str, path: str) -> int:
+        """Register ``table_name`` as a view over a Parquet source and return
+        its row count, taken from the footers rather than a scan."""
+        # Row ids are built from parquet virtual columns rather than a
+        # window, so filters on hive partition columns still push down
+        # into the scan and prune whole files.
+        rowid_sql = self._quote_ident(ROWID_COLUMN)
+        self.conn.execute(
+            f"CREATE VIEW {self._quote_ident(table_name)} AS "
+            f"SELECT *, (file_index::BIGINT << 40) + file_row_number AS {rowid_sql} "
+            f"FROM {self._parquet_reader_sql(path)}"
+        )
+        row = self.conn.execute(
+            "SELECT SUM(num_rows) FROM parquet_file_metadata(?)", [path]
+        ).fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
+
+    def resolve_source(
+        self, path: str, file_format: str | None = None
+    ) -> tuple[str, str]:
+        """Normalize a file, directory, or glob into (source path, format).
+
+        A directory becomes a recursive glob over its data files so hive
+        style ``key=value`` subdirectories are picked up as partitions.
+        """
+        formats = [file_format] if file_format else list(SOURCE_EXTENSIONS)
+        for fmt in formats:
+            if fmt not in SOURCE_EXTENSIONS:
+                raise ValueError(f"Unsupported file format for path sources: {fmt}")
+
+        if os.path.isdir(path):
+            for fmt in formats:
+                for ext in SOURCE_EXTENSIONS[fmt]:
+                    pattern = os.path.join(path, "**", f"*{ext}")
+                    if glob.glob(pattern, recursive=True):
+                        return pattern, fmt
+            raise ValueError(f"No CSV or Parquet files found in: {path}")
+
+        matches = glob.glob(path, recursive=True) if self._is_multi_file(path) else []
+        if not matches and not os.path.isfile(path):
+            raise ValueError(f"Source path not found: {path}")
+        probe = (matches or [path])[0].lower()
+        for fmt in formats:
+            if probe.endswith(SOURCE_EXTENSIONS[fmt]):
+                return path, fmt
+        if file_format:
+            return path, file_format
+        raise ValueError(f"Cannot infer file format from: {path}")
+
+    def _is_multi_file(self, path: str) -> bool:
+        return any(ch in SOURCE_GLOB_CHARS for ch in path)
+
+    def _parquet_reader_sql(self, path: str) -> str:
+        path_sql = self._quote_literal(path)
+        if self._is_multi_file(path):
+            return f"read_parquet({path_sql}, hive_partitioning=true)"
+        return f"read_parquet({path_sql})"
+
+    def _note_scan(self, dataset_id: str) -> None:
+        threshold = self._attach_materialize_after
+        with self._attach_lock:
+            state = self._attached.get(dataset_id)
+            if state is None or state["materialized"] or threshold is None:
+                return
+            state["scans"] += 1
+            if state["scans"] < threshold:
+                return
+            state["materialized"] = True
+
+        thread = threading.Thread(
+            target=self._materialize_attached,
+            args=(dataset_id,),
+            name=f"materialize-{dataset_id}",
+            daemon=True,
+        )
+        state["thread"] = thread
+        thread.start()
+
+    def _materialize_attached(self, dataset_id: str) -> None:
+        # The view keeps its name and hidden row id column, so cursors issued
+        # before the swap stay valid; only the view body changes.
+        table = self.datasets[dataset_id]
+        view_sql = self._quote_ident(table)
+        native_sql = self._quote_ident(f"{table}__native")
+        try:
+            self.conn.execute(
+                f"CREATE TABLE {native_sql} AS SELECT * FROM {view_sql} "
+                f"ORDER BY {self._quote_ident(ROWID_COLUMN)}"
+            )
+            self.conn.execute(
+                f"CREATE OR REPLACE VIEW {view_sql} AS SELECT * FROM {native_sql}"
+            )
+        except duckdb.Error:
+            with self._attach_lock:
+                self._attached[dataset_id]["materialized"] = False
+                self._attached[dataset_id]["scans"] = 0
+
     def discover_file_entities(
-        self, path: str, file_format: str
+        self,
+        path: str,
+        file_format: str,
+        exact_counts: bool = False,
+        content_hash: str | None = None,
     ) -> list[dict[str, Any]]:
+        """List importable entities. Row counts come from file metadata unless
+        exact_counts is set; metadata-derived estimates carry rowCountEstimated."""
         if file_format == "csv":
-            row = self.conn.execute(
-                "SELECT COUNT(*) FROM read_csv_auto(?, header=true, all_varchar=false)",
-                [path],
-            ).fetchone()
+            sniff = self.sniff_csv(path, content_hash)
+            if exact_counts:
+                reader_sql = self._csv_reader_sql(path, content_hash)
+                row = self.conn.execute(f"SELECT COUNT(*) FROM {reader_sql}").fetchone()
+                row_count, estimated = int(row[0]) if row else 0, False
+            else:
+                row_count, estimated = self._estimate_csv_rows(path), True
             return [
                 {
                     "name": "data",
                     "kind": "dataset",
-                    "rowCount": int(row[0]) if row else 0,
+                    "rowCount": row_count,
+                    "rowCountEstimated": estimated,
+                    "sniff": sniff,
                 }
             ]
 
         if file_format == "parquet":
+            # The footer row count is exact, so exact_counts needs no scan here.
             row = self.conn.execute(
-                "SELECT COUNT(*) FROM read_parquet(?)", [path]
+                "SELECT SUM(num_rows) FROM parquet_file_metadata(?)", [path]
             ).fetchone()
             return [
                 {
                     "name": "data",
                     "kind": "dataset",
-                    "rowCount": int(row[0]) if row else 0,
+                    "rowCount": int(row[0]) if row and row[0] is not None else 0,
+                    "rowCountEstimated": False,
                 }
             ]
 
         if file_format == "excel":
-            sheets = self._discover_excel_sheets(path)
             entities: list[dict[str, Any]] = []
-            for sheet in sheets:
-                row = self.conn.execute(
-                    "SELECT COUNT(*) FROM read_xlsx(?, sheet = ?)",
-                    [path, sheet],
-                ).fetchone()
+            for sheet, estimate in self._discover_excel_sheets(path):
+                if exact_counts or estimate is None:
+                    row = self.conn.execute(
+                        "SELECT COUNT(*) FROM read_xlsx(?, sheet = ?)",
+                        [path, sheet],
+                    ).fetchone()
+                    row_count, estimated = int(row[0]) if row else 0, False
+                else:
+                    row_count, estimated = estimate, True
                 entities.append(
                     {
                         "name": sheet,
                         "kind": "sheet",
-                        "rowCount": int(row[0]) if row else 0,
+                        "rowCount": row_count,
+                        "rowCountEstimated": estimated,
                     }
                 )
             return entities
 
         if file_format == "sqlite":
-            return self._discover_sqlite_tables(path)
+            return self._discover_sqlite_tables(path, exact_counts)
 
         raise ValueError(f"Unsupported file format: {file_format}")
 
-    def _discover_excel_sheets(self, path: str) -> list[str]:
-        with zipfile.ZipFile(path, "r") as zf:
-            workbook_xml = zf.read("xl/workbook.xml")
-        root = ET.fromstring(workbook_xml)
-        ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
-        sheets = root.findall("m:sheets/m:sheet", ns)
-        return [
-            str(sheet.attrib.get("name", "")).strip()
-            for sheet in sheets
-            if sheet.attrib.get("name")
+    def sniff_csv(self, path: str, content_hash: str | None = None) -> dict[str, Any]:
+        """Detect CSV dialect and column types once; later reads reuse the result."""
+        key = self._csv_sniff_key(path, content_hash)
+        cached = self._csv_sniffs.get(key)
+        if cached is not None:
+            return cached
+
+        row = self.conn.execute(
+            "SELECT Delimiter, Quote, Escape, NewLineDelimiter, Comment, SkipRows, "
+            "HasHeader, Columns, DateFormat, TimestampFormat "
+            "FROM sniff_csv(?, header=true)",
+            [path],
+        ).fetchone()
+
+        def _opt(value: Any) -> str:
+            return "" if value is None or value == "(empty)" else str(value)
+
+        sniff = {
+            "delimiter": _opt(row[0]),
+            "quote": _opt(row[1]),
+            "escape": _opt(row[2]),
+            "newLine": _opt(row[3]),
+            "comment": _opt(row[4]),
+            "skipRows": int(row[5] or 0),
+            "hasHeader": bool(row[6]),
+            "columns": [
+                {"name": str(c["name"]), "type": str(c["type"])} for c in row[7] or []
+            ],
+            "dateFormat": _opt(row[8]),
+            "timestampFormat": _opt(row[9]),
+        }
+        while len(self._csv_sniffs) >= CSV_SNIFF_CACHE_SIZE:
+            self._csv_sniffs.pop(next(iter(self._csv_sniffs)))
+        self._csv_sniffs[key] = sniff
+        return sniff
+
+    def _csv_sniff_key(self, path: str, content_hash: str | None) -> tuple[str, str]:
+        if content_hash:
+            return path, content_hash
+        stat = os.stat(path)
+        return path, f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _csv_reader_sql(self, path: str, content_hash: str | None = None) -> str:
+        """Table function SQL for a CSV. Uses the cached sniff when available so
+        DuckDB skips dialect and type detection."""
+        path_sql = self._quote_literal(path)
+        try:
+            sniff = self._csv_sniffs.get(self._csv_sniff_key(path, content_hash))
+        except OSError:
+            sniff = None
+        if not sniff or not sniff["columns"]:
+            hive_sql = ", hive_partitioning=true" if self._is_multi_file(path) else ""
+            return f"read_csv_auto({path_sql}, header=true, all_varchar=false{hive_sql})"
+
+        lit = self._quote_literal
+        columns_sql = ", ".join(
+            f"{lit(c['name'])}: {lit(c['type'])}" for c in sniff["columns"]
+        )
+        options = [
+            "auto_detect=false",
+            f"delim={lit(sniff['delimiter'])}",
+            f"quote={lit(sniff['quote'])}",
+            f"escape={lit(sniff['escape'])}",
+            f"skip={int(sniff['skipRows'])}",
+            f"header={'true' if sniff['hasHeader'] else 'false'}",
+            f"columns={{{columns_sql}}}",
         ]
+        if sniff["newLine"]:
+            options.append(f"new_line={lit(sniff['newLine'])}")
+        if sniff["comment"]:
+            options.append(f"comment={lit(sniff['comment'])}")
+        if sniff["dateFormat"]:
+            options.append(f"dateformat={lit(sniff['dateFormat'])}")
+        if sniff["timestampFormat"]:
+            options.append(f"timestampformat={lit(sniff['timestampFormat'])}")
+        return f"read_csv({path_sql}, {', '.join(options)})"
+
+    def _estimate_csv_rows(self, path: str) -> int:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as fh:
+            head = fh.read(CSV_ESTIMATE_SAMPLE_BYTES)
+        if not head:
+            return 0
+
+        lines = head.count(b"\n")
+        if len(head) >= file_size:
+            if not head.endswith(b"\n"):
+                lines += 1
+            return max(0, lines - 1)
+        if lines <= 1:
+            return 1
+
+        # Extrapolate from the average line length of the sampled data lines.
+        header_end = head.index(b"\n") + 1
+        sampled = head[header_end : head.rindex(b"\n") + 1]
+        avg_line = len(sampled) / max(1, sampled.count(b"\n"))
+        return max(1, round((file_size - header_end) / avg_line))
+
+    def _discover_excel_sheets(self, path: str) -> list[tuple[str, int | None]]:
+        """Return (sheet name, estimated data rows) from workbook metadata."""
+        ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+        pkg_ns = {"p": "http://schemas.openxmlformats.org/package/2006/relationships"}
 
-    def _discover_sqlite_tables(self, path: str) -> list[dict[str, Any]]:
+        with zipfile.ZipFile(path, "r") as zf:
+            root = ET.fromstring(zf.read("xl/workbook.xml"))
+            targets: dict[str, str] = {}
+            if "xl/_rels/workbook.xml.rels" in zf.namelist():
+                rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+                for rel in rels.findall("p:Relationship", pkg_ns):
+                    target = str(rel.attrib.get("Target", ""))
+                    if target.startswith("/"):
+                        target = target.lstrip("/")
+                    else:
+                        target = f"xl/{target}"
+                    targets[str(rel.attrib.get("Id", ""))] = target
+
+            sheets: list[tuple[str, int | None]] = []
+            for sheet in root.findall("m:sheets/m:sheet", ns):
+                name = str(sheet.attrib.get("name", "")).strip()
+                if not name:
+                    continue
+                part = targets.get(str(sheet.attrib.get(f"{{{rel_ns}}}id", "")))
+                sheets.append((name, self._excel_dimension_rows(zf, part)))
+        return sheets
+
+    def _excel_dimension_rows(self, zf: zipfile.ZipFile, part: str | None) -> int | None:
+        # <dimension> sits near the top of the sheet part, so only the head of
+        # the (possibly huge) XML stream is read.
+        if not part:
+            return None
+        try:
+            with zf.open(part) as fh:
+                head = fh.read(EXCEL_DIMENSION_SCAN_BYTES).decode("utf-8", "ignore")
+        except KeyError:
+            return None
+        match = EXCEL_DIMENSION_RE.search(head)
+        if not match:
+            return None
+        rows = [int(r) for r in re.findall(r"[0-9]+", match.group(1))]
+        if not rows:
+            return None
+        # First row is treated as the header, matching read_xlsx defaults.
+        return max(0, max(rows) - min(rows))
+
+    def _discover_sqlite_tables(
+        self, path: str, exact_counts: bool = False
+    ) -> list[dict[str, Any]]:
         conn = sqlite3.connect(path)
         try:
             rows = conn.execute(
                 "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
             ).fetchall()
+            stat_rows: dict[str, int] = {}
+            if not exact_counts:
+                has_stat = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'"
+                ).fetchone()
+                if has_stat:
+                    for tbl, stat in conn.execute(
+                        "SELECT tbl, stat FROM sqlite_stat1"
+                    ).fetchall():
+                        first = str(stat or "").split(" ")[0]
+                        if first.isdigit():
+                            stat_rows[str(tbl)] = max(
+                                stat_rows.get(str(tbl), 0), int(first)
+                            )
+
             out: list[dict[str, Any]] = []
             for (table_name,) in rows:
                 safe_table = str(table_name).replace('"', '""')
-                count_row = conn.execute(
-                    f'SELECT COUNT(*) FROM "{safe_table}"'
-                ).fetchone()
+                estimated = not exact_counts
+                row_count: int | None = None
+                if not exact_counts:
+                    row_count = stat_rows.get(str(table_name))
+                    if row_count is None:
+                        # MAX(rowid) walks one b-tree edge; it overestimates
+                        # when rows were deleted. WITHOUT ROWID tables fall back.
+                        try:
+                            max_row = conn.execute(
+                                f'SELECT MAX(rowid) FROM "{safe_table}"'
+                            ).fetchone()
+                            row_count = int(max_row[0]) if max_row and max_row[0] else 0
+                        except sqlite3.OperationalError:
+                            row_count = None
+                if row_count is None:
+                    count_row = conn.execute(
+                        f'SELECT COUNT(*) FROM "{safe_table}"'
+                    ).fetchone()
+                    row_count = int(count_row[0]) if count_row else 0
+                    estimated = False
                 out.append(
                     {
                         "name": str(table_name),
                         "kind": "table",
-                        "rowCount": int(count_row[0]) if count_row else 0,
+                        "rowCount": row_count,
+                        "rowCountEstimated": estimated,
                     }
                 )
             return out
@@ -316,152 +1017,265 @@ class DuckDBEngine(Engine):
         self.conn.execute("INSTALL sqlite")
         self.conn.execute("LOAD sqlite")
 
+    def dataset_version(self, dataset_id: str) -> str:
+        table = self.datasets.get(dataset_id)
+        if not table:
+            raise ValueError(f"Dataset not found: {dataset_id}")
+        return f"{self._instance_id}-{table}-{self._versions.get(table, 0)}"
+
+    def _cached(self, dataset_id: str, key: tuple[Any, ...], compute: Any) -> Any:
+        table = self.datasets.get(dataset_id)
+        if not table:
+            raise ValueError(f"Dataset not found: {dataset_id}")
+        version = self._versions.get(table, 0)
+        return self._results.get_or_compute((table, version, *key), compute)
+
+    def _bump_version(self, table: str | None = None) -> None:
+        """Mark one table (or every table) as changed, dropping cached results."""
+        with self._catalog_lock:
+            tables = [table] if table else list(set(self.datasets.values()))
+            for name in tables:
+                self._versions[name] = self._versions.get(name, 0) + 1
+        self._results.discard(table)
+        self._discard_snapshots(table)
+        self._discard_filter_sets(table)
+        self._discard_samples(table)
+
     def get_schema(self, dataset_id: str) -> dict:
+        return self._cached(
+            dataset_id, ("schema",), lambda: self._compute_schema(dataset_id)
+        )
+
+    def _compute_schema(self, dataset_id: str) -> dict:
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
 
-        cols_result = self.conn.execute(f"PRAGMA table_info({table_sql})").fetchall()
-        row_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_sql}").fetchone()[0]
+        cols_result = self._table_columns(table)
+        row_count, column_stats = self._get_table_stats(table, cols_result)
 
         col_type_map: dict[str, str] = {
-            col_name: map_duckdb_type(col_type)
-            for _, col_name, col_type, *_ in cols_result
+            col_name: map_duckdb_type(col_type) for col_name, col_type in cols_result
         }
         sparkline_map = self._build_schema_sparklines(
-            table_sql, col_type_map, row_count
+            dataset_id, table, col_type_map, row_count
         )
 
         columns = []
-        for _, col_name, col_type, *_ in cols_result:
-            col_sql = self._quote_ident(col_name)
-            stats = self.conn.execute(
-                f"SELECT COUNT(*) FILTER (WHERE {col_sql} IS NULL), COUNT(DISTINCT {col_sql}) FROM {table_sql}"
-            ).fetchone()
-
+        for col_name, col_type in cols_result:
+            stats = column_stats[col_name]
             columns.append(
                 {
                     "name": col_name,
                     "type": map_duckdb_type(col_type),
-                    "nullCount": stats[0],
+                    "nullCount": stats["nullCount"],
                     "totalCount": row_count,
-                    "uniqueCount": stats[1],
+                    "uniqueCount": stats["uniqueCount"],
+                    "uniqueCountApprox": stats.get("uniqueCountApprox", False),
                     "sparkline": sparkline_map.get(col_name, []),
                 }
             )
 
         return {"columns": columns, "rowCount": row_count}
 
+    def _get_table_stats(
+        self, table: str, cols_result: list[tuple[str, str]]
+    ) -> tuple[int, dict[str, dict[str, Any]]]:
+        """Row count and per-column null/distinct counts, served from the
+        stored stats record when it still matches the table's columns."""
+        row = self.conn.execute(
+            f"SELECT row_count, columns FROM {STATS_TABLE} WHERE table_name = ?",
+            [table],
+        ).fetchone()
+        if row:
+            stored = json.loads(row[1])
+            if [(c["name"], c["type"]) for c in stored] == cols_result:
+                return int(row[0]), {c["name"]: c for c in stored}
+
+        row_count, computed = self._compute_table_stats(table, cols_result)
+        with self._catalog_lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {STATS_TABLE} "
+                f"(table_name, row_count, columns, computed_at) VALUES (?, ?, ?, ?)",
+                [table, row_count, json.dumps(computed), datetime.now()],
+            )
+        return row_count, {c["name"]: c for c in computed}
+
+    def _compute_table_stats(
+        self, table: str, cols_result: list[tuple[str, str]]
+    ) -> tuple[int, list[dict[str, Any]]]:
+        # All columns share a scan; batching bounds the number of concurrent
+        # distinct-count hash tables on very wide tables.
+        table_sql = self._quote_ident(table)
+        row_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_sql}").fetchone()[0]
+        # Exact distinct counts keep every value in a hash table; past the
+        # threshold a HyperLogLog sketch keeps memory flat.
+        approx = (
+            self._approx_distinct_after is not None
+            and row_count > self._approx_distinct_after
+        )
+        distinct_fn = "approx_count_distinct({})" if approx else "COUNT(DISTINCT {})"
+
+        computed: list[dict[str, Any]] = []
+        for i in range(0, len(cols_result), STATS_BATCH_COLUMNS):
+            batch = cols_result[i : i + STATS_BATCH_COLUMNS]
+            select_parts = []
+            for col_name, _ in batch:
+                col_sql = self._quote_ident(col_name)
+                select_parts.append(f"COUNT({col_sql})")
+                select_parts.append(distinct_fn.format(col_sql))
+            values = self.conn.execute(
+                f"SELECT {', '.join(select_parts)} FROM {table_sql}"
+            ).fetchone()
+            for j, (col_name, col_type) in enumerate(batch):
+                non_null = int(values[2 * j])
+                computed.append(
+                    {
+                        "name": col_name,
+                        "type": col_type,
+                        "nullCount": row_count - non_null,
+                        # The sketch can overshoot on small columns.
+                        "uniqueCount": min(int(values[2 * j + 1]), non_null),
+                        "uniqueCountApprox": approx,
+                    }
+                )
+        return row_count, computed
+
+    def count_distinct(self, dataset_id: str, column: str) -> dict:
+        table = self._get_table(dataset_id)
+        col_meta = self._get_column_meta(table)
+        if column not in col_meta:
+            raise ValueError(f"Column not found: {column}")
+
+        table_sql = self._quote_ident(table)
+        col_sql = self._quote_ident(column)
+        unique_count = int(
+            self.conn.execute(
+                f"SELECT COUNT(DISTINCT {col_sql}) FROM {table_sql}"
+            ).fetchone()[0]
+        )
+
+        # Fold the exact value into the stored record so headers show it too.
+        with self._catalog_lock:
+            row = self.conn.execute(
+                f"SELECT columns FROM {STATS_TABLE} WHERE table_name = ?", [table]
+            ).fetchone()
+            if row:
+                stored = json.loads(row[0])
+                for entry in stored:
+                    if entry["name"] == column:
+                        entry["uniqueCount"] = unique_count
+                        entry["uniqueCountApprox"] = False
+                self.conn.execute(
+                    f"UPDATE {STATS_TABLE} SET columns = ? WHERE table_name = ?",
+                    [json.dumps(stored), table],
+                )
+        self._bump_version(table)
+        return {"column": column, "uniqueCount": unique_count, "uniqueCountApprox": False}
+
+    def _may_modify_data(self, sql: str) -> bool:
+        try:
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error:
+            return True
+        return any(st.type not in READ_ONLY_STATEMENT_TYPES for st in statements)
+
+    def _invalidate_table_stats(self, table: str | None = None) -> None:
+        with self._catalog_lock:
+            for stats_table in (STATS_TABLE, PROFILES_TABLE):
+                if table is None:
+                    self.conn.execute(f"DELETE FROM {stats_table}")
+                else:
+                    self.conn.execute(
+                        f"DELETE FROM {stats_table} WHERE table_name = ?", [table]
+                    )
+
     def _build_schema_sparklines(
         self,
-        table_sql: str,
+        dataset_id: str,
+        table: str,
         col_type_map: dict[str, str],
         row_count: int,
     ) -> dict[str, list[int]]:
         if row_count <= 0 or not col_type_map:
             return {name: [] for name in col_type_map}
 
-        sample_size = min(2000, row_count)
-        if row_count > sample_size:
-            sample_sql = f"SELECT * FROM {table_sql} USING SAMPLE {sample_size} ROWS"
+        bins = SPARKLINE_BINS
+        table_sql = self._quote_ident(table)
+        if row_count > SPARKLINE_SAMPLE_ROWS:
+            # Ordering by a seeded hash of the row id picks the same rows on
+            # every call, so headers do not change between reloads. Those rows
+            # are a prefix of the shared profile sample, which is read when a
+            # profile has already built it but never built just for headers.
+            shared = (
+                self._shared_sample(dataset_id, table, row_count, build=False)
+                if self._profile_sample_rows >= SPARKLINE_SAMPLE_ROWS
+                else None
+            )
+            if shared:
+                source_sql, key_sql = shared["sql"], self._quote_ident(SAMPLE_KEY_COLUMN)
+            else:
+                source_sql, key_sql = table_sql, self._sample_key_sql(dataset_id)
+            sample_sql = (
+                f"SELECT * FROM {source_sql} "
+                f"ORDER BY {key_sql} LIMIT {SPARKLINE_SAMPLE_ROWS}"
+            )
         else:
-            sample_sql = f"SELECT * FROM {table_sql} LIMIT {sample_size}"
+            sample_sql = f"SELECT * FROM {table_sql}"
 
-        result = self.conn.execute(sample_sql)
-        sample_rows = result.fetchall()
-        if not sample_rows:
-            return {name: [] for name in col_type_map}
+        bound_parts: list[str] = []
+        spark_parts: list[str] = []
+        for i, (col_name, col_type) in enumerate(col_type_map.items()):
+            col_sql = self._quote_ident(col_name)
+            if col_type == "boolean":
+                spark_parts.append(
+                    f"CASE WHEN COUNT({col_sql}) = 0 THEN []::BIGINT[] "
+                    f"ELSE [COUNT(*) FILTER (WHERE NOT {col_sql}), "
+                    f"COUNT(*) FILTER (WHERE {col_sql})] END"
+                )
+                continue
 
-        col_names = [desc[0] for desc in result.description]
-        values_by_col: dict[str, list[Any]] = {name: [] for name in col_names}
-        for row in sample_rows:
-            for i, col_name in enumerate(col_names):
-                values_by_col[col_name].append(row[i])
-
-        sparklines: dict[str, list[int]] = {}
-        for col_name, col_type in col_type_map.items():
-            values = values_by_col.get(col_name, [])
-            sparklines[col_name] = self._compute_sparkline(values, col_type)
-        return sparklines
-
-    def _compute_sparkline(
-        self, values: list[Any], col_type: str, bins: int = 8
-    ) -> list[int]:
-        non_null = [v for v in values if v is not None]
-        if not non_null:
-            return []
-
-        if col_type in {"integer", "float"}:
-            numeric = [
-                float(v)
-                for v in non_null
-                if isinstance(v, (int, float)) and not isinstance(v, bool)
-            ]
-            if not numeric:
-                return []
-            unique_vals = sorted(set(numeric))
-            if len(unique_vals) <= bins:
-                freq: dict[float, int] = {}
-                for v in numeric:
-                    freq[v] = freq.get(v, 0) + 1
-                return [freq[v] for v in unique_vals]
-            return self._bin_numeric(numeric, bins)
-
-        if col_type == "date":
-            dates: list[float] = []
-            for v in non_null:
-                if isinstance(v, datetime):
-                    dates.append(v.timestamp())
-                elif isinstance(v, date):
-                    dates.append(datetime(v.year, v.month, v.day).timestamp())
-                else:
-                    try:
-                        dates.append(datetime.fromisoformat(str(v)).timestamp())
-                    except ValueError:
-                        continue
-            if not dates:
-                return []
-            unique_dates = sorted(set(dates))
-            if len(unique_dates) <= bins:
-                freq: dict[float, int] = {}
-                for v in dates:
-                    freq[v] = freq.get(v, 0) + 1
-                return [freq[v] for v in unique_dates]
-            return self._bin_numeric(dates, bins)
-
-        if col_type == "boolean":
-            true_count = sum(1 for v in non_null if bool(v))
-            false_count = len(non_null) - true_count
-            return [false_count, true_count]
-
-        counts: dict[str, int] = {}
-        for v in non_null:
-            key = str(v)
-            counts[key] = counts.get(key, 0) + 1
-        if len(counts) <= bins:
-            ordered_keys = sorted(counts.keys())
-            return [counts[k] for k in ordered_keys]
-        return sorted(counts.values(), reverse=True)[:bins]
-
-    def _bin_numeric(self, values: list[float], bins: int) -> list[int]:
-        if not values:
-            return []
-        lo = min(values)
-        hi = max(values)
-        if lo == hi:
-            out = [0] * bins
-            out[bins // 2] = len(values)
-            return out
+            if col_type in {"integer", "float"}:
+                value_sql = f"{col_sql}::DOUBLE"
+            elif col_type == "date":
+                value_sql = f"epoch({col_sql})::DOUBLE"
+            else:
+                value_sql = f"{col_sql}::VARCHAR"
+            bound_parts.append(f"COUNT(DISTINCT {value_sql}) AS d{i}")
+
+            # Few distinct values: one count per value in sorted order.
+            # Otherwise numbers and dates use equal-width bins and strings
+            # keep the largest counts.
+            if col_type == "string":
+                many_sql = (
+                    f"list_slice(list_reverse_sort(map_values(histogram({value_sql}))), "
+                    f"1, {bins})"
+                )
+            else:
+                bound_parts.append(f"MIN({value_sql}) AS lo{i}, MAX({value_sql}) AS hi{i}")
+                bucket_sql = (
+                    f"LEAST(GREATEST(FLOOR(({value_sql} - lo{i}) / "
+                    f"((hi{i} - lo{i}) / {bins})), 0), {bins - 1})::BIGINT"
+                )
+                many_sql = (
+                    f"list_transform(range({bins}), "
+                    f"b -> coalesce(histogram({bucket_sql}) "
+                    f"FILTER (WHERE {value_sql} IS NOT NULL)[b], 0))"
+                )
+            spark_parts.append(
+                f"CASE WHEN ANY_VALUE(d{i}) <= {bins} "
+                f"THEN map_values(histogram({value_sql})) ELSE {many_sql} END"
+            )
 
-        width = (hi - lo) / bins
-        out = [0] * bins
-        for v in values:
-            idx = int((v - lo) / width)
-            if idx >= bins:
-                idx = bins - 1
-            if idx < 0:
-                idx = 0
-            out[idx] += 1
-        return out
+        bounds_sql = ", ".join(bound_parts) or "1 AS _"
+        row = self.conn.execute(
+            f"WITH sample AS MATERIALIZED ({sample_sql}), "
+            f"bounds AS (SELECT {bounds_sql} FROM sample) "
+            f"SELECT {', '.join(spark_parts)} FROM sample, bounds"
+        ).fetchone()
+        return {
+            name: [int(v) for v in (row[i] or [])]
+            for i, name in enumerate(col_type_map)
+        }
 
     def get_page(
         self,
@@ -472,118 +1286,969 @@ class DuckDBEngine(Engine):
         sort_direction: str | None,
         filters: list[dict],
         cursor: str | None = None,
+        sort: list[dict] | None = None,
+        columns: list[str] | None = None,
+        column_offset: int = 0,
+        column_limit: int | None = None,
+        encoding: str = "rows",
+        count_mode: str = "exact",
     ) -> dict:
+        self._check_encoding(encoding)
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"Unsupported count mode: {count_mode}")
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
         col_meta = self._get_column_meta(table)
+        rowid_sql = self._rowid_sql(dataset_id)
+        sort_keys = self._sort_keys(sort_column, sort_direction, sort, col_meta)
+        page_columns, total_columns = self._page_columns(
+            col_meta, columns, column_offset, column_limit
+        )
 
-        if sort_column is not None and sort_column not in col_meta:
-            raise ValueError(f"Invalid sort column: {sort_column}")
+        filter_parts = [self._build_filter_clause(f, col_meta) for f in filters]
+        total_rows = self._count_rows(dataset_id, table_sql, [])
 
-        sort_dir = "DESC" if sort_direction == "desc" else "ASC"
+        # Estimation only applies while nothing exact is at hand; building the
+        # filter set is itself the full scan it is meant to avoid.
+        estimate: dict[str, Any] | None = None
+        filter_set = self._filter_set(
+            dataset_id, table, filter_parts, filters, build=count_mode == "exact"
+        )
+        if (
+            count_mode == "estimate"
+            and filter_parts
+            and filter_set is None
+            and total_rows >= self._count_estimate_after
+            and self._known_count(dataset_id, filter_parts) is None
+        ):
+            estimate = self._estimate_count(table_sql, filter_parts, total_rows)
+            self._schedule_exact_count(dataset_id, table, filter_parts, filters)
+        # The first page stops after page_size matches of the plain predicates,
+        # which also keep partition and filter pushdown; later pages read the
+        # set instead of evaluating every predicate again.
+        page_set = filter_set if cursor or page > 0 else None
+        query_parts = [(page_set["clause"], [])] if page_set else filter_parts
+        filter_clauses = [clause for clause, _ in query_parts]
+        filter_params = [p for _, params in query_parts for p in params]
+
+        if estimate is not None:
+            filtered_rows = estimate["rows"]
+        elif filter_parts:
+            # A count cached before the set was built stays authoritative.
+            known = self._known_count(dataset_id, filter_parts)
+            if known is not None:
+                filtered_rows = known
+            elif filter_set:
+                filtered_rows = filter_set["rows"]
+            else:
+                filtered_rows = self._count_rows(dataset_id, table_sql, filter_parts)
+        else:
+            filtered_rows = total_rows
 
-        filter_clauses: list[str] = []
-        filter_params: list[Any] = []
-        for f in filters:
-            clause, p = self._build_filter_clause(f, col_meta)
-            filter_clauses.append(clause)
-            filter_params.extend(p)
+        # Repeatedly requested sorted views are served from a materialized
+        # snapshot, where a page is a range of its dense position column.
+        snapshot = self._sort_snapshot(
+            dataset_id, table, sort_keys, filter_parts, filtered_rows
+        )
+        position = self._cursor_position(cursor, snapshot, sort_keys) if snapshot else None
+        if snapshot and (not cursor or position is not None):
+            backward = bool(position and position[1])
+            started = bool(cursor or page > 0)
+            if position is not None:
+                where_query_sql = f'WHERE "__zen_pos__" {"<" if backward else ">"} ?'
+                query_params: list[Any] = [position[0]]
+            else:
+                where_query_sql = 'WHERE "__zen_pos__" >= ?'
+                query_params = [page * page_size]
+            source_sql = f"{SCRATCH_SCHEMA}.{self._quote_ident(snapshot['name'])}"
+            order_sql = f'ORDER BY "__zen_pos__" {"DESC" if backward else "ASC"}'
+            hidden_sql = [
+                f'{self._quote_ident(ROWID_COLUMN)} AS "__rowid__"',
+                '"__zen_pos__" AS "__pos__"',
+            ]
+        else:
+            snapshot = None
+            # Page jumps without a cursor start from the nearest indexed anchor
+            # and skip at most one anchor interval of rows.
+            start_cursor, skip_rows = cursor, 0
+            if not cursor and page > 0:
+                start_cursor, skip_rows = self._page_anchor(
+                    dataset_id, table, sort_keys, filter_parts, page * page_size
+                )
+            started = bool(start_cursor or skip_rows)
+
+            keyset_clause = ""
+            keyset_params: list[Any] = []
+            backward = False
+            if start_cursor:
+                keyset_clause, keyset_params, backward = self._build_cursor_predicate(
+                    cursor=start_cursor,
+                    sort_keys=sort_keys,
+                    col_meta=col_meta,
+                    rowid_sql=rowid_sql,
+                )
 
-        where_filter_sql = (
-            f"WHERE {' AND '.join(filter_clauses)}" if filter_clauses else ""
+            query_clauses = list(filter_clauses)
+            if keyset_clause:
+                query_clauses.append(keyset_clause)
+            where_query_sql = (
+                f"WHERE {' AND '.join(query_clauses)}" if query_clauses else ""
+            )
+            query_params = [*filter_params, *keyset_params]
+            source_sql = table_sql
+
+            # Backward pages read the reversed order from the anchor, then flip.
+            order_sql = f"ORDER BY {self._order_sql(sort_keys, rowid_sql, backward)}"
+            hidden_sql = [f'{rowid_sql} AS "__rowid__"']
+
+        # Only the projected columns are scanned; sort keys ride along under
+        # positional aliases so cursors work even when they are not shown.
+        select_sql = ", ".join(
+            [self._quote_ident(col) for col in page_columns]
+            + [
+                f'{self._quote_ident(col)} AS "__sort_{i}__"'
+                for i, (col, _) in enumerate(sort_keys)
+            ]
+            + hidden_sql
         )
-        filtered_rows = self.conn.execute(
-            f"SELECT COUNT(*) FROM {table_sql} {where_filter_sql}",
-            filter_params,
-        ).fetchone()[0]
-        total_rows = self.conn.execute(f"SELECT COUNT(*) FROM {table_sql}").fetchone()[
-            0
-        ]
+        sql = (
+            f"SELECT {select_sql} "
+            f"FROM {source_sql} {where_query_sql} {order_sql} LIMIT ? OFFSET ?"
+        )
+        params = [*query_params, page_size + 1, 0 if snapshot else skip_rows]
+        try:
+            result = self.conn.execute(sql, params)
+        except duckdb.CatalogException:
+            if snapshot is None and page_set is None:
+                raise
+            # Evicted between lookup and query; rebuild or use the keyset path.
+            if snapshot is not None:
+                self._forget_snapshot(snapshot)
+            if page_set is not None:
+                self._forget_filter_set(page_set)
+            return self.get_page(
+                dataset_id, page, page_size, sort_column, sort_direction, filters,
+                cursor=cursor, sort=sort, columns=columns, column_offset=column_offset,
+                column_limit=column_limit, encoding=encoding, count_mode=count_mode,
+            )
 
-        keyset_clause = ""
-        keyset_params: list[Any] = []
-        if cursor:
-            keyset_clause, keyset_params = self._build_cursor_predicate(
-                cursor=cursor,
-                sort_column=sort_column,
-                sort_dir=sort_dir,
-                col_meta=col_meta,
+        # Cursors only need the hidden key values of the first and last row.
+        width = len(page_columns)
+        boundary: list[tuple[Any, ...]] = []
+        if encoding == COLUMNAR_ENCODING:
+            fetched = fetch_columns(result)
+            has_more = len(fetched[0][2]) > page_size
+            fetched = [
+                (name, duck_type, array[:page_size][::-1] if backward else array[:page_size])
+                for name, duck_type, array in fetched
+            ]
+            count = len(fetched[0][2])
+            if count:
+                boundary = [
+                    tuple(scalar(array, i, duck_type) for _, duck_type, array in fetched[width:])
+                    for i in (0, count - 1)
+                ]
+            body: dict[str, Any] = encode_columns(fetched[:width])
+            del body["rowCount"]
+        else:
+            raw_rows = result.fetchall()
+            has_more = len(raw_rows) > page_size
+            page_rows = raw_rows[:page_size]
+            if backward:
+                page_rows.reverse()
+
+            rows: list[dict[str, Any]] = []
+            for row in page_rows:
+                row_dict: dict[str, Any] = {}
+                for idx, col in enumerate(page_columns):
+                    val = row[idx]
+                    if val is not None and not isinstance(val, (str, int, float, bool)):
+                        val = str(val)
+                    row_dict[col] = val
+                rows.append(row_dict)
+            if page_rows:
+                boundary = [page_rows[0][width:], page_rows[-1][width:]]
+            body = {"rows": rows, "columns": page_columns}
+
+        # A backward page always has the anchor row after it; a forward page
+        # has rows before it whenever it did not start at the top.
+        more_after = has_more if not backward else True
+        more_before = has_more if backward else started
+        next_cursor: str | None = None
+        prev_cursor: str | None = None
+        if boundary:
+            key_names = [col for col, _ in sort_keys] + ["__rowid__", "__pos__"]
+            snapshot_name = snapshot["name"] if snapshot else None
+            if more_after:
+                next_cursor = self._row_cursor(
+                    boundary[-1], key_names, sort_keys, snapshot=snapshot_name
+                )
+            if more_before:
+                prev_cursor = self._row_cursor(
+                    boundary[0], key_names, sort_keys, backward=True, snapshot=snapshot_name
+                )
+
+        total_pages = max(1, (filtered_rows + page_size - 1) // page_size)
+        return {
+            **body,
+            "totalColumns": total_columns,
+            "columnOffset": column_offset,
+            "totalRows": total_rows,
+            "filteredRows": filtered_rows,
+            "filteredRowsExact": estimate is None,
+            **(
+                {
+                    "filteredRowsEstimate": estimate["rows"],
+                    "filteredRowsConfidence": estimate["confidence"],
+                }
+                if estimate is not None
+                else {}
+            ),
+            "page": page,
+            "pageSize": page_size,
+            "totalPages": total_pages,
+            "nextCursor": next_cursor,
+            "prevCursor": prev_cursor,
+        }
+
+    def _page_anchor(
+        self,
+        dataset_id: str,
+        table: str,
+        sort_keys: list[tuple[str, str]],
+        filter_parts: list[tuple[str, list[Any]]],
+        offset: int,
+    ) -> tuple[str | None, int]:
+        """Cursor of the closest indexed row before offset, plus the rows to
+        skip after it. Builds the anchor index in the background on first use."""
+        key = (
+            table,
+            self._versions.get(table, 0),
+            tuple(sort_keys),
+            self._filter_signature(filter_parts),
+        )
+        with self._anchor_lock:
+            index = self._anchor_indexes.get(key)
+            if index is None:
+                index = {"anchors": [], "complete": False, "cancelled": False}
+                self._anchor_indexes[key] = index
+                while len(self._anchor_indexes) > PAGE_ANCHOR_INDEX_LIMIT:
+                    _, evicted = self._anchor_indexes.popitem(last=False)
+                    evicted["cancelled"] = True
+                thread = threading.Thread(
+                    target=self._build_anchor_index,
+                    args=(index, dataset_id, sort_keys, filter_parts),
+                    name=f"anchors-{dataset_id}",
+                    daemon=True,
+                )
+                index["thread"] = thread
+                thread.start()
+            else:
+                self._anchor_indexes.move_to_end(key)
+            # anchors[i] is the cursor after row (i + 1) * interval - 1.
+            usable = min(offset // self._page_anchor_interval, len(index["anchors"]))
+            if usable == 0:
+                return None, offset
+            return (
+                index["anchors"][usable - 1],
+                offset - usable * self._page_anchor_interval,
             )
 
-        query_clauses = list(filter_clauses)
-        if keyset_clause:
-            query_clauses.append(keyset_clause)
-        where_query_sql = (
-            f"WHERE {' AND '.join(query_clauses)}" if query_clauses else ""
+    def _build_anchor_index(
+        self,
+        index: dict[str, Any],
+        dataset_id: str,
+        sort_keys: list[tuple[str, str]],
+        filter_parts: list[tuple[str, list[Any]]],
+    ) -> None:
+        # Keyset-walk the sorted view one chunk of anchors at a time: each
+        # query top-N sorts only the next chunk after the last anchor, so
+        # early anchors are usable long before the whole view is sorted.
+        table = self.datasets.get(dataset_id, "")
+        table_sql = self._quote_ident(table)
+        rowid_sql = self._rowid_sql(dataset_id)
+        interval = self._page_anchor_interval
+        keys_sql = "".join(f"{self._quote_ident(col)}, " for col, _ in sort_keys)
+        col_names = [col for col, _ in sort_keys] + ["__rowid__"]
+        filter_params = [p for _, clause_params in filter_parts for p in clause_params]
+        alias_order_sql = self._order_sql(sort_keys, '"__rowid__"')
+
+        try:
+            col_meta = self._get_column_meta(table)
+            last: str | None = None
+            while not index["cancelled"]:
+                clauses = [clause for clause, _ in filter_parts]
+                params = list(filter_params)
+                if last is not None:
+                    keyset_sql, keyset_params, _ = self._build_cursor_predicate(
+                        last, sort_keys, col_meta, rowid_sql
+                    )
+                    clauses.append(keyset_sql)
+                    params.extend(keyset_params)
+                where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+                rows = self.conn.execute(
+                    f'SELECT {keys_sql}"__rowid__" FROM ('
+                    f'SELECT {keys_sql}{rowid_sql} AS "__rowid__" FROM {table_sql} '
+                    f"{where_sql} ORDER BY {self._order_sql(sort_keys, rowid_sql)} "
+                    f"LIMIT {interval * PAGE_ANCHOR_CHUNK}"
+                    f") QUALIFY ROW_NUMBER() OVER (ORDER BY {alias_order_sql}) % {interval} = 0 "
+                    f"ORDER BY {alias_order_sql}",
+                    params,
+                ).fetchall()
+                tokens = [self._row_cursor(row, col_names, sort_keys) for row in rows]
+                with self._anchor_lock:
+                    index["anchors"].extend(tokens)
+                if len(tokens) < PAGE_ANCHOR_CHUNK:
+                    index["complete"] = True
+                    break
+                last = tokens[-1]
+        except duckdb.Error:
+            # Without an index, jumps fall back to skipping from the start.
+            with self._anchor_lock:
+                for key, other in list(self._anchor_indexes.items()):
+                    if other is index:
+                        self._anchor_indexes.pop(key)
+
+    def _sort_snapshot(
+        self,
+        dataset_id: str,
+        table: str,
+        sort_keys: list[tuple[str, str]],
+        filter_parts: list[tuple[str, list[Any]]],
+        filtered_rows: int,
+    ) -> dict[str, Any] | None:
+        """The ready snapshot for this sorted view. Once the view has been
+        requested often enough, and its estimated size fits the budget, the
+        snapshot is built in the background while keyset pages keep serving
+        the view. Unsorted views page by row id already and are never
+        snapshotted."""
+        if self._sort_snapshot_after is None or not sort_keys:
+            return None
+        key = (
+            table,
+            self._versions.get(table, 0),
+            tuple(sort_keys),
+            self._filter_signature(filter_parts),
+        )
+        evicted: list[str] = []
+        with self._snapshot_lock:
+            entry = self._snapshots.get(key)
+            if entry is None:
+                entry = self._snapshots[key] = {"name": None, "bytes": 0, "requests": 0}
+                evicted = self._trim_snapshots()
+        self._drop_scratch_tables(evicted)
+        with self._snapshot_lock:
+            if key in self._snapshots:
+                self._snapshots.move_to_end(key)
+            if entry["name"] is not None:
+                return entry
+            entry["requests"] += 1
+            if (
+                entry["requests"] < self._sort_snapshot_after
+                or entry.get("building")
+                or entry.get("oversized")
+            ):
+                return None
+            if filtered_rows * (8 + self._row_bytes(table)) > self._sort_snapshot_bytes:
+                # It could never fit; keep serving the view by keyset.
+                entry["oversized"] = True
+                return None
+            entry["building"] = True
+
+        def build() -> None:
+            try:
+                name, size = self._build_sort_snapshot(
+                    dataset_id, table, sort_keys, filter_parts
+                )
+            except duckdb.Error:
+                with self._snapshot_lock:
+                    entry["building"] = False
+                return
+
+            stale: list[str] = []
+            with self._snapshot_lock:
+                entry.update(name=name, bytes=size, building=False)
+                if self._snapshots.get(key) is not entry or size > self._sort_snapshot_bytes:
+                    # Data changed during the build, or it did not fit after all.
+                    self._snapshots.pop(key, None)
+                    stale.append(name)
+                stale.extend(self._trim_snapshots())
+            self._drop_scratch_tables(stale)
+
+        self._snapshot_builds.submit(build)
+        return None
+
+    def _build_sort_snapshot(
+        self,
+        dataset_id: str,
+        table: str,
+        sort_keys: list[tuple[str, str]],
+        filter_parts: list[tuple[str, list[Any]]],
+    ) -> tuple[str, int]:
+        name = f"snapshot_{uuid.uuid4().hex[:12]}"
+        rowid_sql = self._rowid_sql(dataset_id)
+        where_sql = (
+            f"WHERE {' AND '.join(clause for clause, _ in filter_parts)}"
+            if filter_parts
+            else ""
+        )
+        params = [p for _, clause_params in filter_parts for p in clause_params]
+        # Stored in position order so zone maps turn page lookups into
+        # reads of a single row group.
+        self.conn.execute(
+            f"CREATE TABLE {SCRATCH_SCHEMA}.{self._quote_ident(name)} AS "
+            f"SELECT {self._star_sql(dataset_id)}, "
+            f"{rowid_sql} AS {self._quote_ident(ROWID_COLUMN)}, "
+            f"ROW_NUMBER() OVER (ORDER BY {self._order_sql(sort_keys, rowid_sql)}) - 1 "
+            f'AS "__zen_pos__" '
+            f"FROM {self._quote_ident(table)} {where_sql} "
+            f'ORDER BY "__zen_pos__"',
+            params,
+        )
+        target_sql = f"{SCRATCH_SCHEMA}.{self._quote_ident(name)}"
+        # The row id and the position column come on top of the data.
+        return name, self._stored_bytes(target_sql, table, extra_columns=2)
+
+    def _row_bytes(self, table: str) -> int:
+        """Estimated bytes per row, row id included: 8 per fixed-width value,
+        and a 16-byte header plus the average length over the table's leading
+        rows per string value. Cached per data version."""
+        key = (table, self._versions.get(table, 0))
+        with self._row_width_lock:
+            width = self._row_widths.get(key)
+        if width is not None:
+            return width
+
+        meta = self._get_column_meta(table)
+        strings = [col for col, m in meta.items() if m["app_type"] == "string"]
+        payload = 0
+        if strings:
+            averages = self.conn.execute(
+                f"SELECT {', '.join(f'AVG({self._payload_sql(col)})' for col in strings)} "
+                f"FROM (SELECT {', '.join(self._quote_ident(col) for col in strings)} "
+                f"FROM {self._quote_ident(table)} LIMIT {ROW_BYTES_SAMPLE_ROWS})"
+            ).fetchone()
+            payload = sum(math.ceil(avg or 0) for avg in averages)
+        width = 8 + 8 * len(meta) + 8 * len(strings) + payload
+        with self._row_width_lock:
+            for other in [k for k in self._row_widths if k[0] == table]:
+                self._row_widths.pop(other)
+            self._row_widths[key] = width
+        return width
+
+    def _stored_bytes(self, table_sql: str, table: str, extra_columns: int = 0) -> int:
+        """Bytes held by a scratch table copied from ``table``: the fixed
+        widths of ``_row_bytes`` plus every string's actual length. DuckDB
+        reports row counts rather than bytes for tables, so the strings are
+        measured."""
+        meta = self._get_column_meta(table)
+        strings = [col for col, m in meta.items() if m["app_type"] == "string"]
+        payload_sql = " + ".join(
+            f"COALESCE(SUM({self._payload_sql(col)}), 0)" for col in strings
+        ) or "0"
+        rows, payload = self.conn.execute(
+            f"SELECT COUNT(*), {payload_sql} FROM {table_sql}"
+        ).fetchone()
+        fixed = 8 + 8 * (len(meta) + extra_columns) + 8 * len(strings)
+        return int(rows) * fixed + int(payload)
+
+    def _payload_sql(self, column: str) -> str:
+        return f"strlen(CAST({self._quote_ident(column)} AS VARCHAR))"
+
+    def _cursor_position(
+        self,
+        cursor: str | None,
+        snapshot: dict[str, Any],
+        sort_keys: list[tuple[str, str]],
+    ) -> tuple[int, bool] | None:
+        """(position, backward) of the cursor's anchor row in the snapshot, or
+        None when the keyset path has to serve it."""
+        if not cursor:
+            return None
+        payload = self._decode_cursor(cursor)
+        backward = bool(payload.get("b", False))
+        anchor = payload.get("p")
+        if isinstance(anchor, list) and len(anchor) == 2 and anchor[1] == snapshot["name"]:
+            return int(anchor[0]), backward
+
+        # Cursors issued before the snapshot existed: the row id pins the
+        # anchor row, and the snapshot shares the cursor's total order.
+        if payload.get("v") != 2 or "r" not in payload:
+            return None
+        if [tuple(key) for key in payload.get("s", [])] != sort_keys:
+            return None
+        found = self.conn.execute(
+            f'SELECT "__zen_pos__" FROM {SCRATCH_SCHEMA}.{self._quote_ident(snapshot["name"])} '
+            f"WHERE {self._quote_ident(ROWID_COLUMN)} = ?",
+            [int(payload["r"])],
+        ).fetchone()
+        return (int(found[0]), backward) if found else None
+
+    def _trim_snapshots(self) -> list[str]:
+        """Evict least recently used snapshots over the byte budget, and stop
+        tracking views that never got one. Caller holds the snapshot lock."""
+        dropped: list[str] = []
+        total = sum(entry["bytes"] for entry in self._snapshots.values())
+        for key, entry in list(self._snapshots.items()):
+            over_budget = total > self._sort_snapshot_bytes and entry["name"]
+            over_tracked = (
+                len(self._snapshots) > SORT_SNAPSHOT_TRACKED_VIEWS
+                and not entry["name"]
+                and not entry.get("building")
+            )
+            if over_budget or over_tracked:
+                self._snapshots.pop(key)
+                total -= entry["bytes"]
+                if entry["name"]:
+                    dropped.append(entry["name"])
+        return dropped
+
+    def _forget_snapshot(self, snapshot: dict[str, Any]) -> None:
+        with self._snapshot_lock:
+            for key, entry in list(self._snapshots.items()):
+                if entry is snapshot:
+                    self._snapshots.pop(key)
+
+    def _discard_snapshots(self, table: str | None = None) -> None:
+        """Drop snapshots of one table (or all); their version is now stale."""
+        with self._snapshot_lock:
+            keys = [k for k in self._snapshots if table is None or k[0] == table]
+            names = [self._snapshots.pop(k)["name"] for k in keys]
+        self._drop_scratch_tables([name for name in names if name])
+
+    def _drop_scratch_tables(self, names: list[str]) -> None:
+        for name in names:
+            self.conn.execute(
+                f"DROP TABLE IF EXISTS {SCRATCH_SCHEMA}.{self._quote_ident(name)}"
+            )
+
+    def _filter_set(
+        self,
+        dataset_id: str,
+        table: str,
+        filter_parts: list[tuple[str, list[Any]]],
+        filters: list[dict],
+        build: bool = True,
+    ) -> dict[str, Any] | None:
+        """Scratch table of the row ids matching filter_parts, shared by every
+        filtered query of this data version. Adding filters to a cached list
+        only evaluates the new predicates against the cached rows. A set is
+        built for a repeated or stacked filter list that is not known to
+        exceed the budget. With build=False only an existing set is returned."""
+        if not filter_parts or self._filter_set_bytes <= 0:
+            return None
+        version = self._versions.get(table, 0)
+        part_keys = [json.dumps(part, default=str) for part in filter_parts]
+        wanted = frozenset(part_keys)
+        key = (table, version, wanted)
+        known = self._known_count(dataset_id, filter_parts)
+        with self._filter_set_lock:
+            entry = self._filter_sets.get(key)
+            if entry is not None:
+                self._filter_sets.move_to_end(key)
+                return entry
+            if not build:
+                return None
+            requests = self._filter_set_requests.get(key, 0)
+            if requests is None or (known is not None and known * 8 > self._filter_set_bytes):
+                self._filter_set_requests[key] = None
+                return None
+            self._filter_set_requests[key] = requests + 1
+            self._filter_set_requests.move_to_end(key)
+            while len(self._filter_set_requests) > FILTER_SET_TRACKED_LISTS:
+                self._filter_set_requests.popitem(last=False)
+            base = max(
+                (
+                    (other_key[2], other)
+                    for other_key, other in self._filter_sets.items()
+                    if other_key[:2] == key[:2] and other_key[2] < wanted
+                ),
+                key=lambda item: len(item[0]),
+                default=None,
+            )
+            if base is None and requests + 1 < FILTER_SET_AFTER_REQUESTS:
+                return None
+
+        rowid_sql = self._rowid_sql(dataset_id)
+        name = f"filter_{uuid.uuid4().hex[:12]}"
+        target_sql = f"{SCRATCH_SCHEMA}.{self._quote_ident(name)}"
+        try:
+            if base is not None:
+                rest = [
+                    (part, f["column"])
+                    for part, part_key, f in zip(filter_parts, part_keys, filters)
+                    if part_key not in base[0]
+                ]
+                self._stack_filter_set(dataset_id, table, target_sql, base[1], rest)
+            else:
+                self.conn.execute(
+                    f"CREATE TABLE {target_sql} AS "
+                    f"SELECT {rowid_sql} AS {self._quote_ident(ROWID_COLUMN)} "
+                    f"FROM {self._quote_ident(table)} "
+                    f"WHERE {' AND '.join(clause for clause, _ in filter_parts)} ORDER BY 1",
+                    [p for _, params in filter_parts for p in params],
+                )
+            rows = self.conn.execute(f"SELECT COUNT(*) FROM {target_sql}").fetchone()[0]
+        except duckdb.CatalogException:
+            # The base set was evicted mid-build; evaluate every predicate.
+            self._drop_scratch_tables([name])
+            return None
+
+        entry = {
+            "name": name,
+            "rows": int(rows),
+            "bytes": int(rows) * 8,
+            "clause": (
+                f"{rowid_sql} IN (SELECT {self._quote_ident(ROWID_COLUMN)} FROM {target_sql})"
+            ),
+        }
+        dropped: list[str] = []
+        with self._filter_set_lock:
+            existing = self._filter_sets.get(key)
+            if existing is not None or self._versions.get(table, 0) != version:
+                dropped.append(name)
+                entry = existing
+            elif entry["bytes"] > self._filter_set_bytes:
+                # Remembered, so later requests skip the build.
+                self._filter_set_requests[key] = None
+                dropped.append(name)
+                entry = None
+            else:
+                self._filter_sets[key] = entry
+                total = sum(e["bytes"] for e in self._filter_sets.values())
+                while total > self._filter_set_bytes:
+                    _, evicted = self._filter_sets.popitem(last=False)
+                    total -= evicted["bytes"]
+                    dropped.append(evicted["name"])
+        self._drop_scratch_tables(dropped)
+        return entry
+
+    def _stack_filter_set(
+        self,
+        dataset_id: str,
+        table: str,
+        target_sql: str,
+        base: dict[str, Any],
+        rest: list[tuple[tuple[str, list[Any]], str]],
+    ) -> None:
+        # The new predicates run on a staged copy of just the cached rows;
+        # in a single query the optimizer would push them into the full scan.
+        stage_sql = f"{SCRATCH_SCHEMA}.{self._quote_ident(f'stage_{uuid.uuid4().hex[:12]}')}"
+        columns = list(dict.fromkeys(column for _, column in rest))
+        self.conn.execute(
+            f"CREATE TABLE {stage_sql} AS "
+            f"SELECT {self._rowid_sql(dataset_id)} AS {self._quote_ident(ROWID_COLUMN)}, "
+            f"{', '.join(self._quote_ident(c) for c in columns)} "
+            f"FROM {self._quote_ident(table)} WHERE {base['clause']}"
+        )
+        try:
+            self.conn.execute(
+                f"CREATE TABLE {target_sql} AS "
+                f"SELECT {self._quote_ident(ROWID_COLUMN)} FROM {stage_sql} "
+                f"WHERE {' AND '.join(clause for (clause, _), _ in rest)} ORDER BY 1",
+                [p for (_, params), _ in rest for p in params],
+            )
+        finally:
+            self.conn.execute(f"DROP TABLE IF EXISTS {stage_sql}")
+
+    def _forget_filter_set(self, filter_set: dict[str, Any]) -> None:
+        with self._filter_set_lock:
+            for key, entry in list(self._filter_sets.items()):
+                if entry is filter_set:
+                    self._filter_sets.pop(key)
+
+    def _discard_filter_sets(self, table: str | None = None) -> None:
+        with self._filter_set_lock:
+            for k in [k for k in self._filter_set_requests if table is None or k[0] == table]:
+                self._filter_set_requests.pop(k)
+            keys = [k for k in self._filter_sets if table is None or k[0] == table]
+            names = [self._filter_sets.pop(k)["name"] for k in keys]
+        self._drop_scratch_tables(names)
+
+    def _sample_key_sql(self, dataset_id: str) -> str:
+        return f"hash({self._rowid_sql(dataset_id)}, {SAMPLE_SEED})"
+
+    def _shared_sample(
+        self, dataset_id: str, table: str, total_rows: int, build: bool = True
+    ) -> dict[str, Any] | None:
+        """The dataset's shared sample as {sql, name, rows}, or None when the
+        table is small enough to read in full. It is materialized once per
+        data version; while it is being built, or when it does not fit the
+        byte budget, the same rows are selected inline instead. With
+        ``build=False`` only an already materialized sample is returned."""
+        rows = self._profile_sample_rows
+        if total_rows <= rows:
+            return None
+        key = (table, self._versions.get(table, 0))
+        size = rows * self._row_bytes(table)
+        with self._sample_lock:
+            entry = self._samples.get(key)
+            if entry is not None:
+                self._samples.move_to_end(key)
+                if entry["name"] is not None:
+                    return entry
+            if not build:
+                return None
+            build = entry is None and size <= self._profile_sample_bytes
+            if build:
+                self._samples[key] = {"name": None, "rows": rows, "bytes": 0}
+
+        key_sql = self._sample_key_sql(dataset_id)
+        select_sql = (
+            f"SELECT {self._star_sql(dataset_id)}, "
+            f"{key_sql} AS {self._quote_ident(SAMPLE_KEY_COLUMN)} "
+            f"FROM {self._quote_ident(table)} "
+            f"ORDER BY {key_sql}, {self._rowid_sql(dataset_id)} LIMIT {rows}"
+        )
+        inline = {"sql": f"({select_sql})", "name": None, "rows": rows}
+        if not build:
+            return inline
+
+        name = f"sample_{uuid.uuid4().hex[:12]}"
+        target_sql = f"{SCRATCH_SCHEMA}.{self._quote_ident(name)}"
+        try:
+            self.conn.execute(f"CREATE TABLE {target_sql} AS {select_sql}")
+        except duckdb.Error:
+            with self._sample_lock:
+                self._samples.pop(key, None)
+            raise
+
+        size = self._stored_bytes(target_sql, table, extra_columns=1)
+        entry = {"sql": target_sql, "name": name, "rows": rows, "bytes": size}
+        dropped: list[str] = []
+        with self._sample_lock:
+            if key not in self._samples or size > self._profile_sample_bytes:
+                # The data changed while the sample was being drawn, or it
+                # did not fit after all; the placeholder keeps it inline.
+                dropped.append(name)
+                entry = inline
+            else:
+                self._samples[key] = entry
+                total = sum(e["bytes"] for e in self._samples.values())
+                for other_key, other in list(self._samples.items()):
+                    if total <= self._profile_sample_bytes:
+                        break
+                    if other is not entry and other["name"] is not None:
+                        self._samples.pop(other_key)
+                        total -= other["bytes"]
+                        dropped.append(other["name"])
+        self._drop_scratch_tables(dropped)
+        return entry
+
+    def _forget_sample(self, sample: dict[str, Any]) -> None:
+        with self._sample_lock:
+            for key, entry in list(self._samples.items()):
+                if entry is sample:
+                    self._samples.pop(key)
+
+    def _discard_samples(self, table: str | None = None) -> None:
+        with self._sample_lock:
+            keys = [k for k in self._samples if table is None or k[0] == table]
+            names = [self._samples.pop(k)["name"] for k in keys]
+        self._drop_scratch_tables([name for name in names if name])
+
+    def filtered_count(
+        self, dataset_id: str, filters: list[dict], wait: float = 0.0
+    ) -> dict:
+        table = self._get_table(dataset_id)
+        col_meta = self._get_column_meta(table)
+        filter_parts = [self._build_filter_clause(f, col_meta) for f in filters]
+        if not filter_parts:
+            rows = self._count_rows(dataset_id, self._quote_ident(table), [])
+            return {"filteredRows": rows, "status": "complete"}
+
+        known = self._known_count(dataset_id, filter_parts)
+        if known is None:
+            filter_set = self._filter_set(dataset_id, table, filter_parts, filters, build=False)
+            known = filter_set["rows"] if filter_set else None
+        if known is not None:
+            return {"filteredRows": known, "status": "complete"}
+
+        job = self._schedule_exact_count(dataset_id, table, filter_parts, filters)
+        try:
+            rows = job.result(timeout=wait)
+        except FutureTimeout:
+            return {"filteredRows": None, "status": "pending"}
+        return {"filteredRows": rows, "status": "complete"}
+
+    def _known_count(
+        self, dataset_id: str, filter_parts: list[tuple[str, list[Any]]]
+    ) -> int | None:
+        table = self.datasets.get(dataset_id, "")
+        return self._results.get(
+            (table, self._versions.get(table, 0), "rows", self._filter_signature(filter_parts))
+        )
+
+    def _estimate_count(
+        self,
+        table_sql: str,
+        filter_parts: list[tuple[str, list[Any]]],
+        total_rows: int,
+    ) -> dict[str, Any]:
+        """Extrapolate the filtered count from a block sample of the table."""
+        percent = min(100.0, 100.0 * COUNT_ESTIMATE_SAMPLE_ROWS / max(total_rows, 1))
+        where_sql = " AND ".join(clause for clause, _ in filter_parts)
+        sampled, matched = self.conn.execute(
+            f"SELECT COUNT(*), COUNT(*) FILTER (WHERE {where_sql}) "
+            f"FROM {table_sql} USING SAMPLE {percent:.6f} PERCENT (system, {COUNT_ESTIMATE_SEED})",
+            [p for _, params in filter_parts for p in params],
+        ).fetchone()
+        if not sampled:
+            return {"rows": 0, "confidence": "low"}
+
+        rows = round(total_rows * matched / sampled)
+        # Relative standard error of a binomial proportion; block sampling
+        # clusters rows, so the bands are deliberately conservative.
+        rel_error = math.sqrt((1 - matched / sampled) / matched) if matched else math.inf
+        if rel_error < 0.02:
+            confidence = "high"
+        elif rel_error < 0.1:
+            confidence = "medium"
+        else:
+            confidence = "low"
+        return {"rows": rows, "confidence": confidence}
+
+    def _schedule_exact_count(
+        self,
+        dataset_id: str,
+        table: str,
+        filter_parts: list[tuple[str, list[Any]]],
+        filters: list[dict],
+    ) -> Future:
+        key = (table, self._versions.get(table, 0), self._filter_signature(filter_parts))
+        with self._count_lock:
+            job = self._count_jobs.get(key)
+            if job is not None:
+                return job
+            job = self._count_jobs[key] = Future()
+            while len(self._count_jobs) > COUNT_JOB_LIMIT:
+                self._count_jobs.popitem(last=False)
+
+        def run() -> None:
+            try:
+                # Building the filter set yields the exact count and also
+                # serves the pages that follow.
+                filter_set = self._filter_set(dataset_id, table, filter_parts, filters)
+                rows = (
+                    filter_set["rows"]
+                    if filter_set
+                    else self._count_rows(dataset_id, self._quote_ident(table), filter_parts)
+                )
+            except Exception as exc:
+                with self._count_lock:
+                    self._count_jobs.pop(key, None)
+                job.set_exception(exc)
+                return
+            job.set_result(rows)
+
+        threading.Thread(target=run, daemon=True).start()
+        return job
+
+    def _count_rows(
+        self,
+        dataset_id: str,
+        table_sql: str,
+        filter_parts: list[tuple[str, list[Any]]],
+    ) -> int:
+        """Row count for built filter clauses, cached per data version and
+        filter signature so cursor continuations skip the scan."""
+        where_sql = (
+            f"WHERE {' AND '.join(clause for clause, _ in filter_parts)}"
+            if filter_parts
+            else ""
+        )
+        params = [p for _, clause_params in filter_parts for p in clause_params]
+        return self._cached(
+            dataset_id,
+            ("rows", self._filter_signature(filter_parts)),
+            lambda: self.conn.execute(
+                f"SELECT COUNT(*) FROM {table_sql} {where_sql}", params
+            ).fetchone()[0],
         )
 
-        if sort_column:
-            sort_col_sql = self._quote_ident(sort_column)
-            order_sql = (
-                f"ORDER BY {sort_col_sql} {sort_dir} NULLS LAST, rowid {sort_dir}"
+    def _filter_signature(self, filter_parts: list[tuple[str, list[Any]]]) -> str:
+        # Clauses carry the validated column and operator, params the coerced
+        # values, so equivalent filters in any order share a signature.
+        return json.dumps(
+            sorted(
+                json.dumps([clause, params], default=str)
+                for clause, params in filter_parts
             )
-        else:
-            order_sql = "ORDER BY rowid ASC"
-
-        sql = (
-            f'SELECT *, rowid AS "__rowid__" FROM {table_sql} '
-            f"{where_query_sql} {order_sql} LIMIT ?"
         )
-        params = [*filter_params, *keyset_params, page_size + 1]
-        result = self.conn.execute(sql, params)
-        col_names = [desc[0] for desc in result.description]
-        raw_rows = result.fetchall()
-
-        has_more = len(raw_rows) > page_size
-        page_rows = raw_rows[:page_size]
-
-        rows: list[dict[str, Any]] = []
-        rowid_idx = col_names.index("__rowid__")
-        for row in page_rows:
-            row_dict: dict[str, Any] = {}
-            for idx, col in enumerate(col_names):
-                if col == "__rowid__":
-                    continue
-                val = row[idx]
-                if val is not None and not isinstance(val, (str, int, float, bool)):
-                    val = str(val)
-                row_dict[col] = val
-            rows.append(row_dict)
-
-        next_cursor: str | None = None
-        if has_more and page_rows:
-            last_row = page_rows[-1]
-            cursor_payload: dict[str, Any] = {
-                "v": 1,
-                "s": sort_column,
-                "d": sort_dir,
-                "r": int(last_row[rowid_idx]),
-            }
-            if sort_column:
-                sort_idx = col_names.index(sort_column)
-                sort_val = last_row[sort_idx]
-                cursor_payload["n"] = sort_val is None
-                cursor_payload["k"] = self._serialize_cursor_value(sort_val)
-            next_cursor = self._encode_cursor(cursor_payload)
-
-        total_pages = max(1, (filtered_rows + page_size - 1) // page_size)
-        return {
-            "rows": rows,
-            "columns": [c for c in col_names if c != "__rowid__"],
-            "totalRows": total_rows,
-            "filteredRows": filtered_rows,
-            "page": page,
-            "pageSize": page_size,
-            "totalPages": total_pages,
-            "nextCursor": next_cursor,
-            "prevCursor": cursor,
-        }
 
     def profile_column(
         self,
         dataset_id: str,
         column: str,
     ) -> dict:
+        return self._cached(
+            dataset_id,
+            ("profile", column),
+            lambda: self._compute_profile(dataset_id, column),
+        )
+
+    def precompute_profiles(
+        self,
+        dataset_id: str,
+        columns: list[str] | None = None,
+        before_column: Callable[[], None] | None = None,
+    ) -> int:
+        """Compute and store profiles for the given columns (default: all)
+        that are not stored yet. Returns how many were computed.
+        ``before_column`` runs ahead of each column, letting a background
+        caller pause."""
+        table = self.datasets.get(dataset_id)
+        if not table:
+            raise ValueError(f"Dataset not found: {dataset_id}")
+        col_meta = self._get_column_meta(table)
+        targets = list(col_meta) if columns is None else columns
+        unknown = [c for c in targets if c not in col_meta]
+        if unknown:
+            raise ValueError(f"Column not found: {', '.join(unknown)}")
+
+        stored = {
+            str(r[0])
+            for r in self.conn.execute(
+                f"SELECT column_name FROM {PROFILES_TABLE} WHERE table_name = ?",
+                [table],
+            ).fetchall()
+        }
+        computed = 0
+        for column in targets:
+            if column in stored:
+                continue
+            # One column at a time, so interactive queries interleave.
+            if before_column is not None:
+                before_column()
+            self.profile_column(dataset_id, column)
+            computed += 1
+        return computed
+
+    def _compute_profile(self, dataset_id: str, column: str) -> dict:
+        table = self.datasets.get(dataset_id)
+        if not table:
+            raise ValueError(f"Dataset not found: {dataset_id}")
+        row = self.conn.execute(
+            f"SELECT profile FROM {PROFILES_TABLE} "
+            f"WHERE table_name = ? AND column_name = ?",
+            [table, column],
+        ).fetchone()
+        if row:
+            return json.loads(row[0])
+
+        version = self._versions.get(table, 0)
+        result = self._profile_column_uncached(dataset_id, column)
+        with self._catalog_lock:
+            # Skip the write if the data changed while profiling.
+            if self._versions.get(table, 0) == version and table in self.datasets.values():
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO {PROFILES_TABLE} "
+                    f"(table_name, column_name, profile, computed_at) VALUES (?, ?, ?, ?)",
+                    [table, column, json.dumps(result, default=str), datetime.now()],
+                )
+        return result
+
+    def _profile_column_uncached(self, dataset_id: str, column: str) -> dict:
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
         col_meta = self._get_column_meta(table)
@@ -591,41 +2256,63 @@ class DuckDBEngine(Engine):
         if column not in col_meta:
             raise ValueError(f"Column not found: {column}")
 
+        total_rows = self._count_rows(dataset_id, table_sql, [])
+
+        # Auto-profile full data up to the configured sample size; larger
+        # tables use the dataset's shared sample, so all metrics of all
+        # columns describe the same rows.
+        sample = self._shared_sample(dataset_id, table, total_rows)
+        try:
+            return self._profile_source(
+                column,
+                col_meta[column]["app_type"],
+                total_rows,
+                sample["sql"] if sample else table_sql,
+                sample["rows"] if sample else None,
+            )
+        except duckdb.CatalogException:
+            if not sample or sample["name"] is None:
+                raise
+            # The sample was evicted or went stale mid-profile.
+            self._forget_sample(sample)
+            return self._profile_column_uncached(dataset_id, column)
+
+    def _profile_source(
+        self,
+        column: str,
+        app_type: str,
+        total_rows: int,
+        sample_sql: str,
+        sample_rows: int | None,
+    ) -> dict:
         col_sql = self._quote_ident(column)
-        app_type = col_meta[column]["app_type"]
-        total_rows = self.conn.execute(f"SELECT COUNT(*) FROM {table_sql}").fetchone()[
-            0
-        ]
+        sampled = sample_rows is not None
+        profile_size = sample_rows if sampled else total_rows
 
-        # Auto-profile full data up to the configured limit.
-        sampled = total_rows > PROFILE_FULL_ROW_LIMIT
-        profile_size = PROFILE_FULL_ROW_LIMIT if sampled else total_rows
-        if sampled:
-            sample_sql = f"(SELECT * FROM {table_sql} USING SAMPLE {profile_size} ROWS)"
-        else:
-            sample_sql = table_sql
-
-        # Base stats (all types)
-        base = self.conn.execute(
-            f"SELECT COUNT(*) AS total, "
-            f"COUNT({col_sql}) AS non_null, "
-            f"COUNT(*) - COUNT({col_sql}) AS null_count, "
-            f"COUNT(DISTINCT {col_sql}) AS unique_count "
+        # Pass 1: base counts plus the type's moments, quantiles and lengths
+        # in one aggregate scan.
+        aggregates = self._profile_aggregates(app_type, col_sql)
+        row = self.conn.execute(
+            f"SELECT COUNT({col_sql}), "
+            f"COUNT(*) - COUNT({col_sql}), "
+            f"COUNT(DISTINCT {col_sql})"
+            f"{''.join(f', {sql}' for sql in aggregates)} "
             f"FROM {sample_sql}"
         ).fetchone()
+        base, stats_row = row[:3], row[3:]
         result: dict[str, Any] = {
             "column": column,
             "type": app_type,
             "totalRows": total_rows,
             "sampled": sampled,
             "sampleSize": profile_size,
-            "nonNullCount": base[1],
-            "nullCount": base[2],
-            "uniqueCount": base[3],
+            "nonNullCount": base[0],
+            "nullCount": base[1],
+            "uniqueCount": base[2],
         }
 
-        non_null_count = int(base[1]) if base[1] is not None else 0
-        unique_count = int(base[3]) if base[3] is not None else 0
+        non_null_count = int(base[0]) if base[0] is not None else 0
+        unique_count = int(base[2]) if base[2] is not None else 0
         result["coveragePct"] = (
             round((non_null_count / profile_size) * 100, 2) if profile_size > 0 else 0.0
         )
@@ -643,16 +2330,16 @@ class DuckDBEngine(Engine):
 
         if non_null_count == profile_size and unique_count == profile_size:
             result["keyHint"] = "strong"
-        elif int(base[2]) == 0 and result["cardinalityPct"] >= 98:
+        elif int(base[1]) == 0 and result["cardinalityPct"] >= 98:
             result["keyHint"] = "possible"
         else:
             result["keyHint"] = "unlikely"
 
-        dominant_value: str | None = None
-        dominant_count = 0
-
+        # Pass 2 (all types but boolean) groups the column once into value
+        # frequencies and answers every frequency-based metric from them.
+        dom: dict | None = None
         if app_type in ("integer", "float"):
-            numeric_stats = self._profile_numeric(sample_sql, col_sql)
+            numeric_stats = self._profile_numeric(stats_row)
             if numeric_stats:
                 numeric_stats["distinctCount"] = unique_count
                 uniqueness_rate = (
@@ -666,68 +2353,42 @@ class DuckDBEngine(Engine):
                     if uniqueness_rate is not None
                     else None
                 )
+            freq = self._profile_numeric_frequencies(sample_sql, col_sql, numeric_stats)
+            if numeric_stats:
                 numeric_stats.update(
                     self._profile_numeric_quality(
-                        sample_sql, col_sql, base[1], numeric_stats
+                        non_null_count, stats_row, numeric_stats, freq
                     )
                 )
-
-                p5 = numeric_stats.get("p5")
-                p95 = numeric_stats.get("p95")
-                if isinstance(p5, (int, float)):
-                    result["lowTailValues"] = self._profile_top_values(
-                        sample_sql,
-                        col_sql,
-                        limit=5,
-                        where_sql=f"{col_sql} IS NOT NULL AND {col_sql} < ?",
-                        params=[p5],
-                    )
-                if isinstance(p95, (int, float)):
-                    result["highTailValues"] = self._profile_top_values(
-                        sample_sql,
-                        col_sql,
-                        limit=5,
-                        where_sql=f"{col_sql} IS NOT NULL AND {col_sql} > ?",
-                        params=[p95],
-                    )
+                if isinstance(numeric_stats.get("p5"), (int, float)):
+                    result["lowTailValues"] = freq["lowTail"]
+                if isinstance(numeric_stats.get("p95"), (int, float)):
+                    result["highTailValues"] = freq["highTail"]
             result["stats"] = numeric_stats
-            result["histogram"] = self._profile_histogram_numeric(sample_sql, col_sql)
-            dom = self._profile_dominant_value(sample_sql, col_sql)
-            if dom:
-                dominant_value = dom["value"]
-                dominant_count = dom["count"]
+            result["histogram"] = freq["histogram"]
+            dom = self._profile_dominant_value(freq["top"])
         elif app_type == "string":
-            top_values = self._profile_top_values(sample_sql, col_sql)
+            freq = self._profile_string_frequencies(sample_sql, col_sql, stats_row)
+            top_values = freq["top"]
             result["topValues"] = top_values
-            dom = self._profile_dominant_value(sample_sql, col_sql)
-            if dom:
-                dominant_value = dom["value"]
-                dominant_count = dom["count"]
-
-            lengths = self.conn.execute(
-                f"SELECT MIN(LENGTH({col_sql})), MAX(LENGTH({col_sql})), "
-                f"MEDIAN(LENGTH({col_sql})) "
-                f"FROM {sample_sql} WHERE {col_sql} IS NOT NULL"
-            ).fetchone()
-            string_quality = self._profile_string_quality(sample_sql, col_sql, base[1])
-            if lengths and lengths[0] is not None:
+            dom = self._profile_dominant_value(top_values)
+
+            string_quality = self._profile_string_quality(non_null_count, freq)
+            if stats_row[0] is not None:
                 result["stats"] = {
-                    "minLength": int(lengths[0]),
-                    "maxLength": int(lengths[1]),
-                    "medianLength": self._safe_number(lengths[2]),
+                    "minLength": int(stats_row[0]),
+                    "maxLength": int(stats_row[1]),
+                    "medianLength": self._safe_number(stats_row[2]),
                 }
                 result["stats"].update(string_quality)
             elif string_quality:
                 result["stats"] = string_quality
 
-            sentinel_count, sentinel_tokens = self._profile_string_sentinels(
-                sample_sql, col_sql
-            )
-            result["sentinelCount"] = sentinel_count
-            result["sentinelTokens"] = sentinel_tokens
+            result["sentinelCount"] = sum(t["count"] for t in freq["sentinels"])
+            result["sentinelTokens"] = freq["sentinels"]
 
             outlier_length_stats = self._profile_string_length_outliers(
-                sample_sql, col_sql, non_null_count
+                non_null_count, stats_row, freq
             )
             if outlier_length_stats:
                 if "stats" not in result:
@@ -740,18 +2401,15 @@ class DuckDBEngine(Engine):
                 )
                 result["outlierLengthExamples"] = outlier_length_stats["examples"]
 
-            pattern_classes, distinct_pattern_count = self._profile_string_patterns(
-                sample_sql, col_sql
-            )
-            result["patternClasses"] = pattern_classes
+            result["patternClasses"] = freq["patternClasses"]
             if "stats" not in result:
                 result["stats"] = {}
-            result["stats"]["distinctPatternCount"] = distinct_pattern_count
+            result["stats"]["distinctPatternCount"] = freq["distinctPatternCount"]
 
             top_10_share_pct = 0.0
-            if base[1] > 0 and top_values:
+            if base[0] > 0 and top_values:
                 top_10_total = sum(v["count"] for v in top_values)
-                top_10_share_pct = (top_10_total / base[1]) * 100
+                top_10_share_pct = (top_10_total / base[0]) * 100
             result["top10CoveragePct"] = round(top_10_share_pct, 2)
             if top_10_share_pct >= 70:
                 result["tailProfile"] = "low"
@@ -760,68 +2418,125 @@ class DuckDBEngine(Engine):
             else:
                 result["tailProfile"] = "high"
         elif app_type == "date":
-            date_stats = self.conn.execute(
-                f"SELECT MIN({col_sql}), MAX({col_sql}) "
-                f"FROM {sample_sql} WHERE {col_sql} IS NOT NULL"
-            ).fetchone()
-            if date_stats and date_stats[0] is not None:
+            freq = self._profile_date_frequencies(sample_sql, col_sql)
+            if stats_row[0] is not None:
+                span_days = int(stats_row[2])
+                distinct_days = int(stats_row[3])
                 result["stats"] = {
-                    "min": str(date_stats[0]),
-                    "max": str(date_stats[1]),
+                    "min": str(stats_row[0]),
+                    "max": str(stats_row[1]),
+                    "missingPeriodDays": max(0, span_days - distinct_days),
+                    "largestGapDays": max(0, freq["largestGapDays"]),
                 }
-                result["stats"].update(self._profile_date_gaps(sample_sql, col_sql))
-            result["histogram"] = self._profile_histogram_date(sample_sql, col_sql)
-            dom = self._profile_dominant_value(sample_sql, col_sql)
-            if dom:
-                dominant_value = dom["value"]
-                dominant_count = dom["count"]
+            result["histogram"] = freq["histogram"]
+            dom = self._profile_dominant_value(freq["top"])
         elif app_type == "boolean":
-            bool_stats = self._profile_boolean_split(sample_sql, col_sql, profile_size)
+            bool_stats = self._profile_boolean_split(stats_row, base[1], profile_size)
             result["stats"] = bool_stats
-            true_count = int(bool_stats.get("trueCount") or 0)
-            false_count = int(bool_stats.get("falseCount") or 0)
+            true_count = bool_stats["trueCount"]
+            false_count = bool_stats["falseCount"]
             if true_count == false_count:
-                dominant_value = None
-                dominant_count = true_count
+                dom = {"value": None, "count": true_count}
             elif true_count > false_count:
-                dominant_value = "true"
-                dominant_count = true_count
+                dom = {"value": "true", "count": true_count}
             else:
-                dominant_value = "false"
-                dominant_count = false_count
+                dom = {"value": "false", "count": false_count}
 
-        if base[1] > 0 and dominant_count > 0:
-            if dominant_value is None:
+        if base[0] > 0 and dom and dom["count"] > 0:
+            if dom["value"] is None:
                 result["dominantValue"] = "none"
-                result["dominantValueCount"] = dominant_count
+                result["dominantValueCount"] = dom["count"]
             else:
-                result["dominantValue"] = dominant_value
-                result["dominantValueCount"] = dominant_count
+                result["dominantValue"] = dom["value"]
+                result["dominantValueCount"] = dom["count"]
                 result["dominantValueSharePct"] = round(
-                    (dominant_count / base[1]) * 100, 2
+                    (dom["count"] / base[0]) * 100, 2
                 )
 
         return result
 
-    def _profile_numeric(self, source_sql: str, col_sql: str) -> dict:
-        row = self.conn.execute(
-            f"SELECT MIN({col_sql}), MAX({col_sql}), "
-            f"ROUND(SUM({col_sql})::DOUBLE, 4), "
-            f"ROUND(AVG({col_sql})::DOUBLE, 4), "
-            f"ROUND(MEDIAN({col_sql})::DOUBLE, 4), "
-            f"ROUND(STDDEV({col_sql})::DOUBLE, 4), "
-            f"ROUND(QUANTILE_CONT({col_sql}, 0.05)::DOUBLE, 4), "
-            f"ROUND(QUANTILE_CONT({col_sql}, 0.25)::DOUBLE, 4), "
-            f"ROUND(QUANTILE_CONT({col_sql}, 0.75)::DOUBLE, 4), "
-            f"ROUND(QUANTILE_CONT({col_sql}, 0.95)::DOUBLE, 4), "
-            f"ROUND(QUANTILE_CONT({col_sql}, 0.99)::DOUBLE, 4) "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL"
+    def _profile_aggregates(self, app_type: str, col_sql: str) -> list[str]:
+        """Type-specific aggregates appended to the base counts of pass 1."""
+        if app_type in ("integer", "float"):
+            return [
+                f"MIN({col_sql})",
+                f"MAX({col_sql})",
+                f"ROUND(SUM({col_sql})::DOUBLE, 4)",
+                f"ROUND(AVG({col_sql})::DOUBLE, 4)",
+                f"ROUND(MEDIAN({col_sql})::DOUBLE, 4)",
+                f"ROUND(STDDEV({col_sql})::DOUBLE, 4)",
+                *(
+                    f"ROUND(QUANTILE_CONT({col_sql}, {q})::DOUBLE, 4)"
+                    for q in (0.05, 0.25, 0.75, 0.95, 0.99)
+                ),
+                f"COUNT(*) FILTER (WHERE {col_sql} = 0)",
+                f"COUNT(*) FILTER (WHERE {col_sql} < 0)",
+            ]
+        if app_type == "string":
+            text_len = f"LENGTH(CAST({col_sql} AS VARCHAR))"
+            return [
+                f"MIN(LENGTH({col_sql}))",
+                f"MAX(LENGTH({col_sql}))",
+                f"MEDIAN(LENGTH({col_sql}))",
+                f"AVG({text_len})::DOUBLE",
+                f"STDDEV_POP({text_len})::DOUBLE",
+            ]
+        if app_type == "date":
+            return [
+                f"MIN({col_sql})",
+                f"MAX({col_sql})",
+                f"DATEDIFF('day', MIN({col_sql}::DATE), MAX({col_sql}::DATE)) + 1",
+                f"COUNT(DISTINCT {col_sql}::DATE)",
+            ]
+        if app_type == "boolean":
+            return [
+                f"COUNT(*) FILTER (WHERE {col_sql} = TRUE)",
+                f"COUNT(*) FILTER (WHERE {col_sql} = FALSE)",
+            ]
+        return []
+
+    def _profile_frequencies(
+        self,
+        source_sql: str,
+        col_sql: str,
+        selects: list[str],
+        bounds_sql: str = "1 AS _",
+        params: list[Any] | None = None,
+        ctes: str = "",
+    ) -> tuple:
+        """Pass 2: group the column once into ``freq`` (v, cnt) and evaluate
+        ``selects`` over it, with pass-1 results bound as the ``b`` row."""
+        return self.conn.execute(
+            f"WITH freq AS MATERIALIZED ("
+            f"  SELECT {col_sql} AS v, COUNT(*) AS cnt FROM {source_sql} "
+            f"  WHERE {col_sql} IS NOT NULL GROUP BY {col_sql}"
+            f"), b AS (SELECT {bounds_sql}){ctes} "
+            f"SELECT {', '.join(selects)} FROM freq, b",
+            params or [],
         ).fetchone()
-        if not row or row[0] is None:
+
+    def _top_frequencies_sql(self, limit: int, where_sql: str = "") -> str:
+        # Ties on count resolve by value so top lists are deterministic.
+        return (
+            f"(SELECT list({{'value': v, 'count': cnt}} ORDER BY cnt DESC, v) "
+            f"FROM (SELECT v, cnt FROM freq, b {where_sql} "
+            f"ORDER BY cnt DESC, v LIMIT {int(limit)}))"
+        )
+
+    def _top_values(self, entries: list[dict] | None) -> list[dict]:
+        return [{"value": str(e["value"]), "count": int(e["count"])} for e in entries or []]
+
+    def _profile_dominant_value(self, top_values: list[dict]) -> dict | None:
+        if not top_values:
+            return None
+        if len(top_values) > 1 and top_values[0]["count"] == top_values[1]["count"]:
+            return {"value": None, "count": top_values[0]["count"]}
+        return {"value": top_values[0]["value"], "count": top_values[0]["count"]}
+
+    def _profile_numeric(self, row: tuple) -> dict:
+        if row[0] is None:
             return {}
 
-        min_val = self._safe_number(row[0])
-        max_val = self._safe_number(row[1])
         p25 = self._safe_number(row[7])
         p75 = self._safe_number(row[8])
         iqr = None
@@ -829,8 +2544,8 @@ class DuckDBEngine(Engine):
             iqr = self._safe_number(float(p75) - float(p25))
 
         return {
-            "min": min_val,
-            "max": max_val,
+            "min": self._safe_number(row[0]),
+            "max": self._safe_number(row[1]),
             "sum": self._safe_number(row[2]),
             "mean": self._safe_number(row[3]),
             "median": self._safe_number(row[4]),
@@ -843,27 +2558,49 @@ class DuckDBEngine(Engine):
             "iqr": iqr,
         }
 
-    def _profile_histogram_numeric(
-        self, source_sql: str, col_sql: str, bins: int = 20
-    ) -> list[dict]:
-        bounds = self.conn.execute(
-            f"SELECT MIN({col_sql})::DOUBLE, MAX({col_sql})::DOUBLE "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL"
-        ).fetchone()
-        if not bounds or bounds[0] is None or bounds[0] == bounds[1]:
-            return []
-
-        lo, hi = float(bounds[0]), float(bounds[1])
-        bin_width = (hi - lo) / bins
-        rows = self.conn.execute(
-            f"SELECT FLOOR(({col_sql}::DOUBLE - ?) / ?)::INTEGER AS bin, COUNT(*) "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL "
-            f"GROUP BY bin ORDER BY bin",
-            [lo, bin_width],
-        ).fetchall()
-
+    def _profile_numeric_frequencies(
+        self,
+        source_sql: str,
+        col_sql: str,
+        numeric_stats: dict[str, Any],
+        bins: int = 20,
+    ) -> dict[str, Any]:
+        def bound(key: str) -> float | None:
+            value = numeric_stats.get(key)
+            return float(value) if isinstance(value, (int, float)) else None
+
+        # Unknown bounds bind as NULL, which matches no value.
+        p5, p25, p75, p95 = (bound(k) for k in ("p5", "p25", "p75", "p95"))
+        outlier_low = outlier_high = None
+        if p25 is not None and p75 is not None:
+            outlier_low = p25 - 1.5 * (p75 - p25)
+            outlier_high = p75 + 1.5 * (p75 - p25)
+        lo, hi = bound("min"), bound("max")
+        bin_width = None
+        if lo is not None and hi is not None and lo != hi:
+            bin_width = (hi - lo) / bins
+
+        row = self._profile_frequencies(
+            source_sql,
+            col_sql,
+            [
+                self._top_frequencies_sql(2),
+                self._top_frequencies_sql(5, "WHERE v < p5"),
+                self._top_frequencies_sql(5, "WHERE v > p95"),
+                "(SELECT list([bin, n] ORDER BY bin) FROM ("
+                "  SELECT FLOOR((v::DOUBLE - lo) / width)::INTEGER AS bin, SUM(cnt) AS n "
+                "  FROM freq, b GROUP BY bin"
+                ") WHERE bin IS NOT NULL)",
+                "SUM(cnt) FILTER (WHERE v < outlier_low OR v > outlier_high)",
+                "SUM(cnt) FILTER (WHERE v < p5)",
+                "SUM(cnt) FILTER (WHERE v > p95)",
+            ],
+            "?::DOUBLE AS p5, ?::DOUBLE AS p95, ?::DOUBLE AS outlier_low, "
+            "?::DOUBLE AS outlier_high, ?::DOUBLE AS lo, ?::DOUBLE AS width",
+            [p5, p95, outlier_low, outlier_high, lo, bin_width],
+        )
         histogram = []
-        for bin_idx, count in rows:
+        for bin_idx, count in row[3] or []:
             idx = max(0, min(int(bin_idx), bins - 1))
             edge = lo + idx * bin_width
             histogram.append(
@@ -871,111 +2608,40 @@ class DuckDBEngine(Engine):
                     "bin": idx,
                     "low": round(edge, 4),
                     "high": round(edge + bin_width, 4),
-                    "count": count,
+                    "count": int(count),
                 }
             )
-        return histogram
-
-    def _profile_histogram_date(self, source_sql: str, col_sql: str) -> list[dict]:
-        rows = self.conn.execute(
-            f"SELECT DATE_TRUNC('month', {col_sql}::TIMESTAMP) AS month, COUNT(*) "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL "
-            f"GROUP BY month ORDER BY month"
-        ).fetchall()
-        return [{"label": str(r[0])[:7], "count": r[1]} for r in rows]
-
-    def _profile_top_values(
-        self,
-        source_sql: str,
-        col_sql: str,
-        limit: int = 10,
-        where_sql: str | None = None,
-        params: list[Any] | None = None,
-    ) -> list[dict]:
-        where_clause = (
-            f"WHERE {where_sql}" if where_sql else f"WHERE {col_sql} IS NOT NULL"
-        )
-        rows = self.conn.execute(
-            f"SELECT {col_sql}, COUNT(*) AS cnt FROM {source_sql} "
-            f"{where_clause} GROUP BY {col_sql} "
-            f"ORDER BY cnt DESC LIMIT ?",
-            [*(params or []), limit],
-        ).fetchall()
-        return [{"value": str(r[0]), "count": r[1]} for r in rows]
-
-    def _profile_dominant_value(self, source_sql: str, col_sql: str) -> dict | None:
-        count_rows = self.conn.execute(
-            f"SELECT COUNT(*) AS cnt FROM {source_sql} "
-            f"WHERE {col_sql} IS NOT NULL GROUP BY {col_sql} "
-            f"ORDER BY cnt DESC LIMIT 2"
-        ).fetchall()
-        if not count_rows:
-            return None
-        if len(count_rows) > 1 and int(count_rows[0][0]) == int(count_rows[1][0]):
-            return {"value": None, "count": int(count_rows[0][0])}
-
-        row = self.conn.execute(
-            f"SELECT {col_sql}, COUNT(*) AS cnt FROM {source_sql} "
-            f"WHERE {col_sql} IS NOT NULL GROUP BY {col_sql} "
-            f"ORDER BY cnt DESC, {col_sql} ASC LIMIT 1"
-        ).fetchone()
-        if not row:
-            return None
-        return {"value": str(row[0]), "count": int(row[1])}
+        return {
+            "top": self._top_values(row[0]),
+            "lowTail": self._top_values(row[1]),
+            "highTail": self._top_values(row[2]),
+            "histogram": histogram,
+            "outlierCount": int(row[4] or 0),
+            "lowTailCount": int(row[5] or 0),
+            "highTailCount": int(row[6] or 0),
+        }
 
     def _profile_numeric_quality(
         self,
-        source_sql: str,
-        col_sql: str,
         non_null_count: int,
+        row: tuple,
         numeric_stats: dict[str, Any],
+        freq: dict[str, Any],
     ) -> dict[str, Any]:
         if non_null_count <= 0:
             return {}
 
-        counts = self.conn.execute(
-            f"SELECT "
-            f"COUNT(*) FILTER (WHERE {col_sql} = 0), "
-            f"COUNT(*) FILTER (WHERE {col_sql} < 0) "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL"
-        ).fetchone()
-        zero_count = int(counts[0]) if counts else 0
-        neg_count = int(counts[1]) if counts else 0
-
-        p25 = numeric_stats.get("p25")
-        p75 = numeric_stats.get("p75")
-        p5 = numeric_stats.get("p5")
-        p95 = numeric_stats.get("p95")
+        zero_count = int(row[11] or 0)
+        neg_count = int(row[12] or 0)
         outlier_rate_pct: float | None = None
         outlier_count = 0
-        if isinstance(p25, (int, float)) and isinstance(p75, (int, float)):
-            iqr = float(p75) - float(p25)
-            low = float(p25) - 1.5 * iqr
-            high = float(p75) + 1.5 * iqr
-            outlier_row = self.conn.execute(
-                f"SELECT COUNT(*) FROM {source_sql} "
-                f"WHERE {col_sql} IS NOT NULL AND ({col_sql} < ? OR {col_sql} > ?)",
-                [low, high],
-            ).fetchone()
-            outlier_count = int(outlier_row[0]) if outlier_row else 0
+        if isinstance(numeric_stats.get("p25"), (int, float)) and isinstance(
+            numeric_stats.get("p75"), (int, float)
+        ):
+            outlier_count = freq["outlierCount"]
             outlier_rate_pct = round((outlier_count / non_null_count) * 100, 2)
-
-        low_tail_count = 0
-        high_tail_count = 0
-        if isinstance(p5, (int, float)):
-            low_tail_row = self.conn.execute(
-                f"SELECT COUNT(*) FROM {source_sql} "
-                f"WHERE {col_sql} IS NOT NULL AND {col_sql} < ?",
-                [p5],
-            ).fetchone()
-            low_tail_count = int(low_tail_row[0]) if low_tail_row else 0
-        if isinstance(p95, (int, float)):
-            high_tail_row = self.conn.execute(
-                f"SELECT COUNT(*) FROM {source_sql} "
-                f"WHERE {col_sql} IS NOT NULL AND {col_sql} > ?",
-                [p95],
-            ).fetchone()
-            high_tail_count = int(high_tail_row[0]) if high_tail_row else 0
+        low_tail_count = freq["lowTailCount"]
+        high_tail_count = freq["highTailCount"]
 
         return {
             "zeroRatePct": round((zero_count / non_null_count) * 100, 2),
@@ -988,193 +2654,141 @@ class DuckDBEngine(Engine):
             "highTailRatePct": round((high_tail_count / non_null_count) * 100, 2),
         }
 
-    def _profile_date_gaps(self, source_sql: str, col_sql: str) -> dict[str, Any]:
-        span_row = self.conn.execute(
-            f"SELECT "
-            f"DATEDIFF('day', MIN({col_sql}::DATE), MAX({col_sql}::DATE)) + 1, "
-            f"COUNT(DISTINCT {col_sql}::DATE) "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL"
-        ).fetchone()
-        if not span_row or span_row[0] is None:
-            return {}
-
-        span_days = int(span_row[0])
-        distinct_days = int(span_row[1])
-        missing_days = max(0, span_days - distinct_days)
-
-        gap_row = self.conn.execute(
-            f"WITH ordered_days AS ("
-            f"  SELECT DISTINCT {col_sql}::DATE AS d "
-            f"  FROM {source_sql} WHERE {col_sql} IS NOT NULL"
-            f"), gaps AS ("
-            f"  SELECT DATEDIFF('day', LAG(d) OVER (ORDER BY d), d) - 1 AS gap_days "
-            f"  FROM ordered_days"
-            f") "
-            f"SELECT COALESCE(MAX(gap_days), 0) FROM gaps"
-        ).fetchone()
-        largest_gap_days = int(gap_row[0]) if gap_row else 0
+    def _profile_date_frequencies(self, source_sql: str, col_sql: str) -> dict[str, Any]:
+        row = self._profile_frequencies(
+            source_sql,
+            col_sql,
+            [
+                self._top_frequencies_sql(2),
+                "(SELECT list({'month': month, 'count': n} ORDER BY month) FROM ("
+                "  SELECT DATE_TRUNC('month', v::TIMESTAMP) AS month, SUM(cnt) AS n "
+                "  FROM freq GROUP BY month))",
+                "(SELECT COALESCE(MAX(gap_days), 0) FROM ("
+                "  SELECT DATEDIFF('day', LAG(d) OVER (ORDER BY d), d) - 1 AS gap_days "
+                "  FROM (SELECT DISTINCT v::DATE AS d FROM freq)))",
+            ],
+        )
+        return {
+            "top": self._top_values(row[0]),
+            "histogram": [
+                {"label": str(m["month"])[:7], "count": int(m["count"])}
+                for m in row[1] or []
+            ],
+            "largestGapDays": int(row[2] or 0),
+        }
 
+    def _profile_string_frequencies(
+        self, source_sql: str, col_sql: str, row: tuple
+    ) -> dict[str, Any]:
+        # Lengths deviating more than two population stddevs from the mean
+        # are outliers; without spread the bounds bind as NULL and match none.
+        mean_len = float(row[3]) if row[3] is not None else None
+        std_len = float(row[4]) if row[4] is not None else 0.0
+        max_dev = 2 * std_len if mean_len is not None and std_len > 0 else None
+
+        text_sql = "CAST(v AS VARCHAR)"
+        trimmed_sql = f"TRIM({text_sql})"
+        length_dev_sql = f"ABS(LENGTH({text_sql}) - mean_len)"
+        row = self._profile_frequencies(
+            source_sql,
+            col_sql,
+            [
+                self._top_frequencies_sql(10),
+                f"SUM(cnt) FILTER (WHERE LENGTH({trimmed_sql}) = 0)",
+                "(SELECT list({'token': token, 'count': n} ORDER BY n DESC, token) FROM ("
+                f"  SELECT CASE "
+                f"    WHEN LENGTH({text_sql}) = 0 THEN '__empty__' "
+                f"    WHEN LENGTH({trimmed_sql}) = 0 THEN '__whitespace__' "
+                f"    ELSE LOWER({trimmed_sql}) "
+                f"  END AS token, SUM(cnt) AS n "
+                f"  FROM freq GROUP BY token"
+                ") WHERE token IN ('na', 'n/a', 'null', 'none', '-', '__empty__', '__whitespace__'))",
+                f"SUM(cnt) FILTER (WHERE {length_dev_sql} > max_dev)",
+                f"(SELECT list(s ORDER BY dev DESC, s) FROM ("
+                f"  SELECT DISTINCT {text_sql} AS s, {length_dev_sql} AS dev FROM freq, b "
+                f"  WHERE {length_dev_sql} > max_dev ORDER BY dev DESC, s LIMIT 5))",
+                "(SELECT list({'label': cls, 'count': n} ORDER BY n DESC, cls) FROM ("
+                "  SELECT cls, SUM(cnt) AS n FROM patterns GROUP BY cls "
+                "  ORDER BY n DESC, cls LIMIT 5))",
+                "(SELECT COUNT(DISTINCT pattern) FROM patterns)",
+            ],
+            "?::DOUBLE AS mean_len, ?::DOUBLE AS max_dev",
+            [mean_len, max_dev],
+            ctes=(
+                f", patterns AS ("
+                f"  SELECT CASE "
+                f"    WHEN REGEXP_MATCHES(LOWER(t), '^[0-9a-f]{{8}}-[0-9a-f]{{4}}-[1-5][0-9a-f]{{3}}-[89ab][0-9a-f]{{3}}-[0-9a-f]{{12}}$') THEN 'uuid' "
+                f"    WHEN REGEXP_MATCHES(t, '^[A-Za-z0-9._%+\\-]+@[A-Za-z0-9.\\-]+\\.[A-Za-z]{{2,}}$') THEN 'email' "
+                f"    WHEN REGEXP_MATCHES(t, '^[0-9]+$') THEN 'numeric-only' "
+                f"    WHEN REGEXP_MATCHES(t, '[0-9]') AND REGEXP_MATCHES(t, '[A-Za-z]') AND REGEXP_MATCHES(t, '^[A-Za-z0-9_\\-]+$') THEN 'code-like' "
+                f"    ELSE 'free-text' "
+                f"  END AS cls, "
+                f"  REGEXP_REPLACE(REGEXP_REPLACE(t, '[A-Za-z]', 'A', 'g'), '[0-9]', '9', 'g') AS pattern, "
+                f"  cnt "
+                f"  FROM (SELECT {trimmed_sql} AS t, cnt FROM freq) "
+                f"  WHERE LENGTH(t) > 0"
+                f")"
+            ),
+        )
+        display_map = {
+            "__empty__": "(empty)",
+            "__whitespace__": "(whitespace)",
+        }
+        class_rows = [(c["label"], int(c["count"])) for c in row[5] or []]
+        class_total = sum(count for _, count in class_rows)
         return {
-            "missingPeriodDays": missing_days,
-            "largestGapDays": max(0, largest_gap_days),
+            "top": self._top_values(row[0]),
+            "blankCount": int(row[1] or 0),
+            "sentinels": [
+                {"token": display_map.get(t["token"], t["token"]), "count": int(t["count"])}
+                for t in row[2] or []
+            ],
+            "outlierLengthCount": int(row[3] or 0) if max_dev is not None else 0,
+            "outlierLengthExamples": [str(s)[:80] for s in row[4] or []],
+            "patternClasses": [
+                {
+                    "label": label,
+                    "count": count,
+                    "sharePct": round((count / class_total) * 100, 2)
+                    if class_total > 0
+                    else 0.0,
+                }
+                for label, count in class_rows
+            ],
+            "distinctPatternCount": int(row[6] or 0),
         }
 
     def _profile_string_quality(
-        self, source_sql: str, col_sql: str, non_null_count: int
+        self, non_null_count: int, freq: dict[str, Any]
     ) -> dict[str, Any]:
         if non_null_count <= 0:
             return {}
 
-        row = self.conn.execute(
-            f"SELECT COUNT(*) "
-            f"FROM {source_sql} "
-            f"WHERE {col_sql} IS NOT NULL AND LENGTH(TRIM(CAST({col_sql} AS VARCHAR))) = 0"
-        ).fetchone()
-        blank_count = int(row[0]) if row else 0
+        blank_count = freq["blankCount"]
         return {
             "blankWhitespaceCount": blank_count,
             "blankWhitespacePct": round((blank_count / non_null_count) * 100, 2),
         }
 
-    def _profile_string_sentinels(
-        self, source_sql: str, col_sql: str
-    ) -> tuple[int, list[dict[str, Any]]]:
-        rows = self.conn.execute(
-            f"WITH vals AS ("
-            f"  SELECT CASE "
-            f"    WHEN LENGTH(CAST({col_sql} AS VARCHAR)) = 0 THEN '__empty__' "
-            f"    WHEN LENGTH(TRIM(CAST({col_sql} AS VARCHAR))) = 0 THEN '__whitespace__' "
-            f"    ELSE LOWER(TRIM(CAST({col_sql} AS VARCHAR))) "
-            f"  END AS sentinel_key "
-            f"  FROM {source_sql} "
-            f"  WHERE {col_sql} IS NOT NULL"
-            f") "
-            f"SELECT sentinel_key, COUNT(*) AS cnt "
-            f"FROM vals "
-            f"WHERE sentinel_key IN ('na', 'n/a', 'null', 'none', '-', '__empty__', '__whitespace__') "
-            f"GROUP BY sentinel_key "
-            f"ORDER BY cnt DESC, sentinel_key ASC"
-        ).fetchall()
-
-        display_map = {
-            "__empty__": "(empty)",
-            "__whitespace__": "(whitespace)",
-        }
-        tokens: list[dict[str, Any]] = [
-            {
-                "token": display_map.get(str(r[0]), str(r[0])),
-                "count": int(r[1]),
-            }
-            for r in rows
-        ]
-        sentinel_count = sum(int(r[1]) for r in rows)
-        return sentinel_count, tokens
-
     def _profile_string_length_outliers(
-        self, source_sql: str, col_sql: str, non_null_count: int
+        self, non_null_count: int, row: tuple, freq: dict[str, Any]
     ) -> dict[str, Any]:
-        if non_null_count <= 0:
+        if non_null_count <= 0 or row[3] is None:
             return {}
 
-        stats_row = self.conn.execute(
-            f"SELECT AVG(LENGTH(CAST({col_sql} AS VARCHAR)))::DOUBLE, "
-            f"STDDEV_POP(LENGTH(CAST({col_sql} AS VARCHAR)))::DOUBLE "
-            f"FROM {source_sql} WHERE {col_sql} IS NOT NULL"
-        ).fetchone()
-        if not stats_row or stats_row[0] is None:
-            return {}
-
-        mean_len = float(stats_row[0])
-        std_len = float(stats_row[1]) if stats_row[1] is not None else 0.0
-        if std_len <= 0:
-            return {
-                "count": 0,
-                "ratePct": 0.0,
-                "examples": [],
-            }
-
-        outlier_count_row = self.conn.execute(
-            f"SELECT COUNT(*) FROM {source_sql} "
-            f"WHERE {col_sql} IS NOT NULL "
-            f"AND ABS(LENGTH(CAST({col_sql} AS VARCHAR)) - ?) > ?",
-            [mean_len, 2 * std_len],
-        ).fetchone()
-        outlier_count = int(outlier_count_row[0]) if outlier_count_row else 0
-
-        example_rows = self.conn.execute(
-            f"SELECT DISTINCT CAST({col_sql} AS VARCHAR) AS v "
-            f"FROM {source_sql} "
-            f"WHERE {col_sql} IS NOT NULL "
-            f"AND ABS(LENGTH(CAST({col_sql} AS VARCHAR)) - ?) > ? "
-            f"ORDER BY ABS(LENGTH(CAST({col_sql} AS VARCHAR)) - ?) DESC "
-            f"LIMIT 5",
-            [mean_len, 2 * std_len, mean_len],
-        ).fetchall()
-
-        examples = [str(r[0])[:80] for r in example_rows]
+        outlier_count = freq["outlierLengthCount"]
         return {
             "count": outlier_count,
             "ratePct": round((outlier_count / non_null_count) * 100, 2),
-            "examples": examples,
+            "examples": freq["outlierLengthExamples"],
         }
 
-    def _profile_string_patterns(
-        self, source_sql: str, col_sql: str
-    ) -> tuple[list[dict[str, Any]], int]:
-        class_rows = self.conn.execute(
-            f"WITH vals AS ("
-            f"  SELECT TRIM(CAST({col_sql} AS VARCHAR)) AS v "
-            f"  FROM {source_sql} "
-            f"  WHERE {col_sql} IS NOT NULL AND LENGTH(TRIM(CAST({col_sql} AS VARCHAR))) > 0"
-            f"), classes AS ("
-            f"  SELECT CASE "
-            f"    WHEN REGEXP_MATCHES(LOWER(v), '^[0-9a-f]{8}-[0-9a-f]{4}-[1-5][0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$') THEN 'uuid' "
-            f"    WHEN REGEXP_MATCHES(v, '^[A-Za-z0-9._%+\\-]+@[A-Za-z0-9.\\-]+\\.[A-Za-z]{(2,)}$') THEN 'email' "
-            f"    WHEN REGEXP_MATCHES(v, '^[0-9]+$') THEN 'numeric-only' "
-            f"    WHEN REGEXP_MATCHES(v, '[0-9]') AND REGEXP_MATCHES(v, '[A-Za-z]') AND REGEXP_MATCHES(v, '^[A-Za-z0-9_\\-]+$') THEN 'code-like' "
-            f"    ELSE 'free-text' "
-            f"  END AS cls "
-            f"  FROM vals"
-            f") "
-            f"SELECT cls, COUNT(*) AS cnt FROM classes GROUP BY cls ORDER BY cnt DESC LIMIT 5"
-        ).fetchall()
-
-        total = sum(int(r[1]) for r in class_rows)
-        classes = [
-            {
-                "label": str(r[0]),
-                "count": int(r[1]),
-                "sharePct": round((int(r[1]) / total) * 100, 2) if total > 0 else 0.0,
-            }
-            for r in class_rows
-        ]
-
-        pattern_count_row = self.conn.execute(
-            f"WITH vals AS ("
-            f"  SELECT TRIM(CAST({col_sql} AS VARCHAR)) AS v "
-            f"  FROM {source_sql} "
-            f"  WHERE {col_sql} IS NOT NULL AND LENGTH(TRIM(CAST({col_sql} AS VARCHAR))) > 0"
-            f") "
-            f"SELECT COUNT(DISTINCT REGEXP_REPLACE(REGEXP_REPLACE(v, '[A-Za-z]', 'A', 'g'), '[0-9]', '9', 'g')) "
-            f"FROM vals"
-        ).fetchone()
-        distinct_pattern_count = int(pattern_count_row[0]) if pattern_count_row else 0
-
-        return classes, distinct_pattern_count
-
     def _profile_boolean_split(
-        self, source_sql: str, col_sql: str, total_profiled_rows: int
+        self, row: tuple, null_count: int, total_profiled_rows: int
     ) -> dict[str, Any]:
-        row = self.conn.execute(
-            f"SELECT "
-            f"COUNT(*) FILTER (WHERE {col_sql} = TRUE), "
-            f"COUNT(*) FILTER (WHERE {col_sql} = FALSE), "
-            f"COUNT(*) FILTER (WHERE {col_sql} IS NULL) "
-            f"FROM {source_sql}"
-        ).fetchone()
-        true_count = int(row[0]) if row else 0
-        false_count = int(row[1]) if row else 0
-        null_count = int(row[2]) if row else 0
+        true_count = int(row[0] or 0)
+        false_count = int(row[1] or 0)
+        null_count = int(null_count or 0)
         denom = max(1, int(total_profiled_rows))
         return {
             "trueCount": true_count,
@@ -1201,33 +2815,35 @@ class DuckDBEngine(Engine):
         sort_column: str | None,
         sort_direction: str | None,
         filters: list[dict],
+        sort: list[dict] | None = None,
     ) -> bytes:
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
         col_meta = self._get_column_meta(table)
+        sort_keys = self._sort_keys(sort_column, sort_direction, sort, col_meta)
+
+        filter_parts = [self._build_filter_clause(f, col_meta) for f in filters]
+        filter_set = self._filter_set(dataset_id, table, filter_parts, filters)
+        order_sql = self._order_sql(sort_keys, self._rowid_sql(dataset_id))
+
+        def execute(parts: list[tuple[str, list[Any]]]) -> duckdb.DuckDBPyConnection:
+            clauses = [clause for clause, _ in parts]
+            where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            return self.conn.execute(
+                f"SELECT {self._star_sql(dataset_id)} FROM {table_sql} "
+                f"{where_sql} ORDER BY {order_sql}",
+                [p for _, params in parts for p in params],
+            )
 
-        if sort_column is not None and sort_column not in col_meta:
-            raise ValueError(f"Invalid sort column: {sort_column}")
-
-        sort_dir = "DESC" if sort_direction == "desc" else "ASC"
-
-        filter_clauses: list[str] = []
-        filter_params: list[Any] = []
-        for f in filters:
-            clause, p = self._build_filter_clause(f, col_meta)
-            filter_clauses.append(clause)
-            filter_params.extend(p)
-
-        where_sql = f"WHERE {' AND '.join(filter_clauses)}" if filter_clauses else ""
-
-        if sort_column:
-            sort_col_sql = self._quote_ident(sort_column)
-            order_sql = f"ORDER BY {sort_col_sql} {sort_dir} NULLS LAST"
+        if filter_set:
+            try:
+                result = execute([(filter_set["clause"], [])])
+            except duckdb.CatalogException:
+                # Evicted between lookup and query.
+                self._forget_filter_set(filter_set)
+                result = execute(filter_parts)
         else:
-            order_sql = "ORDER BY rowid ASC"
-
-        sql = f"SELECT * FROM {table_sql} {where_sql} {order_sql}"
-        result = self.conn.execute(sql, filter_params)
+            result = execute(filter_parts)
         col_names = [desc[0] for desc in result.description]
         rows = result.fetchall()
 
@@ -1238,28 +2854,43 @@ class DuckDBEngine(Engine):
             writer.writerow(str(v) if v is not None else "" for v in row)
         return buf.getvalue().encode("utf-8")
 
-    def run_query(self, dataset_id: str, sql: str) -> dict:
+    def run_query(self, dataset_id: str, sql: str, encoding: str = "rows") -> dict:
+        self._check_encoding(encoding)
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
 
         start = time.time()
         with self._query_lock:
             self.conn.execute(
-                f"CREATE OR REPLACE VIEW data AS SELECT * FROM {table_sql}"
+                f"CREATE OR REPLACE VIEW data AS "
+                f"SELECT {self._star_sql(dataset_id)} FROM {table_sql}"
             )
             try:
                 result = self.conn.execute(sql)
+                fetched = None
                 if result.description is None:
                     cols: list[str] = []
                     raw_rows: list[Any] = []
+                elif encoding == COLUMNAR_ENCODING:
+                    fetched = fetch_columns(result)
                 else:
                     cols = [desc[0] for desc in result.description]
                     raw_rows = result.fetchall()
             finally:
+                # Invalidation runs statements on this cursor, so it waits
+                # until the user's result has been read.
+                if self._may_modify_data(sql):
+                    # The statement may have changed any table, so stored
+                    # stats can no longer be trusted.
+                    self._invalidate_table_stats()
+                    self._bump_version()
                 self.conn.execute("DROP VIEW IF EXISTS data")
 
         elapsed = round(time.time() - start, 4)
 
+        if encoding == COLUMNAR_ENCODING:
+            return {**encode_columns(fetched or []), "executionTime": elapsed}
+
         rows: list[dict[str, Any]] = []
         for raw in raw_rows:
             row: dict[str, Any] = {}
@@ -1287,7 +2918,9 @@ class DuckDBEngine(Engine):
         table = self._get_table(dataset_id)
         table_sql = self._quote_ident(table)
         with self._query_lock:
-            df = self.conn.execute(f"SELECT * FROM {table_sql}").df()
+            df = self.conn.execute(
+                f"SELECT {self._star_sql(dataset_id)} FROM {table_sql}"
+            ).df()
         return execute_python_code(code, df)
 
     def get_column_value_suggestions(
@@ -1296,6 +2929,16 @@ class DuckDBEngine(Engine):
         column: str,
         query: str | None,
         limit: int,
+    ) -> list[dict[str, Any]]:
+        q = (query or "").strip()
+        return self._cached(
+            dataset_id,
+            ("values", column, q, limit),
+            lambda: self._compute_value_suggestions(dataset_id, column, q, limit),
+        )
+
+    def _compute_value_suggestions(
+        self, dataset_id: str, column: str, q: str, limit: int
     ) -> list[dict[str, Any]]:
         table = self._get_table(dataset_id)
         col_meta = self._get_column_meta(table)
@@ -1304,7 +2947,6 @@ class DuckDBEngine(Engine):
 
         table_sql = self._quote_ident(table)
         col_sql = self._quote_ident(column)
-        q = (query or "").strip()
         params: list[Any] = []
         where_sql = f"{col_sql} IS NOT NULL"
         if q:
@@ -1365,13 +3007,18 @@ class DuckDBEngine(Engine):
         if not isinstance(limit, int) or limit < 1 or limit > 10000:
             raise ValueError("limit must be an integer between 1 and 10000")
 
-        filter_clauses: list[str] = []
-        filter_params: list[Any] = []
-        for f in filters:
-            clause, p = self._build_filter_clause(f, col_meta)
-            filter_clauses.append(clause)
-            filter_params.extend(p)
+        encoding = spec.get("encoding") or "rows"
+        self._check_encoding(encoding)
+
+        filter_parts = [self._build_filter_clause(f, col_meta) for f in filters]
+        filter_clauses = [clause for clause, _ in filter_parts]
+        filter_params = [p for _, params in filter_parts for p in params]
         where_sql = f"WHERE {' AND '.join(filter_clauses)}" if filter_clauses else ""
+        # The generated SQL shows the filters; execution reads the cached set.
+        exec_where_sql = where_sql
+        filter_set = self._filter_set(dataset_id, table, filter_parts, filters)
+        if filter_set:
+            exec_where_sql = f"WHERE {filter_set['clause']}"
 
         select_parts: list[str] = []
         for col in group_by:
@@ -1422,7 +3069,7 @@ class DuckDBEngine(Engine):
 
         has_agg = len(aggregations) > 0
         if not select_parts:
-            select_sql = "*"
+            select_sql = self._star_sql(dataset_id)
         else:
             select_sql = ", ".join(select_parts)
 
@@ -1490,7 +3137,29 @@ class DuckDBEngine(Engine):
         sql = f"SELECT {select_sql} FROM {table_sql} {where_sql} {group_sql} {having_sql} {order_sql} LIMIT ?"
         params = [*filter_params, *having_params, limit]
 
-        result = self.conn.execute(sql, params)
+        result = None
+        if filter_set:
+            try:
+                result = self.conn.execute(
+                    f"SELECT {select_sql} FROM {table_sql} {exec_where_sql} "
+                    f"{group_sql} {having_sql} {order_sql} LIMIT ?",
+                    [*having_params, limit],
+                )
+            except duckdb.CatalogException:
+                # Evicted between lookup and query; evaluate the filters.
+                self._forget_filter_set(filter_set)
+        if result is None:
+            result = self.conn.execute(sql, params)
+        generated_python = self._to_python_query_repr(
+            filters, group_by, aggregations, having_items, sort_items, limit
+        )
+        if encoding == COLUMNAR_ENCODING:
+            return {
+                **encode_columns(fetch_columns(result)),
+                "generatedSql": sql,
+                "generatedPython": generated_python,
+            }
+
         col_names = [desc[0] for desc in result.description]
         raw_rows = result.fetchall()
 
@@ -1505,9 +3174,6 @@ class DuckDBEngine(Engine):
             rows.append(row)
 
         generated_sql = sql
-        generated_python = self._to_python_query_repr(
-            filters, group_by, aggregations, having_items, sort_items, limit
-        )
 
         return {
             "columns": col_names,
@@ -1603,22 +3269,44 @@ class DuckDBEngine(Engine):
         return "".join(parts)
 
     def close(self) -> None:
-        self.conn.close()
+        self._snapshot_builds.shutdown(wait=False, cancel_futures=True)
+        self._db.close()
 
     def _get_table(self, dataset_id: str) -> str:
         table = self.datasets.get(dataset_id)
         if not table:
             raise ValueError(f"Dataset not found: {dataset_id}")
+        self._note_scan(dataset_id)
         return table
 
+    def _rowid_sql(self, dataset_id: str) -> str:
+        if dataset_id in self._attached:
+            return self._quote_ident(ROWID_COLUMN)
+        return "rowid"
+
+    def _star_sql(self, dataset_id: str) -> str:
+        if dataset_id in self._attached:
+            return f"* EXCLUDE ({self._quote_ident(ROWID_COLUMN)})"
+        return "*"
+
     def _quote_ident(self, ident: str) -> str:
         return '"' + ident.replace('"', '""') + '"'
 
-    def _get_column_meta(self, table: str) -> dict[str, dict[str, str]]:
+    def _quote_literal(self, value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    def _table_columns(self, table: str) -> list[tuple[str, str]]:
         table_sql = self._quote_ident(table)
         rows = self.conn.execute(f"PRAGMA table_info({table_sql})").fetchall()
+        return [
+            (name, duck_type)
+            for _, name, duck_type, *_ in rows
+            if name != ROWID_COLUMN
+        ]
+
+    def _get_column_meta(self, table: str) -> dict[str, dict[str, str]]:
         meta: dict[str, dict[str, str]] = {}
-        for _, name, duck_type, *_ in rows:
+        for name, duck_type in self._table_columns(table):
             meta[name] = {
                 "duck_type": duck_type,
                 "app_type": map_duckdb_type(duck_type),
@@ -1755,52 +3443,176 @@ class DuckDBEngine(Engine):
 
         return [self._coerce_value(item, app_type, col, op) for item in values]
 
+    def _check_encoding(self, encoding: str) -> None:
+        if encoding not in RESULT_ENCODINGS:
+            raise ValueError(f"Unsupported result encoding: {encoding}")
+
+    def _page_columns(
+        self,
+        col_meta: dict[str, dict[str, str]],
+        columns: list[str] | None,
+        column_offset: int,
+        column_limit: int | None,
+    ) -> tuple[list[str], int]:
+        """Resolve the projection, then cut the requested column window.
+        Returns the window and the number of columns it was cut from."""
+        if columns is None:
+            selected = list(col_meta)
+        else:
+            for col in columns:
+                if col not in col_meta:
+                    raise ValueError(f"Invalid column: {col}")
+            selected = list(dict.fromkeys(columns))
+        if column_offset < 0:
+            raise ValueError("column_offset must be non-negative")
+        if column_limit is not None and column_limit < 1:
+            raise ValueError("column_limit must be positive")
+        end = None if column_limit is None else column_offset + column_limit
+        return selected[column_offset:end], len(selected)
+
+    def _sort_keys(
+        self,
+        sort_column: str | None,
+        sort_direction: str | None,
+        sort: list[dict] | None,
+        col_meta: dict[str, dict[str, str]],
+    ) -> list[tuple[str, str]]:
+        """Normalize the sort request into ordered (column, ASC|DESC) keys."""
+        if sort is None:
+            sort = (
+                [{"column": sort_column, "direction": "desc" if sort_direction == "desc" else "asc"}]
+                if sort_column is not None
+                else []
+            )
+
+        keys: list[tuple[str, str]] = []
+        for item in sort:
+            if not isinstance(item, dict):
+                raise ValueError("Each sort key must be an object")
+            column = item.get("column")
+            if column not in col_meta:
+                raise ValueError(f"Invalid sort column: {column}")
+            if any(column == seen for seen, _ in keys):
+                raise ValueError(f"Duplicate sort column: {column}")
+            direction = str(item.get("direction") or "asc").lower()
+            if direction not in {"asc", "desc"}:
+                raise ValueError(f"Invalid sort direction: {item.get('direction')}")
+            keys.append((column, direction.upper()))
+        return keys
+
+    def _order_sql(
+        self,
+        sort_keys: list[tuple[str, str]],
+        rowid_sql: str,
+        backward: bool = False,
+    ) -> str:
+        """ORDER BY terms: each key NULLS LAST, then the row id in the last
+        key's direction. Backward scans reverse every term."""
+        flip = {"ASC": "DESC", "DESC": "ASC"}
+        terms = []
+        for column, direction in sort_keys:
+            if backward:
+                terms.append(f"{self._quote_ident(column)} {flip[direction]} NULLS FIRST")
+            else:
+                terms.append(f"{self._quote_ident(column)} {direction} NULLS LAST")
+        rowid_dir = sort_keys[-1][1] if sort_keys else "ASC"
+        terms.append(f"{rowid_sql} {flip[rowid_dir] if backward else rowid_dir}")
+        return ", ".join(terms)
+
     def _build_cursor_predicate(
         self,
         cursor: str,
-        sort_column: str | None,
-        sort_dir: str,
+        sort_keys: list[tuple[str, str]],
         col_meta: dict[str, dict[str, str]],
-    ) -> tuple[str, list[Any]]:
+        rowid_sql: str = "rowid",
+    ) -> tuple[str, list[Any], bool]:
+        """Keyset predicate for rows after the cursor's anchor row, or before
+        it for backward cursors. Returns (clause, params, backward)."""
         payload = self._decode_cursor(cursor)
 
-        if payload.get("v") != 1:
+        if payload.get("v") == 1:
+            # Single-key cursors issued before compound sorts.
+            column = payload.get("s")
+            payload = {
+                **payload,
+                "s": [[column, payload.get("d")]] if column else [],
+                "k": [payload.get("k")],
+                "n": [payload.get("n", False)],
+            }
+        elif payload.get("v") != 2:
             raise ValueError("Invalid cursor version")
-        if payload.get("s") != sort_column:
-            raise ValueError("Cursor does not match current sort column")
-        if payload.get("d") != sort_dir:
-            raise ValueError("Cursor does not match current sort direction")
+        if [tuple(key) for key in payload.get("s", [])] != sort_keys:
+            raise ValueError("Cursor does not match current sort")
         if "r" not in payload:
             raise ValueError("Cursor is missing row anchor")
 
         anchor_rowid = int(payload["r"])
-
-        if not sort_column:
-            return "rowid > ?", [anchor_rowid]
-
-        sort_sql = self._quote_ident(sort_column)
-        app_type = col_meta[sort_column]["app_type"]
-        is_null = bool(payload.get("n", False))
-
-        if is_null:
-            if sort_dir == "ASC":
-                return f"({sort_sql} IS NULL AND rowid > ?)", [anchor_rowid]
-            return f"({sort_sql} IS NULL AND rowid < ?)", [anchor_rowid]
-
-        if "k" not in payload:
+        backward = bool(payload.get("b", False))
+        key_values = payload.get("k") or []
+        key_nulls = payload.get("n") or []
+        if sort_keys and (len(key_values) < len(sort_keys) or len(key_nulls) < len(sort_keys)):
             raise ValueError("Cursor is missing sort key")
-        anchor_value = self._deserialize_cursor_value(payload["k"], app_type)
-
-        if sort_dir == "ASC":
-            return (
-                f"(({sort_sql} > ?) OR ({sort_sql} = ? AND rowid > ?) OR {sort_sql} IS NULL)",
-                [anchor_value, anchor_value, anchor_rowid],
-            )
 
-        return (
-            f"(({sort_sql} < ?) OR ({sort_sql} = ? AND rowid < ?) OR {sort_sql} IS NULL)",
-            [anchor_value, anchor_value, anchor_rowid],
-        )
+        # Expand the ORDER BY as: equal on every earlier key and strictly
+        # past the anchor on this one. NULLs sort last in forward order.
+        equal_terms: list[str] = []
+        equal_params: list[Any] = []
+        branches: list[str] = []
+        params: list[Any] = []
+        for i, (column, direction) in enumerate(sort_keys):
+            col_sql = self._quote_ident(column)
+            if key_nulls[i]:
+                step_sql = f"{col_sql} IS NOT NULL" if backward else None
+                step_params: list[Any] = []
+                eq_sql = f"{col_sql} IS NULL"
+                eq_params: list[Any] = []
+            else:
+                value = self._deserialize_cursor_value(
+                    key_values[i], col_meta[column]["app_type"]
+                )
+                op = ">" if (direction == "ASC") != backward else "<"
+                step_sql = f"{col_sql} {op} ?"
+                if not backward:
+                    step_sql = f"({step_sql} OR {col_sql} IS NULL)"
+                step_params = [value]
+                eq_sql = f"{col_sql} = ?"
+                eq_params = [value]
+            if step_sql:
+                branches.append(" AND ".join([*equal_terms, step_sql]))
+                params.extend([*equal_params, *step_params])
+            equal_terms.append(eq_sql)
+            equal_params.extend(eq_params)
+
+        rowid_dir = sort_keys[-1][1] if sort_keys else "ASC"
+        rowid_op = ">" if (rowid_dir == "ASC") != backward else "<"
+        branches.append(" AND ".join([*equal_terms, f"{rowid_sql} {rowid_op} ?"]))
+        params.extend([*equal_params, anchor_rowid])
+
+        clause = " OR ".join(f"({b})" for b in branches)
+        return f"({clause})", params, backward
+
+    def _row_cursor(
+        self,
+        row: tuple[Any, ...],
+        col_names: list[str],
+        sort_keys: list[tuple[str, str]],
+        backward: bool = False,
+        snapshot: str | None = None,
+    ) -> str:
+        key_values = [row[col_names.index(column)] for column, _ in sort_keys]
+        payload: dict[str, Any] = {
+            "v": 2,
+            "s": [list(key) for key in sort_keys],
+            "k": [self._serialize_cursor_value(v) for v in key_values],
+            "n": [v is None for v in key_values],
+            "r": int(row[col_names.index("__rowid__")]),
+        }
+        if backward:
+            payload["b"] = True
+        if snapshot is not None:
+            # The key values keep the cursor usable once the snapshot is gone.
+            payload["p"] = [int(row[col_names.index("__pos__")]), snapshot]
+        return self._encode_cursor(payload)
 
     def _serialize_cursor_value(self, value: Any) -> Any:
         if value is None or isinstance(value, (str, int, float, bool)):
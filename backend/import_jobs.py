@@ -0,0 +1,294 @@
+"""Background import jobs: entities load on a worker pool while callers poll status.
+
+Jobs can optionally precompute column profiles once an entity has loaded. That
+stage runs on its own single worker so it never delays other imports, and it
+pauses between columns while interactive requests are in flight."""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from engine import DuckDBEngine
+
+IMPORT_WORKERS = 2
+PROFILE_WORKERS = 1
+IMPORT_JOB_LIMIT = 200
+# Upper bound for callers that block on a job instead of polling it.
+IMPORT_WAIT_SECONDS = 600
+# Background profiling waits at most this long per column for busy periods
+# to pass, so it always makes progress.
+PROFILE_YIELD_SECONDS = 2.0
+PROFILE_YIELD_POLL_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobManager:
+    def __init__(
+        self,
+        engine: DuckDBEngine,
+        max_workers: int = IMPORT_WORKERS,
+        is_busy: Callable[[], bool] | None = None,
+    ) -> None:
+        self.engine = engine
+        # Reports whether interactive requests are running; profiling yields.
+        self._is_busy = is_busy
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="import"
+        )
+        self._profile_executor = ThreadPoolExecutor(
+            max_workers=PROFILE_WORKERS, thread_name_prefix="profile"
+        )
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._done: dict[str, threading.Event] = {}
+        # dataset id -> profile status for profiles scheduled outside a job
+        self._dataset_profiles: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        path: str,
+        file_format: str,
+        entities: list[dict[str, Any]],
+        load_mode: str = "copy",
+        content_hash: str | None = None,
+        precompute_profiles: bool = False,
+        profile_columns: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Queue one load per entity. Each entity dict has name, datasetName, entity.
+
+        With precompute_profiles, each loaded entity then has its column
+        profiles (all, or profile_columns) computed in the background."""
+        if not entities:
+            raise ValueError("No entities selected for import")
+
+        job_id = uuid.uuid4().hex
+        job: dict[str, Any] = {
+            "jobId": job_id,
+            "status": "queued",
+            "createdAt": time.time(),
+            "elapsedSeconds": 0.0,
+            "entities": [
+                {
+                    "name": item["name"],
+                    "datasetName": item["datasetName"],
+                    "status": "queued",
+                    "rowsLoaded": None,
+                    "elapsedSeconds": None,
+                    "dataset": None,
+                    "error": None,
+                    "profileStatus": "pending" if precompute_profiles else None,
+                }
+                for item in entities
+            ],
+        }
+
+        with self._lock:
+            # Only finished jobs are evicted; a queued or running one may
+            # still have a caller waiting on it.
+            finished = [
+                jid for jid, other in self._jobs.items()
+                if other["status"] not in {"queued", "running"}
+            ]
+            for oldest in finished[: max(0, len(self._jobs) - IMPORT_JOB_LIMIT + 1)]:
+                self._jobs.pop(oldest)
+                self._done.pop(oldest, None)
+            self._jobs[job_id] = job
+            self._done[job_id] = threading.Event()
+
+        for idx, item in enumerate(entities):
+            self._executor.submit(
+                self._run_entity,
+                job_id,
+                idx,
+                path,
+                file_format,
+                item["datasetName"],
+                item.get("entity"),
+                load_mode,
+                content_hash,
+                profile_columns if precompute_profiles else False,
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict[str, Any]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise ValueError(f"Import job not found: {job_id}")
+            snapshot = copy.deepcopy(job)
+        if snapshot["status"] in {"queued", "running"}:
+            snapshot["elapsedSeconds"] = round(time.time() - snapshot["createdAt"], 4)
+        return snapshot
+
+    def wait(self, job_id: str, timeout: float = IMPORT_WAIT_SECONDS) -> dict[str, Any]:
+        """The job once it has finished, or as it stands after timeout."""
+        done = self._done.get(job_id)
+        if done is None:
+            raise ValueError(f"Import job not found: {job_id}")
+        done.wait(timeout)
+        return self.get(job_id)
+
+    def schedule_profiles(self, dataset_id: str, columns: list[str] | None = None) -> None:
+        """Precompute profiles for an already-loaded dataset in the background."""
+        self._set_dataset_profile_status(dataset_id, "queued")
+        self._profile_executor.submit(self._run_dataset_profiles, dataset_id, columns)
+
+    def profile_status(self, dataset_id: str) -> str | None:
+        """Status of profiles scheduled with schedule_profiles, if any."""
+        with self._lock:
+            return self._dataset_profiles.get(dataset_id)
+
+    def _run_dataset_profiles(self, dataset_id: str, columns: list[str] | None) -> None:
+        self._set_dataset_profile_status(dataset_id, "running")
+        try:
+            self.engine.precompute_profiles(
+                dataset_id, columns, before_column=self._yield_to_requests
+            )
+        except Exception:
+            logger.exception("Background profiling failed for dataset %s", dataset_id)
+            self._set_dataset_profile_status(dataset_id, "failed")
+            return
+        self._set_dataset_profile_status(dataset_id, "complete")
+
+    def _set_dataset_profile_status(self, dataset_id: str, status: str) -> None:
+        with self._lock:
+            self._dataset_profiles[dataset_id] = status
+            self._dataset_profiles.move_to_end(dataset_id)
+            while len(self._dataset_profiles) > IMPORT_JOB_LIMIT:
+                self._dataset_profiles.popitem(last=False)
+
+    def _yield_to_requests(self) -> None:
+        if self._is_busy is None:
+            return
+        deadline = time.monotonic() + PROFILE_YIELD_SECONDS
+        while self._is_busy() and time.monotonic() < deadline:
+            time.sleep(PROFILE_YIELD_POLL_SECONDS)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._profile_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_entity(
+        self,
+        job_id: str,
+        idx: int,
+        path: str,
+        file_format: str,
+        dataset_name: str,
+        entity: str | None,
+        load_mode: str,
+        content_hash: str | None,
+        profile_columns: list[str] | None | bool,
+    ) -> None:
+        start = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = "running"
+            job["entities"][idx]["status"] = "running"
+
+        try:
+            dataset_id = self.engine.load_file(
+                path,
+                dataset_name,
+                file_format=file_format,
+                entity=entity,
+                mode=load_mode,
+                content_hash=content_hash,
+            )
+            schema = self.engine.get_schema(dataset_id)
+        except Exception as e:
+            # Any failure must settle the entity, or waiters would block forever.
+            self._finish_entity(job_id, idx, start, error=str(e))
+            return
+
+        self._finish_entity(
+            job_id,
+            idx,
+            start,
+            dataset={
+                "id": dataset_id,
+                "name": dataset_name,
+                "rowCount": schema["rowCount"],
+                "columns": schema["columns"],
+                "sourceType": "file",
+            },
+        )
+        # False means no profiling; None means every column.
+        if profile_columns is not False:
+            self._set_profile_status(job_id, idx, "queued")
+            self._profile_executor.submit(
+                self._run_profiles, job_id, idx, dataset_id, profile_columns
+            )
+
+    def _run_profiles(
+        self,
+        job_id: str,
+        idx: int,
+        dataset_id: str,
+        columns: list[str] | None,
+    ) -> None:
+        self._set_profile_status(job_id, idx, "running")
+        try:
+            self.engine.precompute_profiles(
+                dataset_id, columns, before_column=self._yield_to_requests
+            )
+        except Exception:
+            # Profiles are an optimization; the dataset itself is loaded.
+            logger.exception("Background profiling failed for dataset %s", dataset_id)
+            self._set_profile_status(job_id, idx, "failed")
+            return
+        self._set_profile_status(job_id, idx, "complete")
+
+    def _set_profile_status(self, job_id: str, idx: int, status: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["entities"][idx]["profileStatus"] = status
+
+    def _finish_entity(
+        self,
+        job_id: str,
+        idx: int,
+        start: float,
+        dataset: dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            state = job["entities"][idx]
+            state["elapsedSeconds"] = round(time.time() - start, 4)
+            if dataset is not None:
+                state["status"] = "complete"
+                state["dataset"] = dataset
+                state["rowsLoaded"] = dataset["rowCount"]
+            else:
+                state["status"] = "failed"
+                state["error"] = error
+                state["profileStatus"] = None
+
+            statuses = [e["status"] for e in job["entities"]]
+            if any(s in {"queued", "running"} for s in statuses):
+                return
+            if all(s == "complete" for s in statuses):
+                job["status"] = "complete"
+            elif all(s == "failed" for s in statuses):
+                job["status"] = "failed"
+            else:
+                job["status"] = "partial"
+            job["elapsedSeconds"] = round(time.time() - job["createdAt"], 4)
+            done = self._done.get(job_id)
+
+        if done is not None:
+            done.set()
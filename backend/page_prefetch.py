@@ -0,0 +1,192 @@
+"""Speculative server-side prefetch of the pages that follow a served page.
+
+After a page is served, the next one or two pages of the same request are
+computed in the background and kept per session, keyed by the request
+arguments (including the cursor) and the dataset version. Sequential
+scrolling through nextCursor is then answered from memory."""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any
+
+from engine import DuckDBEngine
+
+PREFETCH_WORKERS = 1
+PREFETCH_MAX_DEPTH = 2
+PREFETCH_PAGES_PER_SESSION = 4
+PREFETCH_SESSION_LIMIT = 64
+
+
+class PagePrefetcher:
+    def __init__(
+        self,
+        engine: DuckDBEngine,
+        pages_per_session: int = PREFETCH_PAGES_PER_SESSION,
+        session_limit: int = PREFETCH_SESSION_LIMIT,
+    ) -> None:
+        self.engine = engine
+        self.pages_per_session = pages_per_session
+        self.session_limit = session_limit
+        self._executor = ThreadPoolExecutor(
+            max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch"
+        )
+        self._sessions: OrderedDict[str, OrderedDict[str, Future]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._prefetched = 0
+
+    def get_page(
+        self, session: str, depth: int, dataset_id: str, **kwargs: Any
+    ) -> tuple[dict, bool]:
+        """Serve a page through the session cache. Returns (page, hit) and
+        queues prefetches of the next ``depth`` pages."""
+        if not 0 <= depth <= PREFETCH_MAX_DEPTH:
+            raise ValueError(f"prefetch depth must be between 0 and {PREFETCH_MAX_DEPTH}")
+
+        key = self._key(dataset_id, kwargs)
+        with self._lock:
+            future = self._sessions.get(session, {}).get(key)
+
+        result = None
+        if future is not None and future.cancel():
+            # Still queued, possibly behind other sessions' chains: computing
+            # the page inline is faster, and the chain stops when it gets here.
+            self._drop(session, key)
+        elif future is not None:
+            try:
+                # A prefetch already running counts as a hit; waiting beats recomputing.
+                result = future.result()
+            except (Exception, CancelledError):
+                self._drop(session, key)
+        with self._lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        hit = result is not None
+        if result is None:
+            result = self.engine.get_page(dataset_id=dataset_id, **kwargs)
+        elif result["page"] != kwargs["page"]:
+            result = {**result, "page": kwargs["page"]}
+
+        if depth:
+            self._schedule(session, depth, dataset_id, kwargs, result)
+        return result, hit
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "prefetched": self._prefetched,
+                "sessions": len(self._sessions),
+                "cachedPages": sum(len(pages) for pages in self._sessions.values()),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Cancelled work items never fill their claimed futures; cancel those
+        # too so no request waits on them. Running pages still complete.
+        with self._lock:
+            futures = [f for pages in self._sessions.values() for f in pages.values()]
+        for future in futures:
+            future.cancel()
+
+    def _schedule(
+        self,
+        session: str,
+        depth: int,
+        dataset_id: str,
+        kwargs: dict[str, Any],
+        served: dict,
+    ) -> None:
+        cursor = served.get("nextCursor")
+        if not cursor:
+            return
+        # The first follower is registered right away so a request racing the
+        # prefetch waits for it instead of computing the same page again.
+        args = {**kwargs, "page": kwargs["page"] + 1, "cursor": cursor}
+        key = self._key(dataset_id, args)
+        future, owned = self._claim(session, key)
+        try:
+            self._executor.submit(
+                self._prefetch_chain, session, depth, dataset_id, args, future, owned
+            )
+        except RuntimeError:
+            # Shut down: nothing will fill the claimed future.
+            if owned:
+                future.cancel()
+                self._drop(session, key)
+
+    def _prefetch_chain(
+        self,
+        session: str,
+        depth: int,
+        dataset_id: str,
+        args: dict[str, Any],
+        future: Future,
+        owned: bool,
+    ) -> None:
+        # Each page needs the previous page's nextCursor, so the chain runs in order.
+        for step in range(depth):
+            if step:
+                future, owned = self._claim(session, self._key(dataset_id, args))
+            if not owned or not future.set_running_or_notify_cancel():
+                # Another chain owns this page and continues from it (waiting
+                # here could block the worker that chain is queued on), or a
+                # request cancelled it to compute the page itself.
+                return
+            try:
+                page = self.engine.get_page(dataset_id=dataset_id, **args)
+            except Exception as exc:
+                future.set_exception(exc)
+                return
+            future.set_result(page)
+            with self._lock:
+                self._prefetched += 1
+            cursor = page.get("nextCursor")
+            if not cursor:
+                return
+            args = {**args, "page": args["page"] + 1, "cursor": cursor}
+
+    def _claim(self, session: str, key: str) -> tuple[Future, bool]:
+        """Return the future for key, and whether the caller must fill it."""
+        with self._lock:
+            pages = self._session_pages(session)
+            existing = pages.get(key)
+            if existing is not None:
+                pages.move_to_end(key)
+                return existing, False
+            future: Future = Future()
+            pages[key] = future
+            while len(pages) > self.pages_per_session:
+                pages.popitem(last=False)
+            return future, True
+
+    def _session_pages(self, session: str) -> OrderedDict[str, Future]:
+        pages = self._sessions.get(session)
+        if pages is None:
+            pages = self._sessions[session] = OrderedDict()
+            while len(self._sessions) > self.session_limit:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session)
+        return pages
+
+    def _drop(self, session: str, key: str) -> None:
+        with self._lock:
+            self._sessions.get(session, {}).pop(key, None)
+
+    def _key(self, dataset_id: str, kwargs: dict[str, Any]) -> str:
+        # A cursor pins the rows, so the page number is only echoed back.
+        if kwargs.get("cursor"):
+            kwargs = {k: v for k, v in kwargs.items() if k != "page"}
+        return json.dumps(
+            [self.engine.dataset_version(dataset_id), dataset_id, kwargs],
+            sort_keys=True,
+            default=str,
+        )
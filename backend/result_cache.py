@@ -0,0 +1,75 @@
+"""Byte-bounded LRU cache for JSON-serializable engine results."""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache:
+    """Least-recently-used cache whose budget is the serialized size of its
+    values. Keys are tuples whose first element is the owning table, so all
+    entries of one table can be discarded together."""
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[Hashable, ...], tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self, key: tuple[Hashable, ...], compute: Callable[[], Any]
+    ) -> Any:
+        """Return the cached value for key, computing and storing it on a miss.
+        Cached values are shared between callers and must not be mutated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        value = compute()
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+        return value
+
+    def get(self, key: tuple[Hashable, ...], default: Any = None) -> Any:
+        """Return the cached value for key without computing it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def discard(self, owner: Hashable | None = None) -> None:
+        """Drop every entry of one owner, or everything when owner is None."""
+        with self._lock:
+            if owner is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [k for k in self._entries if k[0] == owner]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
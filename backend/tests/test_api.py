@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import base64
+import csv
+import hashlib
+import io
 import json
+import os
 from pathlib import Path
 import sqlite3
 import sys
+import threading
+import time
 
 import duckdb
 from openpyxl import Workbook
+import pytest
 
 
 from fastapi.testclient import TestClient
@@ -15,7 +23,14 @@ BACKEND_DIR = Path(__file__).resolve().parents[1]
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
+os.environ.setdefault("ZEN_DATABASE_PATH", ":memory:")
+
 import app as app_module
+import engine as engine_module
+import import_jobs
+from engine import DuckDBEngine
+from page_prefetch import PagePrefetcher
+from result_cache import ResultCache
 
 client = TestClient(app_module.app)
 DATA_FILE = BACKEND_DIR / "data" / "sales_sample.csv"
@@ -35,6 +50,88 @@ def test_upload_rejects_unsafe_filename() -> None:
     assert "Invalid filename" in resp.text
 
 
+def test_upload_reports_progress_and_hash() -> None:
+    csv_bytes = b"id,name\n1,a\n2,b\n"
+    resp = client.post(
+        "/api/datasets/upload",
+        params={"upload_id": "progress-check"},
+        files={"file": ("progress.csv", csv_bytes, "text/csv")},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["uploadId"] == "progress-check"
+
+    progress_resp = client.get("/api/uploads/progress-check")
+    assert progress_resp.status_code == 200
+    progress = progress_resp.json()
+    assert progress["status"] == "complete"
+    # Progress counts the multipart request body as it streams in; the
+    # stored file size is reported separately.
+    assert progress["bytesReceived"] == progress["totalBytes"] > len(csv_bytes)
+    assert progress["fileBytes"] == len(csv_bytes)
+    assert progress["sha256"] == hashlib.sha256(csv_bytes).hexdigest()
+
+    bad = client.post(
+        "/api/datasets/upload",
+        params={"upload_id": "progress-bad"},
+        files={"file": ("progress.txt", b"x", "text/plain")},
+    )
+    assert bad.status_code == 400
+    failed = client.get("/api/uploads/progress-bad").json()
+    assert failed["status"] == "failed" and failed["bytesReceived"] > 0
+
+    profiled = client.post(
+        "/api/datasets/upload",
+        params={"upload_id": "progress-profiled", "precompute_profiles": True},
+        files={"file": ("profiled.csv", b"id,name\n1,a\n", "text/csv")},
+    )
+    assert profiled.status_code == 200
+    deadline = time.time() + 30
+    while True:
+        status = client.get("/api/uploads/progress-profiled").json()["profileStatus"]
+        if status not in {"queued", "running"} or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    assert status == "complete"
+
+
+def test_upload_rejects_files_over_limit(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "MAX_UPLOAD_BYTES", 8)
+    resp = client.post(
+        "/api/datasets/upload",
+        files={"file": ("big.csv", b"id,name\n1,a\n2,b\n", "text/csv")},
+    )
+    assert resp.status_code == 413
+
+
+def test_upload_middleware_stops_reading_bodies_over_limit(monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "MAX_UPLOAD_BYTES", 64)
+    boundary = "zenlimit"
+    # The file itself is under the limit; the multipart body around it is not.
+    chunks = [
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\n".encode(),
+        b"x" * 128,
+        f"\r\n--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+        f'filename="small.csv"\r\nContent-Type: text/csv\r\n\r\n'.encode(),
+        b"id,name\n1,a\n",
+        f"\r\n--{boundary}--\r\n".encode(),
+    ]
+
+    def body():
+        yield from chunks
+
+    # Streamed without a Content-Length, so only the received count can tell.
+    resp = client.post(
+        "/api/datasets/upload",
+        params={"upload_id": "progress-too-large"},
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    assert resp.status_code == 413
+    progress = client.get("/api/uploads/progress-too-large").json()
+    assert progress["status"] == "failed"
+    assert progress["bytesReceived"] > 64
+
+
 def test_upload_accepts_parquet(tmp_path: Path) -> None:
     parquet_path = tmp_path / "tiny.parquet"
     conn = duckdb.connect()
@@ -60,6 +157,252 @@ def test_upload_accepts_parquet(tmp_path: Path) -> None:
     assert payload["rowCount"] == 2
 
 
+def test_upload_attach_mode_pages_and_exports(tmp_path: Path) -> None:
+    parquet_path = tmp_path / "attached.parquet"
+    conn = duckdb.connect()
+    conn.execute(
+        "COPY (SELECT range AS id, range % 3 AS bucket FROM range(25)) TO ? (FORMAT PARQUET)",
+        [str(parquet_path)],
+    )
+    conn.close()
+
+    resp = client.post(
+        "/api/datasets/upload",
+        params={"mode": "attach"},
+        files={
+            "file": (
+                "attached.parquet",
+                parquet_path.read_bytes(),
+                "application/octet-stream",
+            )
+        },
+    )
+    assert resp.status_code == 200
+    payload = resp.json()
+    assert payload["rowCount"] == 25
+    assert [c["name"] for c in payload["columns"]] == ["id", "bucket"]
+
+    dataset_id = payload["id"]
+    first = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"page_size": 10, "sort_column": "bucket", "sort_direction": "desc"},
+    ).json()
+    assert first["columns"] == ["id", "bucket"]
+    second = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={
+            "page_size": 10,
+            "sort_column": "bucket",
+            "sort_direction": "desc",
+            "cursor": first["nextCursor"],
+        },
+    ).json()
+    seen = [r["id"] for r in first["rows"] + second["rows"]]
+    assert len(set(seen)) == 20
+
+    export_resp = client.get(f"/api/datasets/{dataset_id}/export")
+    assert export_resp.status_code == 200
+    assert export_resp.text.splitlines()[0] == "id,bucket"
+
+
+def test_attached_dataset_materializes_after_repeated_scans(tmp_path: Path) -> None:
+    parquet_path = tmp_path / "attached.parquet"
+    conn = duckdb.connect()
+    conn.execute(
+        "COPY (SELECT * FROM (VALUES (1, 'a'), (2, 'b'), (3, 'c')) t(id, name)) "
+        "TO ? (FORMAT PARQUET)",
+        [str(parquet_path)],
+    )
+    conn.close()
+    local_engine = DuckDBEngine(attach_materialize_after=2)
+    try:
+        dataset_id = local_engine.load_file(
+            str(parquet_path), "attached.parquet", "parquet", mode="attach"
+        )
+        local_engine.get_schema(dataset_id)
+        # Cached schema calls do not scan; paging does.
+        local_engine.get_schema(dataset_id)
+        local_engine.get_page(dataset_id, 0, 2, None, None, [])
+        local_engine._attached[dataset_id]["thread"].join(timeout=10)
+
+        kinds = local_engine.conn.execute(
+            "SELECT table_name, table_type FROM information_schema.tables "
+            "WHERE table_name LIKE ?",
+            [f"ds_{dataset_id}%"],
+        ).fetchall()
+        assert ("ds_" + dataset_id + "__native", "BASE TABLE") in kinds
+
+        page = local_engine.get_page(dataset_id, 0, 2, None, None, [])
+        assert [r["id"] for r in page["rows"]] == [1, 2]
+        assert page["columns"] == ["id", "name"]
+    finally:
+        local_engine.close()
+
+
+def test_attaching_files_does_not_count_by_scanning(tmp_path: Path) -> None:
+    conn = duckdb.connect()
+    for part in range(2):
+        conn.execute(
+            f"COPY (SELECT range AS id FROM range({part * 100}, {part * 100 + 40 + part})) "
+            f"TO ? (FORMAT PARQUET)",
+            [str(tmp_path / f"part{part}.parquet")],
+        )
+    conn.close()
+    local_engine = DuckDBEngine()
+    try:
+        counting = _CountingConnection(local_engine.conn)
+        local_engine._local.conn = counting
+        parquet_id = local_engine.load_file(
+            str(tmp_path / "*.parquet"), "parts", "parquet", mode="attach"
+        )
+        assert not [sql for sql in counting.statements if "COUNT(*)" in sql]
+
+        listed = {d["id"]: d["rowCount"] for d in local_engine.list_datasets()}
+        assert listed[parquet_id] == 81
+    finally:
+        local_engine.close()
+
+
+def test_attach_mode_rejects_csv(tmp_path: Path) -> None:
+    csv_path = tmp_path / "attached.csv"
+    csv_path.write_text("id,name\n1,a\n", encoding="utf-8")
+    local_engine = DuckDBEngine()
+    try:
+        with pytest.raises(ValueError, match="only supported for Parquet"):
+            local_engine.load_file(str(csv_path), "attached.csv", mode="attach")
+        assert local_engine.list_datasets() == []
+    finally:
+        local_engine.close()
+
+    resp = client.post(
+        "/api/datasets/upload",
+        params={"mode": "attach"},
+        files={"file": ("attached.csv", b"id,name\n1,a\n", "text/csv")},
+    )
+    assert resp.status_code == 400
+    assert "only supported for Parquet" in resp.text
+
+
+def test_register_hive_partitioned_parquet_prunes_files(
+    tmp_path: Path, monkeypatch
+) -> None:
+    root = tmp_path / "events"
+    conn = duckdb.connect()
+    for day, count in (("2026-10-01", 5), ("2026-10-02", 3)):
+        part = root / f"day={day}"
+        part.mkdir(parents=True)
+        conn.execute(
+            f"COPY (SELECT range AS id FROM range({count})) TO ? (FORMAT PARQUET)",
+            [str(part / "data.parquet")],
+        )
+    conn.close()
+    monkeypatch.setattr(app_module, "SOURCE_ROOT", tmp_path.resolve())
+
+    resp = client.post("/api/datasets/sources", json={"path": str(root)})
+    assert resp.status_code == 200
+    payload = resp.json()
+    assert payload["format"] == "parquet"
+    assert payload["rowCount"] == 8
+    assert [c["name"] for c in payload["columns"]] == ["id", "day"]
+
+    dataset_id = payload["id"]
+    filters = json.dumps([{"column": "day", "operator": "=", "value": "2026-10-02"}])
+    page = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"page_size": 10, "filters": filters},
+    ).json()
+    assert page["filteredRows"] == 3
+    assert [r["id"] for r in page["rows"]] == [0, 1, 2]
+
+    export_resp = client.get(f"/api/datasets/{dataset_id}/export", params={"filters": filters})
+    assert len(export_resp.text.splitlines()) == 4
+
+    table = app_module.engine._get_table(dataset_id)
+    plan = app_module.engine.conn.execute(
+        f'EXPLAIN ANALYZE SELECT * FROM "{table}" WHERE "day" = ?', ["2026-10-02"]
+    ).fetchall()[0][1]
+    assert "Total Files Read: 1" in plan
+
+
+def test_register_source_rejects_paths_outside_root(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(app_module, "SOURCE_ROOT", (tmp_path / "root").resolve())
+    resp = client.post("/api/datasets/sources", json={"path": str(tmp_path / "*.csv")})
+    assert resp.status_code == 400
+
+    (tmp_path / "root").mkdir()
+    resp = client.post("/api/datasets/sources", json={"path": "missing.csv"})
+    assert resp.status_code == 404
+
+
+def test_catalog_restores_datasets_after_restart(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "catalog.duckdb")
+    csv_path = tmp_path / "restart.csv"
+    csv_path.write_text("id,name\n1,a\n2,b\n", encoding="utf-8")
+
+    parquet_path = tmp_path / "restart.parquet"
+
+    first = DuckDBEngine(database=db_path)
+    first.conn.execute(
+        f"COPY (SELECT * FROM read_csv(?)) TO '{parquet_path}' (FORMAT PARQUET)",
+        [str(csv_path)],
+    )
+    copied_id = first.load_file(str(csv_path), "restart.csv")
+    attached_id = first.load_file(str(parquet_path), "restart.parquet", "parquet", mode="attach")
+    first.close()
+
+    restored = DuckDBEngine(database=db_path)
+    try:
+        listed = {d["id"]: d for d in restored.list_datasets()}
+        assert listed[copied_id]["name"] == "restart.csv"
+        assert listed[copied_id]["format"] == "csv"
+        assert listed[copied_id]["rowCount"] == 2
+        assert listed[attached_id]["mode"] == "attach"
+
+        assert restored.get_schema(copied_id)["rowCount"] == 2
+        page = restored.get_page(attached_id, 0, 10, "id", "desc", [])
+        assert [r["id"] for r in page["rows"]] == [2, 1]
+        assert page["columns"] == ["id", "name"]
+    finally:
+        restored.close()
+
+
+def test_list_datasets_endpoint() -> None:
+    dataset_id = _dataset_id()
+    resp = client.get("/api/datasets")
+    assert resp.status_code == 200
+    ids = {d["id"] for d in resp.json()["datasets"]}
+    assert dataset_id in ids
+
+
+def test_reupload_reuses_table_until_last_alias_is_deleted() -> None:
+    csv_bytes = b"order_id,total\n501,9.5\n502,12.25\n503,3.0\n"
+    first = client.post(
+        "/api/datasets/upload",
+        files={"file": ("orders.csv", csv_bytes, "text/csv")},
+    ).json()
+    second = client.post(
+        "/api/datasets/upload",
+        files={"file": ("orders_again.csv", csv_bytes, "text/csv")},
+    ).json()
+    assert first["id"] != second["id"]
+    assert second["name"] == "orders_again.csv"
+    assert app_module.engine.datasets[first["id"]] == app_module.engine.datasets[second["id"]]
+
+    listed = {d["id"]: d for d in client.get("/api/datasets").json()["datasets"]}
+    assert listed[second["id"]]["sharedTableRefs"] == 2
+
+    delete_first = client.delete(f"/api/datasets/{first['id']}")
+    assert delete_first.status_code == 200
+    assert delete_first.json()["tableDropped"] is False
+
+    page = client.get(f"/api/datasets/{second['id']}/page").json()
+    assert [r["order_id"] for r in page["rows"]] == [501, 502, 503]
+
+    delete_second = client.delete(f"/api/datasets/{second['id']}")
+    assert delete_second.json()["tableDropped"] is True
+    assert client.get(f"/api/datasets/{second['id']}/schema").status_code == 404
+
+
 def test_discover_and_import_csv(tmp_path: Path) -> None:
     csv_path = tmp_path / "tiny.csv"
     csv_path.write_text("id,name\n1,a\n2,b\n", encoding="utf-8")
@@ -88,6 +431,164 @@ def test_discover_and_import_csv(tmp_path: Path) -> None:
     assert import_payload["datasets"][0]["rowCount"] == 2
 
 
+def test_import_job_reports_entity_progress(tmp_path: Path) -> None:
+    csv_path = tmp_path / "queued.csv"
+    csv_path.write_text("id,name\n1,a\n2,b\n3,c\n", encoding="utf-8")
+
+    discover_resp = client.post(
+        "/api/datasets/discover",
+        files={"file": ("queued.csv", csv_path.read_bytes(), "text/csv")},
+    )
+    assert discover_resp.status_code == 200
+
+    submit_resp = client.post(
+        "/api/datasets/import-jobs",
+        json={"importId": discover_resp.json()["importId"], "importMode": "all"},
+    )
+    assert submit_resp.status_code == 200
+    job_id = submit_resp.json()["jobId"]
+
+    app_module.import_jobs.wait(job_id, timeout=30)
+    status_resp = client.get(f"/api/datasets/import-jobs/{job_id}")
+    assert status_resp.status_code == 200
+    job = status_resp.json()
+    assert job["status"] == "complete"
+    entity = job["entities"][0]
+    assert entity["status"] == "complete"
+    assert entity["rowsLoaded"] == 3
+    assert entity["elapsedSeconds"] is not None
+
+    dataset_id = entity["dataset"]["id"]
+    page = client.get(f"/api/datasets/{dataset_id}/page").json()
+    assert len(page["rows"]) == 3
+
+
+def test_import_jobs_settle_on_any_error_and_keep_running_jobs(monkeypatch) -> None:
+    release = threading.Event()
+
+    class BlockingEngine:
+        def load_file(self, path: str, name: str, **kwargs):
+            if name == "broken":
+                raise RuntimeError("reader crashed")
+            release.wait(10)
+            raise RuntimeError("released")
+
+    monkeypatch.setattr(import_jobs, "IMPORT_JOB_LIMIT", 1)
+    manager = import_jobs.ImportJobManager(BlockingEngine())
+    try:
+        entity = {"name": "e", "entity": None}
+        broken = manager.submit("x.csv", "csv", [{**entity, "datasetName": "broken"}])
+        failed = manager.wait(broken["jobId"], timeout=10)
+        assert failed["status"] == "failed"
+        assert failed["entities"][0]["error"] == "reader crashed"
+
+        # The running job survives the next submit; the finished one is evicted.
+        running = manager.submit("x.csv", "csv", [{**entity, "datasetName": "slow"}])
+        manager.submit("x.csv", "csv", [{**entity, "datasetName": "slow"}])
+        assert manager.wait(running["jobId"], timeout=0.05)["status"] in {"queued", "running"}
+        with pytest.raises(ValueError):
+            manager.get(broken["jobId"])
+        release.set()
+        assert manager.wait(running["jobId"], timeout=10)["status"] == "failed"
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_background_profiles_log_failures_and_yield_to_requests(monkeypatch, caplog) -> None:
+    busy = threading.Event()
+    busy.set()
+    paused: list[bool] = []
+
+    class ProfilingEngine:
+        def precompute_profiles(self, dataset_id, columns=None, before_column=None):
+            before_column()
+            paused.append(not busy.is_set())
+            if dataset_id == "broken":
+                raise RuntimeError("profile crashed")
+            return 1
+
+    monkeypatch.setattr(import_jobs, "PROFILE_YIELD_POLL_SECONDS", 0.01)
+    manager = import_jobs.ImportJobManager(ProfilingEngine(), is_busy=busy.is_set)
+    try:
+        manager.schedule_profiles("ok")
+        time.sleep(0.1)
+        assert manager.profile_status("ok") == "running" and not paused
+        busy.clear()
+
+        manager.schedule_profiles("broken")
+        deadline = time.time() + 10
+        while manager.profile_status("broken") in {"queued", "running"}:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert manager.profile_status("ok") == "complete"
+        assert manager.profile_status("broken") == "failed"
+        assert paused == [True, True]
+        assert "profile crashed" in caplog.text
+    finally:
+        manager.shutdown()
+
+
+def test_import_job_precomputes_selected_profiles(tmp_path: Path) -> None:
+    csv_path = tmp_path / "profiled.csv"
+    csv_path.write_text("id,name\n1,a\n2,b\n3,c\n", encoding="utf-8")
+    discover_resp = client.post(
+        "/api/datasets/discover",
+        files={"file": ("profiled.csv", csv_path.read_bytes(), "text/csv")},
+    )
+    submit_resp = client.post(
+        "/api/datasets/import-jobs",
+        json={
+            "importId": discover_resp.json()["importId"],
+            "precomputeProfiles": True,
+            "profileColumns": ["name"],
+        },
+    )
+    job_id = submit_resp.json()["jobId"]
+    app_module.import_jobs.wait(job_id, timeout=30)
+
+    deadline = time.time() + 30
+    while True:
+        entity = client.get(f"/api/datasets/import-jobs/{job_id}").json()["entities"][0]
+        if entity["profileStatus"] not in {"pending", "queued", "running"}:
+            break
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert entity["profileStatus"] == "complete"
+
+    engine = app_module.engine
+    table = engine.datasets[entity["dataset"]["id"]]
+    stored = engine.conn.execute(
+        "SELECT column_name FROM zen_meta.column_profiles WHERE table_name = ?", [table]
+    ).fetchall()
+    assert stored == [("name",)]
+
+
+def test_stored_profiles_are_served_after_restart(tmp_path: Path, monkeypatch) -> None:
+    db_path = str(tmp_path / "profiles.duckdb")
+    first = DuckDBEngine(database=db_path)
+    dataset_id = first.load_file(str(DATA_FILE), "sales_sample.csv")
+    assert first.precompute_profiles(dataset_id) == 10
+    expected = first.profile_column(dataset_id, "amount")
+    first.close()
+
+    restored = DuckDBEngine(database=db_path)
+    try:
+        def fail(*args: object) -> dict:
+            raise AssertionError("profile should come from the stats table")
+
+        monkeypatch.setattr(restored, "_profile_column_uncached", fail)
+        assert restored.profile_column(dataset_id, "amount") == expected
+        assert restored.precompute_profiles(dataset_id) == 0
+    finally:
+        restored.close()
+
+
+def test_import_job_unknown_id_returns_404() -> None:
+    resp = client.get("/api/datasets/import-jobs/missing")
+    assert resp.status_code == 404
+
+
 def test_discover_and_import_parquet(tmp_path: Path) -> None:
     parquet_path = tmp_path / "batch.parquet"
     conn = duckdb.connect()
@@ -228,6 +729,86 @@ def test_discover_and_import_sqlite_selected_table(tmp_path: Path) -> None:
     assert dataset["rowCount"] == 3
 
 
+def test_discover_uses_metadata_row_counts(tmp_path: Path) -> None:
+    xlsx_path = tmp_path / "meta.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    assert ws is not None
+    ws.title = "claims"
+    ws.append(["claim_id", "paid_amt"])
+    for i in range(5):
+        ws.append([f"CLM{i}", i * 10.0])
+    wb.create_sheet("blank")
+    wb.save(xlsx_path)
+
+    sqlite_path = tmp_path / "meta.sqlite"
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute("CREATE TABLE members(id INTEGER, name TEXT)")
+    conn.executemany(
+        "INSERT INTO members(id, name) VALUES (?, ?)",
+        [(i, f"m{i}") for i in range(7)],
+    )
+    conn.commit()
+    conn.close()
+
+    engine = app_module.engine
+    sheets = {e["name"]: e for e in engine.discover_file_entities(str(xlsx_path), "excel")}
+    assert sheets["claims"]["rowCount"] == 5
+    assert sheets["claims"]["rowCountEstimated"] is True
+    assert sheets["blank"]["rowCount"] == 0
+
+    tables = engine.discover_file_entities(str(sqlite_path), "sqlite")
+    assert tables[0]["rowCount"] == 7
+    assert tables[0]["rowCountEstimated"] is True
+    exact = engine.discover_file_entities(str(sqlite_path), "sqlite", exact_counts=True)
+    assert exact[0]["rowCount"] == 7
+    assert exact[0]["rowCountEstimated"] is False
+
+
+def test_discover_csv_exact_counts_on_request(tmp_path: Path) -> None:
+    csv_bytes = b"id,name\n1,a\n2,b\n3,c\n"
+    fast = client.post(
+        "/api/datasets/discover",
+        files={"file": ("fast.csv", csv_bytes, "text/csv")},
+    ).json()
+    assert fast["entities"][0]["rowCount"] == 3
+    assert fast["entities"][0]["rowCountEstimated"] is True
+
+    exact = client.post(
+        "/api/datasets/discover",
+        params={"exact_counts": "true"},
+        files={"file": ("exact.csv", csv_bytes, "text/csv")},
+    ).json()
+    assert exact["entities"][0]["rowCount"] == 3
+    assert exact["entities"][0]["rowCountEstimated"] is False
+
+
+def test_discover_sniff_is_reused_by_import(tmp_path: Path) -> None:
+    csv_bytes = b"id;label;opened\n1;\"a;b\";2024-01-02\n2;c;2024-02-03\n"
+    discover_resp = client.post(
+        "/api/datasets/discover",
+        files={"file": ("sniffed.csv", csv_bytes, "text/csv")},
+    )
+    assert discover_resp.status_code == 200
+    sniff = discover_resp.json()["entities"][0]["sniff"]
+    assert sniff["delimiter"] == ";"
+    assert [c["name"] for c in sniff["columns"]] == ["id", "label", "opened"]
+    assert sniff["columns"][2]["type"] == "DATE"
+
+    body = {"importId": discover_resp.json()["importId"], "importMode": "all"}
+    attach_resp = client.post("/api/datasets/import", json={**body, "loadMode": "attach"})
+    assert attach_resp.status_code == 400
+
+    import_resp = client.post("/api/datasets/import", json={**body, "loadMode": "copy"})
+    assert import_resp.status_code == 200
+    dataset = import_resp.json()["datasets"][0]
+    assert [c["type"] for c in dataset["columns"]] == ["integer", "string", "date"]
+
+    # The load reads with the sniffed dialect, so the quoted delimiter survives.
+    page = client.get(f"/api/datasets/{dataset['id']}/page").json()
+    assert [r["label"] for r in page["rows"]] == ["a;b", "c"]
+
+
 def test_page_rejects_invalid_sort_column() -> None:
     dataset_id = _dataset_id()
     resp = client.get(
@@ -368,6 +949,752 @@ def test_schema_includes_column_sparklines() -> None:
         assert len(col["sparkline"]) <= 8
 
 
+def test_schema_sparklines_are_binned_in_sql_and_deterministic(tmp_path: Path) -> None:
+    csv_path = tmp_path / "spark.csv"
+    csv_path.write_text(
+        "n,flag,label,day\n"
+        + "".join(
+            f"{i},{'true' if i % 4 else 'false'},l{i % 20},2024-01-{1 + i % 28:02d}\n"
+            for i in range(5000)
+        )
+        + ",,,\n",
+        encoding="utf-8",
+    )
+    parquet_path = tmp_path / "spark.parquet"
+    local_engine = DuckDBEngine()
+    try:
+        local_engine.conn.execute(
+            f"COPY (SELECT * FROM read_csv(?)) TO '{parquet_path}' (FORMAT PARQUET)",
+            [str(csv_path)],
+        )
+        for path, file_format, mode in (
+            (csv_path, "csv", "copy"),
+            (parquet_path, "parquet", "attach"),
+        ):
+            dataset_id = local_engine.load_file(str(path), path.name, file_format, mode=mode)
+            first = {c["name"]: c["sparkline"] for c in local_engine.get_schema(dataset_id)["columns"]}
+            second = {c["name"]: c["sparkline"] for c in local_engine.get_schema(dataset_id)["columns"]}
+            assert first == second
+            assert len(first["n"]) == 8
+            assert sum(first["n"]) == 2000
+            assert sum(first["flag"]) == 2000 and len(first["flag"]) == 2
+            assert first["flag"][0] < first["flag"][1]
+            assert len(first["label"]) == 8
+            assert first["label"] == sorted(first["label"], reverse=True)
+            assert len(first["day"]) == 8
+    finally:
+        local_engine.close()
+
+
+def test_schema_stats_record_is_reused_until_data_changes(tmp_path: Path) -> None:
+    csv_path = tmp_path / "stats.csv"
+    csv_path.write_text("id,tag\n1,a\n2,\n3,a\n", encoding="utf-8")
+    local_engine = DuckDBEngine()
+    try:
+        dataset_id = local_engine.load_file(str(csv_path), "stats.csv")
+        first = {c["name"]: c for c in local_engine.get_schema(dataset_id)["columns"]}
+        assert first["tag"]["nullCount"] == 1
+        assert first["tag"]["uniqueCount"] == 1
+        assert first["id"]["uniqueCount"] == 3
+
+        # Writes that bypass the engine are not seen: the stored record serves.
+        table = local_engine.datasets[dataset_id]
+        local_engine.conn.execute(f'UPDATE "{table}" SET tag = \'b\' WHERE id = 2')
+        cached = {c["name"]: c for c in local_engine.get_schema(dataset_id)["columns"]}
+        assert cached["tag"]["nullCount"] == 1
+
+        local_engine.run_query(dataset_id, f"UPDATE \"{table}\" SET tag = 'c' WHERE id = 3")
+        fresh = {c["name"]: c for c in local_engine.get_schema(dataset_id)["columns"]}
+        assert fresh["tag"]["nullCount"] == 0
+        assert fresh["tag"]["uniqueCount"] == 3
+    finally:
+        local_engine.close()
+
+
+def test_schema_uses_approx_distinct_above_threshold(tmp_path: Path) -> None:
+    csv_path = tmp_path / "approx.csv"
+    csv_path.write_text(
+        "id,tag\n" + "".join(f"{i},t{i % 40}\n" for i in range(200)), encoding="utf-8"
+    )
+    local_engine = DuckDBEngine(approx_distinct_after=100)
+    try:
+        dataset_id = local_engine.load_file(str(csv_path), "approx.csv")
+        columns = {c["name"]: c for c in local_engine.get_schema(dataset_id)["columns"]}
+        assert columns["tag"]["uniqueCountApprox"] is True
+        assert 30 <= columns["tag"]["uniqueCount"] <= 50
+
+        exact = local_engine.count_distinct(dataset_id, "tag")
+        assert exact == {"column": "tag", "uniqueCount": 40, "uniqueCountApprox": False}
+        columns = {c["name"]: c for c in local_engine.get_schema(dataset_id)["columns"]}
+        assert columns["tag"]["uniqueCount"] == 40
+        assert columns["tag"]["uniqueCountApprox"] is False
+        assert columns["id"]["uniqueCountApprox"] is True
+    finally:
+        local_engine.close()
+
+
+def test_unique_count_endpoint() -> None:
+    dataset_id = _dataset_id()
+    resp = client.get(f"/api/datasets/{dataset_id}/columns/region/unique-count")
+    assert resp.status_code == 200
+    assert resp.json()["uniqueCountApprox"] is False
+
+    missing = client.get(f"/api/datasets/{dataset_id}/columns/nope/unique-count")
+    assert missing.status_code == 404
+
+
+def test_schema_and_profile_return_304_until_dataset_changes() -> None:
+    dataset_id = _dataset_id()
+    for path in (
+        f"/api/datasets/{dataset_id}/schema",
+        f"/api/datasets/{dataset_id}/profile/amount",
+        f"/api/datasets/{dataset_id}/columns/region/values",
+    ):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        cached = client.get(path, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
+    schema_path = f"/api/datasets/{dataset_id}/schema"
+    etag = client.get(schema_path).headers["etag"]
+    table = app_module.engine.datasets[dataset_id]
+    client.post(
+        f"/api/datasets/{dataset_id}/query",
+        json={"sql": f"UPDATE \"{table}\" SET region = 'North' WHERE id = 1"},
+    )
+    changed = client.get(schema_path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_result_cache_reuses_results_per_version() -> None:
+    local_engine = DuckDBEngine()
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        first = local_engine.profile_column(dataset_id, "amount")
+        assert local_engine.profile_column(dataset_id, "amount") is first
+
+        local_engine.run_query(dataset_id, "CREATE TEMP TABLE touched AS SELECT 1")
+        assert local_engine.profile_column(dataset_id, "amount") is not first
+    finally:
+        local_engine.close()
+
+
+def test_page_row_counts_are_cached_per_filter_signature() -> None:
+    local_engine = DuckDBEngine()
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        region = {"column": "region", "operator": "=", "value": "West"}
+        amount = {"column": "amount", "operator": ">", "value": 1000}
+        first = local_engine.get_page(dataset_id, 0, 5, None, None, [region, amount])
+
+        # Rows written behind the engine's back stay invisible to the counts
+        # until the version changes, proving both counts came from the cache.
+        table = local_engine.datasets[dataset_id]
+        local_engine.conn.execute(
+            f"INSERT INTO \"{table}\" SELECT * FROM \"{table}\" WHERE region = 'West'"
+        )
+        again = local_engine.get_page(
+            dataset_id, 1, 5, None, None, [amount, region], cursor=first["nextCursor"]
+        )
+        assert again["totalRows"] == first["totalRows"]
+        assert again["filteredRows"] == first["filteredRows"]
+
+        local_engine.run_query(dataset_id, "CREATE TEMP TABLE bump AS SELECT 1")
+        fresh = local_engine.get_page(dataset_id, 0, 5, None, None, [region, amount])
+        assert fresh["filteredRows"] == 2 * first["filteredRows"]
+        assert fresh["totalRows"] > first["totalRows"]
+    finally:
+        local_engine.close()
+
+
+def test_prev_cursor_pages_backward_over_sorted_nulls() -> None:
+    dataset_id = _dataset_id()
+    engine = app_module.engine
+    for sort_column, sort_dir in ((None, None), ("amount", "asc"), ("amount", "desc")):
+        forward: list[list[int]] = []
+        page = engine.get_page(dataset_id, 0, 4, sort_column, sort_dir, [])
+        assert page["prevCursor"] is None
+        while True:
+            forward.append([r["id"] for r in page["rows"]])
+            if not page["nextCursor"]:
+                break
+            page = engine.get_page(
+                dataset_id, len(forward), 4, sort_column, sort_dir, [], cursor=page["nextCursor"]
+            )
+
+        backward = [[r["id"] for r in page["rows"]]]
+        while page["prevCursor"]:
+            page = engine.get_page(
+                dataset_id, 0, 4, sort_column, sort_dir, [], cursor=page["prevCursor"]
+            )
+            backward.append([r["id"] for r in page["rows"]])
+            assert page["nextCursor"] is not None
+        assert backward[::-1] == forward
+
+
+def test_multi_column_sort_pages_and_exports_in_compound_order() -> None:
+    dataset_id = _dataset_id()
+    engine = app_module.engine
+    table = engine.datasets[dataset_id]
+    sort = [
+        {"column": "status", "direction": "asc"},
+        {"column": "discount", "direction": "desc"},
+        {"column": "region", "direction": "asc"},
+    ]
+    expected = [
+        row[0]
+        for row in engine.conn.execute(
+            f'SELECT id FROM "{table}" ORDER BY status ASC NULLS LAST, '
+            "discount DESC NULLS LAST, region ASC NULLS LAST, id ASC"
+        ).fetchall()
+    ]
+
+    forward: list[int] = []
+    page = engine.get_page(dataset_id, 0, 4, None, None, [], sort=sort)
+    while True:
+        forward.extend(r["id"] for r in page["rows"])
+        if not page["nextCursor"]:
+            break
+        page = engine.get_page(dataset_id, 1, 4, None, None, [], cursor=page["nextCursor"], sort=sort)
+    assert forward == expected
+
+    backward = [r["id"] for r in page["rows"]]
+    while page["prevCursor"]:
+        page = engine.get_page(dataset_id, 0, 4, None, None, [], cursor=page["prevCursor"], sort=sort)
+        backward = [r["id"] for r in page["rows"]] + backward
+    assert backward == expected
+
+    jumped = engine.get_page(dataset_id, 5, 4, None, None, [], sort=sort)
+    assert [r["id"] for r in jumped["rows"]] == expected[20:24]
+
+    response = client.get(
+        f"/api/datasets/{dataset_id}/export", params={"sort": json.dumps(sort)}
+    )
+    assert response.status_code == 200
+    exported = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in exported] == expected
+
+    mismatched = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"sort": json.dumps(sort[:1]), "cursor": page["nextCursor"] or jumped["nextCursor"]},
+    )
+    assert mismatched.status_code == 400
+    duplicate = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"sort": json.dumps([sort[0], sort[0]])},
+    )
+    assert duplicate.status_code == 400
+
+
+def test_page_projects_requested_columns_and_windows() -> None:
+    dataset_id = _dataset_id()
+    full = client.get(f"/api/datasets/{dataset_id}/page", params={"page_size": 5})
+    assert full.status_code == 200
+    assert int(full.headers["x-response-bytes"]) == len(full.content)
+
+    params = {
+        "page_size": 5,
+        "sort_column": "amount",
+        "sort_direction": "desc",
+        "columns": json.dumps(["region", "product", "status", "id"]),
+        "column_offset": 1,
+        "column_limit": 2,
+    }
+    window = client.get(f"/api/datasets/{dataset_id}/page", params=params)
+    assert window.status_code == 200
+    body = window.json()
+    assert body["columns"] == ["product", "status"]
+    assert body["totalColumns"] == 4
+    assert all(set(row) == {"product", "status"} for row in body["rows"])
+    assert int(window.headers["x-response-bytes"]) < int(full.headers["x-response-bytes"])
+
+    unprojected = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"page_size": 5, "column_offset": 1, "column_limit": 2},
+    ).json()
+    assert unprojected["totalColumns"] == len(full.json()["columns"])
+
+    # The cursor still carries the hidden sort key.
+    following = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={**params, "columns": json.dumps(["id"]), "column_offset": 0,
+                "cursor": body["nextCursor"]},
+    ).json()
+    expected = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={"page_size": 10, "sort_column": "amount", "sort_direction": "desc"},
+    ).json()
+    assert [r["id"] for r in following["rows"]] == [r["id"] for r in expected["rows"][5:]]
+
+    missing = client.get(
+        f"/api/datasets/{dataset_id}/page", params={"columns": json.dumps(["nope"])}
+    )
+    assert missing.status_code == 400
+
+
+def _decode_columnar(body: dict) -> list[dict]:
+    rows = []
+    for i in range(body["rowCount"] if "rowCount" in body else len(body["columnData"][0])):
+        row = {}
+        for name, values, bitmap in zip(body["columns"], body["columnData"], body["nullBitmaps"]):
+            bits = base64.b64decode(bitmap) if bitmap else b""
+            is_null = bool(bits) and bool(bits[i // 8] >> (i % 8) & 1)
+            row[name] = None if is_null else values[i]
+        rows.append(row)
+    return rows
+
+
+def test_columnar_encoding_matches_row_encoding() -> None:
+    dataset_id = _dataset_id()
+    base = {"page_size": 7, "sort_column": "discount", "sort_direction": "desc"}
+    rows = client.get(f"/api/datasets/{dataset_id}/page", params=base).json()
+    packed = client.get(
+        f"/api/datasets/{dataset_id}/page", params={**base, "encoding": "columnar"}
+    )
+    assert packed.status_code == 200
+    body = packed.json()
+    assert body["encoding"] == "columnar" and "rows" not in body
+    assert _decode_columnar(body) == rows["rows"]
+    assert body["nextCursor"] == rows["nextCursor"]
+    assert len(packed.content) < len(client.get(
+        f"/api/datasets/{dataset_id}/page", params=base
+    ).content)
+
+    back = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={**base, "encoding": "columnar", "cursor": rows["nextCursor"]},
+    ).json()
+    prev = client.get(
+        f"/api/datasets/{dataset_id}/page",
+        params={**base, "encoding": "columnar", "cursor": back["prevCursor"]},
+    ).json()
+    assert _decode_columnar(prev) == rows["rows"]
+
+    sql = "SELECT id, amount, date::DATE AS d, discount, NULL AS n FROM data ORDER BY id LIMIT 5"
+    plain = client.post(f"/api/datasets/{dataset_id}/query", json={"sql": sql}).json()
+    columnar = client.post(
+        f"/api/datasets/{dataset_id}/query", json={"sql": sql, "encoding": "columnar"}
+    ).json()
+    assert columnar["rowCount"] == plain["rowCount"] == 5
+    assert _decode_columnar(columnar) == plain["rows"]
+
+    spec = {"groupBy": ["region"], "aggregations": [{"op": "sum", "column": "amount"}],
+            "sort": [{"column": "region"}]}
+    grouped = client.post(f"/api/datasets/{dataset_id}/table-query", json=spec).json()
+    grouped_columnar = client.post(
+        f"/api/datasets/{dataset_id}/table-query", json={**spec, "encoding": "columnar"}
+    ).json()
+    assert _decode_columnar(grouped_columnar) == grouped["rows"]
+
+    bad = client.get(f"/api/datasets/{dataset_id}/page", params={"encoding": "arrow"})
+    assert bad.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "select_sql",
+    [
+        "170141183460469231731687303715884105727::HUGEINT AS h, 7::UHUGEINT AS uh",
+        "12345678901234567890.1234::DECIMAL(38,4) AS wide",
+        "CASE WHEN id % 2 = 0 THEN TIMESTAMP '2024-01-02 03:04:05' "
+        "ELSE TIMESTAMP '2024-01-02 03:04:05.25' END AS ts, 'x'::BLOB AS b",
+        "TIMESTAMPTZ '2024-01-02 03:04:05.5+00' AS tz",
+    ],
+)
+def test_columnar_encoding_matches_rows_for_exact_types(select_sql: str) -> None:
+    if "TIMESTAMPTZ" in select_sql:
+        # DuckDB needs pytz to hand zoned timestamps to Python at all.
+        pytest.importorskip("pytz")
+    dataset_id = _dataset_id()
+    sql = f"SELECT id, {select_sql}, NULL AS n FROM data ORDER BY id LIMIT 4"
+    plain = client.post(f"/api/datasets/{dataset_id}/query", json={"sql": sql}).json()
+    columnar = client.post(
+        f"/api/datasets/{dataset_id}/query", json={"sql": sql, "encoding": "columnar"}
+    ).json()
+    assert plain["rowCount"] == 4
+    assert _decode_columnar(columnar) == plain["rows"]
+
+
+def test_page_prefetch_serves_sequential_scrolling_from_memory() -> None:
+    dataset_id = _dataset_id()
+    url = f"/api/datasets/{dataset_id}/page"
+    base = {"page_size": 5, "sort_column": "amount", "sort_direction": "asc"}
+    before = client.get("/api/page-prefetch/stats").json()
+
+    expected: list[list[int]] = []
+    page = client.get(url, params=base).json()
+    while True:
+        expected.append([r["id"] for r in page["rows"]])
+        if not page["nextCursor"]:
+            break
+        page = client.get(
+            url, params={**base, "page": len(expected), "cursor": page["nextCursor"]}
+        ).json()
+
+    session = {**base, "prefetch": 2, "session": "scroll-test"}
+    first = client.get(url, params=session)
+    assert first.headers["x-prefetch"] == "miss"
+    seen = [[r["id"] for r in first.json()["rows"]]]
+    cursor = first.json()["nextCursor"]
+    while cursor:
+        response = client.get(url, params={**session, "page": len(seen), "cursor": cursor})
+        assert response.headers["x-prefetch"] == "hit"
+        body = response.json()
+        assert body["page"] == len(seen)
+        seen.append([r["id"] for r in body["rows"]])
+        cursor = body["nextCursor"]
+    assert seen == expected
+
+    after = client.get("/api/page-prefetch/stats").json()
+    assert after["hits"] - before["hits"] == len(expected) - 1
+    assert after["misses"] - before["misses"] == 1
+    assert after["prefetched"] - before["prefetched"] >= len(expected) - 1
+
+    # Another session does not see this session's pages.
+    other = client.get(
+        url, params={**session, "session": "other", "page": 1, "cursor": first.json()["nextCursor"]}
+    )
+    assert other.headers["x-prefetch"] == "miss"
+
+
+def test_page_prefetch_does_not_wait_on_queued_pages() -> None:
+    local_engine = DuckDBEngine()
+    prefetcher = PagePrefetcher(local_engine)
+    release = threading.Event()
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        args = dict(page_size=5, sort_column="id", sort_direction="asc", filters=[])
+        # Occupy the only worker, as another session's chain would.
+        prefetcher._executor.submit(release.wait, 10)
+
+        first, hit = prefetcher.get_page("queued", 1, dataset_id, page=0, **args)
+        assert not hit
+        pending = next(iter(prefetcher._sessions["queued"].values()))
+        assert not pending.running() and not pending.done()
+
+        # The follower is still queued: it is computed inline, not awaited.
+        second, hit = prefetcher.get_page(
+            "queued", 0, dataset_id, page=1, cursor=first["nextCursor"], **args
+        )
+        assert not hit and pending.cancelled()
+        assert [r["id"] for r in second["rows"]] == [6, 7, 8, 9, 10]
+
+        prefetcher.get_page("queued", 1, dataset_id, page=1, cursor=first["nextCursor"], **args)
+        claimed = [f for pages in prefetcher._sessions.values() for f in pages.values()]
+        prefetcher.shutdown()
+        assert claimed and all(f.done() for f in claimed)
+    finally:
+        release.set()
+        prefetcher.shutdown()
+        local_engine.close()
+
+
+def _settle_snapshots(local_engine: DuckDBEngine) -> None:
+    deadline = time.monotonic() + 10
+    while any(e.get("building") for e in list(local_engine._snapshots.values())):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_sorted_views_are_served_from_snapshots_under_a_budget() -> None:
+    local_engine = DuckDBEngine(sort_snapshot_after=2)
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        table = local_engine.datasets[dataset_id]
+        filters = [{"column": "amount", "operator": ">", "value": 300}]
+        sort = [{"column": "region", "direction": "desc"}, {"column": "quantity", "direction": "asc"}]
+        expected = [
+            row[0]
+            for row in local_engine.conn.execute(
+                f'SELECT id FROM "{table}" WHERE amount > 300 ORDER BY '
+                "region DESC NULLS LAST, quantity ASC NULLS LAST, rowid ASC"
+            ).fetchall()
+        ]
+
+        def scratch_tables() -> int:
+            return local_engine.conn.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() "
+                "WHERE database_name = 'zen_scratch' AND table_name LIKE 'snapshot_%'"
+            ).fetchone()[0]
+
+        walked: list[int] = []
+        page = local_engine.get_page(dataset_id, 0, 4, None, None, filters, sort=sort)
+        assert scratch_tables() == 0
+        while True:
+            walked.extend(r["id"] for r in page["rows"])
+            if not page["nextCursor"]:
+                break
+            page = local_engine.get_page(
+                dataset_id, 1, 4, None, None, filters, cursor=page["nextCursor"], sort=sort
+            )
+            # Builds run in the background; keyset pages serve until then.
+            _settle_snapshots(local_engine)
+        assert walked == expected
+        assert scratch_tables() == 1
+        assert "p" in local_engine._decode_cursor(page["prevCursor"])
+
+        backward = [r["id"] for r in page["rows"]]
+        while page["prevCursor"]:
+            page = local_engine.get_page(
+                dataset_id, 0, 4, None, None, filters, cursor=page["prevCursor"], sort=sort
+            )
+            backward = [r["id"] for r in page["rows"]] + backward
+        assert backward == expected
+
+        jumped = local_engine.get_page(dataset_id, 3, 4, None, None, filters, sort=sort)
+        assert [r["id"] for r in jumped["rows"]] == expected[12:16]
+        assert not local_engine._anchor_indexes
+
+        # A budget that holds one snapshot evicts the least recently used one.
+        first = next(iter(local_engine._snapshots.values()))
+        local_engine._sort_snapshot_bytes = first["bytes"] + 1
+        for _ in range(2):
+            local_engine.get_page(dataset_id, 0, 4, "amount", "asc", filters)
+        _settle_snapshots(local_engine)
+        assert scratch_tables() == 1
+        assert first["name"] not in [e["name"] for e in local_engine._snapshots.values()]
+
+        # Old cursors fall back to keyset paging once their snapshot is gone.
+        resumed = local_engine.get_page(
+            dataset_id, 1, 4, None, None, filters, cursor=jumped["nextCursor"], sort=sort
+        )
+        assert [r["id"] for r in resumed["rows"]] == expected[16:20]
+
+        # Views estimated over the budget are never built.
+        local_engine._sort_snapshot_bytes = 1
+        for _ in range(3):
+            local_engine.get_page(dataset_id, 0, 4, "quantity", "desc", filters)
+        oversized = [e for e in local_engine._snapshots.values() if e.get("oversized")]
+        assert len(oversized) == 1 and not oversized[0].get("building")
+
+        local_engine.run_query(dataset_id, f"DELETE FROM \"{table}\" WHERE id = 1")
+        assert scratch_tables() == 0
+    finally:
+        local_engine.close()
+
+
+def test_scratch_budgets_count_string_lengths(tmp_path: Path) -> None:
+    csv_path = tmp_path / "long_notes.csv"
+    csv_path.write_text("id,note\n" + "".join(f"{i},{'x' * 500}\n" for i in range(2000)))
+    local_engine = DuckDBEngine(sort_snapshot_after=1)
+    try:
+        dataset_id = local_engine.load_file(str(csv_path), "long_notes.csv")
+        table = local_engine.datasets[dataset_id]
+        assert local_engine._row_bytes(table) == 8 + 16 + 8 + 500
+
+        sort = [{"column": "id", "direction": "desc"}]
+        local_engine.get_page(dataset_id, 0, 10, None, None, [], sort=sort)
+        _settle_snapshots(local_engine)
+        (entry,) = local_engine._snapshots.values()
+        assert entry["name"] and entry["bytes"] >= 2000 * 500
+
+        # Fixed widths alone would have fit this budget.
+        local_engine._discard_snapshots()
+        local_engine._sort_snapshot_bytes = 2000 * 64
+        local_engine.get_page(dataset_id, 0, 10, None, None, [], sort=sort)
+        (entry,) = local_engine._snapshots.values()
+        assert entry.get("oversized") and entry["name"] is None
+    finally:
+        local_engine.close()
+
+
+def test_filter_sets_are_shared_and_stacked() -> None:
+    local_engine = DuckDBEngine(sort_snapshot_after=None)
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        table = local_engine.datasets[dataset_id]
+        west = {"column": "region", "operator": "=", "value": "West"}
+        large = {"column": "amount", "operator": ">", "value": 1000}
+
+        stacked: list[int] = []
+        stack = local_engine._stack_filter_set
+
+        def record_stack(*args):
+            stacked.append(len(args[-1]))
+            return stack(*args)
+
+        local_engine._stack_filter_set = record_stack
+
+        # A filter list gets a set on its second request.
+        first = local_engine.get_page(dataset_id, 0, 50, None, None, [west])
+        assert not local_engine._filter_sets
+        assert local_engine.get_page(dataset_id, 0, 50, None, None, [west]) == first
+        assert len(local_engine._filter_sets) == 1
+        both = local_engine.get_page(dataset_id, 0, 50, "amount", "desc", [large, west])
+        assert stacked == [1]
+        assert len(local_engine._filter_sets) == 2
+
+        expected = local_engine.conn.execute(
+            f"SELECT id FROM \"{table}\" WHERE region = 'West' AND amount > 1000 "
+            "ORDER BY amount DESC, rowid"
+        ).fetchall()
+        assert [r["id"] for r in both["rows"]] == [row[0] for row in expected]
+        assert both["filteredRows"] == len(expected)
+        assert first["filteredRows"] == sum(1 for r in first["rows"])
+
+        grouped = local_engine.run_table_query(
+            dataset_id,
+            {"filters": [west, large], "aggregations": [{"op": "count", "column": "*"}]},
+        )
+        assert grouped["rows"][0]["count_all"] == len(expected)
+        assert "zen_scratch" not in grouped["generatedSql"]
+        exported = local_engine.export_csv(dataset_id, "amount", "desc", [west, large])
+        assert len(exported.decode().strip().splitlines()) == len(expected) + 1
+        assert len(local_engine._filter_sets) == 2
+
+        # A set dropped between lookup and query falls back to the predicates.
+        for entry in local_engine._filter_sets.values():
+            local_engine._drop_scratch_tables([entry["name"]])
+        assert local_engine.export_csv(dataset_id, "amount", "desc", [west, large]) == exported
+        grouped_again = local_engine.run_table_query(
+            dataset_id,
+            {"filters": [west, large], "aggregations": [{"op": "count", "column": "*"}]},
+        )
+        assert grouped_again["rows"] == grouped["rows"]
+
+        local_engine.run_query(dataset_id, f"DELETE FROM \"{table}\" WHERE region = 'West'")
+        assert not local_engine._filter_sets
+        assert local_engine.get_page(dataset_id, 0, 50, None, None, [west])["filteredRows"] == 0
+    finally:
+        local_engine.close()
+
+
+def test_filter_sets_over_budget_are_not_rebuilt() -> None:
+    local_engine = DuckDBEngine(sort_snapshot_after=None, filter_set_bytes=8)
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        west = {"column": "region", "operator": "=", "value": "West"}
+        for _ in range(3):
+            local_engine.get_page(dataset_id, 0, 5, None, None, [west])
+        assert not local_engine._filter_sets
+        assert list(local_engine._filter_set_requests.values()) == [None]
+        scratch = local_engine.conn.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() "
+            "WHERE database_name = 'zen_scratch' AND table_name LIKE 'filter_%'"
+        ).fetchone()[0]
+        assert scratch == 0
+    finally:
+        local_engine.close()
+
+
+def test_unsorted_cursor_pages_over_a_filter_set_keep_row_order(tmp_path: Path) -> None:
+    parquet_path = tmp_path / "wide.parquet"
+    conn = duckdb.connect()
+    conn.execute(
+        "COPY (SELECT range AS id, range % 7 AS k FROM range(300000)) TO ? (FORMAT PARQUET)",
+        [str(parquet_path)],
+    )
+    conn.close()
+    local_engine = DuckDBEngine(sort_snapshot_after=None)
+    try:
+        dataset_id = local_engine.load_file(str(parquet_path), "wide.parquet", "parquet")
+        filters = [{"column": "k", "operator": "=", "value": 3}]
+        local_engine.get_page(dataset_id, 0, 500, None, None, filters)
+        page = local_engine.get_page(dataset_id, 0, 500, None, None, filters)
+        assert local_engine._filter_sets
+
+        seen: list[int] = []
+        for _ in range(8):
+            seen.extend(row["id"] for row in page["rows"])
+            page = local_engine.get_page(
+                dataset_id, 0, 500, None, None, filters, cursor=page["nextCursor"]
+            )
+        assert seen == list(range(3, 7 * 4000, 7))
+    finally:
+        local_engine.close()
+
+
+def test_estimated_filtered_rows_with_exact_follow_up() -> None:
+    local_engine = DuckDBEngine(count_estimate_after=10)
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        table = local_engine.datasets[dataset_id]
+        filters = [{"column": "status", "operator": "=", "value": "active"}]
+        exact = local_engine.conn.execute(
+            f"SELECT COUNT(*) FROM \"{table}\" WHERE status = 'active'"
+        ).fetchone()[0]
+
+        page = local_engine.get_page(dataset_id, 0, 5, None, None, filters, count_mode="estimate")
+        assert page["filteredRowsExact"] is False
+        assert page["filteredRowsConfidence"] in {"high", "medium", "low"}
+        # The sample covers this whole small table.
+        assert page["filteredRows"] == page["filteredRowsEstimate"] == exact
+        assert len(page["rows"]) == 5
+
+        counted = local_engine.filtered_count(dataset_id, filters, wait=10)
+        assert counted == {"filteredRows": exact, "status": "complete"}
+
+        again = local_engine.get_page(dataset_id, 0, 5, None, None, filters, count_mode="estimate")
+        assert again["filteredRowsExact"] is True
+        assert "filteredRowsEstimate" not in again
+    finally:
+        local_engine.close()
+
+    dataset_id = _dataset_id()
+    response = client.get(
+        f"/api/datasets/{dataset_id}/count",
+        params={"filters": json.dumps(filters), "wait": 5},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"filteredRows": exact, "status": "complete"}
+    assert client.get("/api/datasets/missing/count").status_code == 404
+    bad_mode = client.get(f"/api/datasets/{dataset_id}/page", params={"count_mode": "guess"})
+    assert bad_mode.status_code == 422
+
+
+def test_page_jumps_use_sparse_anchor_index(monkeypatch) -> None:
+    # Tiny chunks make the index build walk several keyset chunks.
+    monkeypatch.setattr(engine_module, "PAGE_ANCHOR_CHUNK", 2)
+    local_engine = DuckDBEngine(page_anchor_interval=4, sort_snapshot_after=None)
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        filters = [{"column": "amount", "operator": ">", "value": 500}]
+
+        walked: list[list[int]] = []
+        cursor = None
+        while True:
+            page = local_engine.get_page(
+                dataset_id, len(walked), 3, "quantity", "desc", filters, cursor=cursor
+            )
+            walked.append([r["id"] for r in page["rows"]])
+            cursor = page["nextCursor"]
+            if not cursor:
+                break
+
+        # The first jump is served before the index exists, later ones from it.
+        for page_no in (7, 5, 1, 7, 9):
+            if page_no == 5:
+                index = next(iter(local_engine._anchor_indexes.values()))
+                index["thread"].join(timeout=10)
+                assert index["complete"]
+                assert len(index["anchors"]) == page["filteredRows"] // 4
+            jumped = local_engine.get_page(dataset_id, page_no, 3, "quantity", "desc", filters)
+            assert [r["id"] for r in jumped["rows"]] == walked[page_no]
+            assert jumped["prevCursor"] is not None
+
+        beyond = local_engine.get_page(dataset_id, 50, 3, "quantity", "desc", filters)
+        assert beyond["rows"] == [] and beyond["nextCursor"] is None
+    finally:
+        local_engine.close()
+
+
+def test_result_cache_evicts_least_recent_entries_by_bytes() -> None:
+    cache = ResultCache(max_bytes=30)
+    cache.get_or_compute(("t", 1, "a"), lambda: "x" * 10)
+    cache.get_or_compute(("t", 1, "b"), lambda: "y" * 10)
+    cache.get_or_compute(("t", 1, "a"), lambda: "unused")
+    cache.get_or_compute(("t", 1, "c"), lambda: "z" * 10)
+    assert len(cache) == 2
+    assert cache.size_bytes <= 30
+    assert cache.get_or_compute(("t", 1, "a"), lambda: "miss") == "x" * 10
+    assert cache.get_or_compute(("t", 1, "b"), lambda: "miss") == "miss"
+
+    cache.discard("t")
+    assert len(cache) == 0 and cache.size_bytes == 0
+
+
 def test_profile_string_includes_sentinel_and_outlier_metrics(tmp_path: Path) -> None:
     csv_path = tmp_path / "sentinel_profile.csv"
     csv_path.write_text(
@@ -415,6 +1742,110 @@ def test_profile_numeric_includes_phase1_metrics() -> None:
         assert key in stats
 
 
+class _CountingConnection:
+    def __init__(self, conn: duckdb.DuckDBPyConnection) -> None:
+        self._conn = conn
+        self.statements: list[str] = []
+
+    def execute(self, sql: str, *args):
+        self.statements.append(sql)
+        return self._conn.execute(sql, *args)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+def test_profile_runs_fixed_number_of_fused_passes() -> None:
+    local_engine = DuckDBEngine(":memory:")
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        local_engine.get_page(dataset_id, 1, 10, None, None, [])
+        counting = _CountingConnection(local_engine.conn)
+        local_engine._local.conn = counting
+
+        # One aggregate pass, plus one frequency pass for every type whose
+        # metrics need value counts.
+        expected = {"amount": 2, "quantity": 2, "region": 2, "date": 2, "is_priority": 1}
+        profiles = {}
+        for column, queries in expected.items():
+            counting.statements.clear()
+            profiles[column] = local_engine._profile_column_uncached(dataset_id, column)
+            scans = [sql for sql in counting.statements if not sql.startswith("PRAGMA")]
+            assert len(scans) == queries, column
+
+        amount = profiles["amount"]
+        assert {"p5", "outlierCount", "lowTailCount"} <= set(amount["stats"])
+        assert amount["histogram"] and "lowTailValues" in amount
+        assert amount["stats"]["lowTailCount"] >= len(amount["lowTailValues"])
+        region = profiles["region"]
+        assert region["topValues"] and region["patternClasses"]
+        assert region["dominantValueCount"] == region["topValues"][0]["count"]
+        assert profiles["date"]["histogram"] and "largestGapDays" in profiles["date"]["stats"]
+        assert profiles["is_priority"]["stats"]["trueCount"] >= 0
+    finally:
+        local_engine.close()
+
+
+def test_profiles_and_sparklines_share_one_deterministic_sample(tmp_path: Path) -> None:
+    csv_path = tmp_path / "sampled.csv"
+    csv_path.write_text(
+        "id,amount,label\n"
+        + "".join(f"{i},{(i * 37) % 1000},l{i % 7}\n" for i in range(5000)),
+        encoding="utf-8",
+    )
+    local_engine = DuckDBEngine(":memory:", profile_sample_rows=2500)
+    full_engine = DuckDBEngine(":memory:")
+    unbudgeted = DuckDBEngine(":memory:", profile_sample_rows=2500, profile_sample_bytes=1)
+    try:
+        dataset_id = local_engine.load_file(str(csv_path), "sampled.csv")
+        table = local_engine._get_table(dataset_id)
+
+        def sample_tables() -> int:
+            return local_engine.conn.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() "
+                "WHERE database_name = 'zen_scratch' AND table_name LIKE 'sample_%'"
+            ).fetchone()[0]
+
+        # Headers alone never pay for drawing the shared sample.
+        schema = local_engine.get_schema(dataset_id)
+        assert sample_tables() == 0
+
+        amount = local_engine._profile_column_uncached(dataset_id, "amount")
+        assert amount["sampled"] and amount["sampleSize"] == 2500
+        assert amount["nonNullCount"] + amount["nullCount"] == 2500
+        label = local_engine._profile_column_uncached(dataset_id, "label")
+        assert sum(v["count"] for v in label["topValues"]) == 2500
+        assert sample_tables() == 1
+
+        # The sample is seeded: profiles repeat exactly, whether the rows are
+        # read from the scratch table or selected inline over budget.
+        assert local_engine._profile_column_uncached(dataset_id, "amount") == amount
+        other_id = unbudgeted.load_file(str(csv_path), "sampled.csv")
+        assert unbudgeted._profile_column_uncached(other_id, "amount") == amount
+
+        # Once built, sparklines read a prefix of the shared sample: the same
+        # rows as sampling the table directly.
+        col_types = {c["name"]: c["type"] for c in schema["columns"]}
+        from_sample = local_engine._build_schema_sparklines(
+            dataset_id, table, col_types, 5000
+        )
+        assert [from_sample[name] for name in col_types] == [
+            c["sparkline"] for c in schema["columns"]
+        ]
+        full_id = full_engine.load_file(str(csv_path), "sampled.csv")
+        assert full_engine._profile_column_uncached(full_id, "amount")["sampled"] is False
+        assert [c["sparkline"] for c in schema["columns"]] == [
+            c["sparkline"] for c in full_engine.get_schema(full_id)["columns"]
+        ]
+
+        local_engine._bump_version(table)
+        assert sample_tables() == 0
+    finally:
+        local_engine.close()
+        full_engine.close()
+        unbudgeted.close()
+
+
 def test_page_rejects_non_array_filters_payload() -> None:
     dataset_id = _dataset_id()
     resp = client.get(
@@ -452,6 +1883,26 @@ def test_query_non_select_statement_returns_success() -> None:
     assert payload["rowCount"] == len(payload["rows"])
 
 
+def test_modifying_query_returns_its_own_result() -> None:
+    local_engine = DuckDBEngine()
+    try:
+        dataset_id = local_engine.load_file(str(DATA_FILE), "sales_sample.csv")
+        table = local_engine.datasets[dataset_id]
+        total = local_engine.get_schema(dataset_id)["rowCount"]
+
+        updated = local_engine.run_query(
+            dataset_id, f'UPDATE "{table}" SET quantity = quantity'
+        )
+        assert updated["rows"] == [{"Count": total}]
+
+        answered = local_engine.run_query(
+            dataset_id, f'UPDATE "{table}" SET quantity = quantity; SELECT 42 AS answer'
+        )
+        assert answered["rows"] == [{"answer": 42}]
+    finally:
+        local_engine.close()
+
+
 def test_code_sql_executes_query() -> None:
     dataset_id = _dataset_id()
     resp = client.post(
@@ -1,6 +1,7 @@
 import { useQuery, useMutation } from '@tanstack/react-query'
 import type {
   ColumnValueSuggestionResponse,
+  CountResponse,
   DiscoverResponse,
   Filter,
   ImportRequest,
@@ -17,6 +18,9 @@ import { useAppStore } from './store.ts'
 
 const BASE = '/api'
 
+// Identifies this tab to the server-side page prefetch cache.
+export const PAGE_SESSION = Math.random().toString(36).slice(2)
+
 async function request<T>(path: string, options?: RequestInit): Promise<T> {
   const res = await fetch(`${BASE}${path}`, options)
   if (!res.ok) {
@@ -134,6 +138,11 @@ export function useDatasetPage(params: PageParams | null) {
       if (params.filters.length > 0) {
         searchParams.set('filters', JSON.stringify(params.filters))
       }
+      // Large filtered tables answer with a sampled count right away; the
+      // exact one is polled from /count.
+      searchParams.set('count_mode', 'estimate')
+      searchParams.set('prefetch', '1')
+      searchParams.set('session', PAGE_SESSION)
       return request<PageResponse>(`/datasets/${params.datasetId}/page?${searchParams}`)
     },
     enabled: !!params?.datasetId,
@@ -141,6 +150,27 @@ export function useDatasetPage(params: PageParams | null) {
   })
 }
 
+// Long-polls the exact filtered count while a page only carries an estimate;
+// the server holds each poll open, so the next one follows right away.
+const COUNT_WAIT_SECONDS = 10
+
+export function useFilteredCount(datasetId: string | undefined, filters: Filter[], enabled: boolean) {
+  return useQuery({
+    queryKey: ['count', datasetId, filters],
+    queryFn: () => {
+      if (!datasetId) throw new Error('No dataset')
+      const searchParams = new URLSearchParams()
+      if (filters.length > 0) {
+        searchParams.set('filters', JSON.stringify(filters))
+      }
+      searchParams.set('wait', String(COUNT_WAIT_SECONDS))
+      return request<CountResponse>(`/datasets/${datasetId}/count?${searchParams}`)
+    },
+    enabled: !!datasetId && enabled,
+    refetchInterval: (query) => (query.state.data?.status === 'pending' ? 1 : false),
+  })
+}
+
 // ── Column Profile ──
 
 export function useColumnProfile(datasetId: string | undefined, column: string | null) {
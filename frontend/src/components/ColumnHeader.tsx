@@ -92,8 +92,11 @@ export function ColumnHeader({ column, sparkline, onProfileClick }: ColumnHeader
             {nullPct.toFixed(1)}% null
           </span>
           {column.uniqueCount != null && (
-            <span className="text-[9px] font-mono text-text-muted">
-              {column.uniqueCount.toLocaleString()} uniq
+            <span
+              className="text-[9px] font-mono text-text-muted"
+              title={column.uniqueCountApprox ? 'Approximate distinct count' : undefined}
+            >
+              {column.uniqueCountApprox ? '~' : ''}{column.uniqueCount.toLocaleString()} uniq
             </span>
           )}
         </div>
@@ -7,7 +7,7 @@ import {
 } from '@tanstack/react-table'
 import { useVirtualizer } from '@tanstack/react-virtual'
 import { useAppStore } from '../store.ts'
-import { useDatasetPage } from '../api.ts'
+import { PAGE_SESSION, useDatasetPage, useFilteredCount } from '../api.ts'
 import { ColumnHeader } from './ColumnHeader.tsx'
 import { ProfilePopover } from './ProfilePopover.tsx'
 import { ColumnMenu } from './ColumnMenu.tsx'
@@ -141,8 +141,16 @@ export function DataTable() {
     overscan: 20,
   })
 
-  const totalPages = pageData?.totalPages ?? 0
-  const filteredRows = pageData?.filteredRows ?? dataset?.rowCount ?? 0
+  const { data: exactCount } = useFilteredCount(
+    dataset?.id,
+    filters,
+    pageData?.filteredRowsExact === false,
+  )
+  const countedRows = pageData?.filteredRowsExact === false ? exactCount?.filteredRows ?? null : null
+  const isEstimate = pageData?.filteredRowsExact === false && countedRows === null
+  const filteredRows = countedRows ?? pageData?.filteredRows ?? dataset?.rowCount ?? 0
+  const totalPages =
+    countedRows !== null ? Math.max(1, Math.ceil(countedRows / pageSize)) : pageData?.totalPages ?? 0
   const totalRows = pageData?.totalRows ?? dataset?.rowCount ?? 0
   const shownRows = filteredRows > 0 ? Math.min(page * pageSize + rows.length, filteredRows) : 0
 
@@ -156,6 +164,9 @@ export function DataTable() {
       searchParams.set('sort_direction', sort.direction)
     }
     if (filters.length > 0) searchParams.set('filters', JSON.stringify(filters))
+    searchParams.set('count_mode', 'estimate')
+    searchParams.set('prefetch', '1')
+    searchParams.set('session', PAGE_SESSION)
 
     const res = await fetch(`/api/datasets/${dataset.id}/page?${searchParams.toString()}`)
     if (!res.ok) throw new Error(await res.text())
@@ -340,7 +351,10 @@ export function DataTable() {
         </div>
 
         <div className="text-text-muted font-mono">
-          <span>{shownRows.toLocaleString()} / {filteredRows.toLocaleString()} rows</span>
+          <span>
+            {shownRows.toLocaleString()} / {isEstimate ? '~' : ''}
+            {filteredRows.toLocaleString()} rows
+          </span>
           {filteredRows !== totalRows && <span> ({totalRows.toLocaleString()} total)</span>}
           <span className="inline-block min-w-[64px] ml-2 text-right text-accent">
             {isLoading ? 'loading' : isFetching ? 'updating' : ''}
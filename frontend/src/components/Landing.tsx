@@ -194,7 +194,7 @@ export function Landing() {
                       <span className="text-sm text-text truncate">{entity.name}</span>
                     </div>
                     <span className="text-[10px] font-mono text-text-muted shrink-0">
-                      {entity.rowCount.toLocaleString()} rows
+                      {entity.rowCountEstimated ? '~' : ''}{entity.rowCount.toLocaleString()} rows
                     </span>
                   </label>
                 )
@@ -6,6 +6,7 @@ export interface Column {
   nullCount: number
   totalCount: number
   uniqueCount?: number
+  uniqueCountApprox?: boolean
   sparkline?: number[]
 }
 
@@ -26,8 +27,13 @@ export interface Dataset {
 export interface PageResponse {
   rows: Record<string, unknown>[]
   columns: string[]
+  totalColumns?: number
+  columnOffset?: number
   totalRows: number
   filteredRows: number
+  filteredRowsExact?: boolean
+  filteredRowsEstimate?: number
+  filteredRowsConfidence?: 'high' | 'medium' | 'low'
   nextCursor: string | null
   prevCursor: string | null
   page: number
@@ -35,6 +41,11 @@ export interface PageResponse {
   totalPages: number
 }
 
+export interface CountResponse {
+  filteredRows: number | null
+  status: 'complete' | 'pending'
+}
+
 export interface SchemaResponse {
   columns: Column[]
   rowCount: number
@@ -52,6 +63,21 @@ export interface DiscoverEntity {
   name: string
   kind: 'dataset' | 'sheet' | 'table'
   rowCount: number
+  rowCountEstimated?: boolean
+  sniff?: CsvSniff
+}
+
+export interface CsvSniff {
+  delimiter: string
+  quote: string
+  escape: string
+  newLine: string
+  comment: string
+  skipRows: number
+  hasHeader: boolean
+  columns: { name: string; type: string }[]
+  dateFormat: string
+  timestampFormat: string
 }
 
 export interface DiscoverResponse {
@@ -67,6 +93,8 @@ export interface ImportRequest {
   selectedEntities?: string[]
   importMode?: 'selected' | 'all'
   datasetNameMode?: 'filename_entity' | 'entity_only'
+  precomputeProfiles?: boolean
+  profileColumns?: string[]
 }
 
 export interface ImportResponse {